@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# vim: set expandtab tabstop=4 shiftwidth=4:
+#
+# Eschalon Savefile Editor
+# Copyright (C) 2008-2017 CJ Kucera, Elliot Kendall, Eitan Adler
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+"""
+Throughput benchmark for reading members out of an encrypted datapak.
+Builds a synthetic ZipCrypto-encrypted zip, shaped roughly like a real
+datapak (a handful of large graphics files and a pile of small maps and
+data files), and times reading every member through zipfile's decrypter
+and through Datapak's own reader.
+
+Run from the top of the source tree:
+
+    python benchmarks/datapak_read.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import eschalon.eschalondata
+from eschalon.constants import constants as c
+from eschalon.eschalondata import Datapak
+
+# Share the datapak tests' encrypted zip writer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests'))
+from eschalondata_tests import write_encrypted_zip
+
+def build_members():
+    """ Builds a set of members with realistic-ish compressibility """
+    rand = random.Random(2)
+    members = {}
+    for i in range(4):
+        members['gfx/sheet_%d.png' % (i)] = bytes(
+            rand.getrandbits(8) if rand.random() < 0.5 else 0 for j in range(512 * 1024))
+    for i in range(40):
+        members['maps/map_%02d.map' % (i)] = bytes(
+            rand.randrange(8) for j in range(32 * 1024))
+    return members
+
+
+def time_reads(datapak, names):
+    """
+    Returns the seconds taken to read all of the given members.  This goes
+    straight to read_member(), since readfile() would just be serving them
+    from the in-memory member cache.
+    """
+    start = time.perf_counter()
+    for name in names:
+        (directory, filename) = name.split('/', 1)
+        datapak.read_member(filename, directory)
+    return time.perf_counter() - start
+
+
+def main():
+    c.switch_to_book(3)
+    members = build_members()
+    total = sum(len(data) for data in members.values())
+    (fd, filename) = tempfile.mkstemp(suffix='.datapak')
+    os.close(fd)
+    try:
+        write_encrypted_zip(filename, members, Datapak.get_password())
+        datapak = Datapak(filename)
+        names = sorted(members.keys())
+        for name in names:
+            (directory, member) = name.split('/', 1)
+            assert datapak.read_member(member, directory) == members[name]
+
+        eschalon.eschalondata.fast_zipfile = False
+        stdlib = time_reads(datapak, names)
+        eschalon.eschalondata.fast_zipfile = True
+        native = time_reads(datapak, names)
+    finally:
+        os.remove(filename)
+
+    print('Synthetic encrypted datapak: %d members, %.2f MiB uncompressed' % (
+        len(members), total / 1048576))
+    print('  zipfile decrypter: %8.2f MiB/s' % (total / 1048576 / stdlib))
+    print('  Datapak reader:    %8.2f MiB/s' % (total / 1048576 / native))
+    print('  Speedup:           %8.2fx' % (stdlib / native))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# vim: set expandtab tabstop=4 shiftwidth=4:
+#
+# Eschalon Savefile Editor
+# Copyright (C) 2008-2017 CJ Kucera, Elliot Kendall, Eitan Adler
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""
+Memory benchmark for a full synthetic Book 3 savegame map: every tile
+populated, plus a realistic load of tilecontents (each with a full set of
+items) and entities.  Reports the memory held by the map's model objects
+as they're stored now (a columnar TileGrid plus __slots__-based objects),
+next to the same data held the old way, as one dict-backed object per
+tile, tilecontent, item and entity.  That's the combined saving of both
+changes; to show what __slots__ alone is worth, the tilecontents, items
+and entities are also copied into slotted and dict-backed objects and
+measured on their own.
+
+Run from the top of the source tree:
+
+    python benchmarks/map_memory.py
+"""
+
+import gc
+import random
+import sys
+import tracemalloc
+
+from eschalon.constants import constants as c
+from eschalon.entity import Entity
+from eschalon.map import Map
+from eschalon.tilecontent import Tilecontent
+
+NUM_TILECONTENTS = 2000
+NUM_ENTITIES = 500
+
+
+class DictBacked(object):
+    """ Stand-in for a model object which keeps its values in a __dict__ """
+    pass
+
+
+def slot_names(obj):
+    """ Returns all the slotted attribute names for the given object """
+    names = []
+    for cls in type(obj).__mro__:
+        names.extend(cls.__dict__.get('__slots__', ()))
+    return names
+
+
+def copy_object(obj, dict_backed=True):
+    """
+    Returns a copy of the given slotted object, either dict-backed or of
+    the same slotted class.  Either way, the copy shares its attribute
+    values with the original.
+    """
+    if dict_backed:
+        copy = DictBacked()
+    else:
+        copy = object.__new__(type(obj))
+    for name in slot_names(obj):
+        value = getattr(obj, name)
+        if name == 'items':
+            value = [copy_object(item, dict_backed) for item in value]
+        setattr(copy, name, value)
+    return copy
+
+
+def as_dict_backed(obj):
+    """ Returns a dict-backed copy of the given slotted object """
+    return copy_object(obj, True)
+
+
+def copy_objects(mapobj, dict_backed):
+    """
+    Copies the given map's tilecontents (with their items) and entities,
+    for comparing slotted objects against dict-backed ones on their own.
+    """
+    return [copy_object(obj, dict_backed)
+            for obj in mapobj.tilecontents + mapobj.entities]
+
+
+def build_map():
+    """ Builds a full synthetic B3 savegame map """
+    rand = random.Random(3)
+    mapobj = Map.new('benchmark.map', 3)
+    mapobj.set_savegame(True)
+    for row in mapobj.tiles:
+        for tile in row:
+            tile.wall = rand.randrange(6)
+            tile.floorimg = rand.randrange(256)
+            tile.decalimg = rand.randrange(256)
+            tile.wallimg = rand.randrange(1000)
+            tile.walldecalimg = rand.randrange(256)
+            tile.tilecontentid = rand.randrange(256)
+            tile.tile_flag = rand.randrange(2 ** 32)
+            tile.cartography = rand.randrange(2 ** 32)
+    for i in range(NUM_TILECONTENTS):
+        (x, y) = (rand.randrange(100), rand.randrange(200))
+        tilecontent = Tilecontent.new(3, True)
+        tilecontent.tozero(x, y)
+        tilecontent.description = 'Tilecontent %d' % (i)
+        mapobj.tilecontents.append(tilecontent)
+        mapobj.tiles[y][x].addtilecontent(tilecontent)
+    for i in range(NUM_ENTITIES):
+        (x, y) = (rand.randrange(100), rand.randrange(200))
+        if mapobj.tiles[y][x].entity is not None:
+            continue
+        entity = Entity.new(3, True)
+        entity.tozero(x, y)
+        mapobj.entities.append(entity)
+        mapobj.tiles[y][x].addentity(entity)
+    return mapobj
+
+
+def build_dict_backed(mapobj):
+    """
+    Builds the same data as the given map, held the old way: a
+    list-of-lists of per-tile objects, each with its own tilecontents list
+    and entity.
+    """
+    tilecontents = dict((id(tilecontent), as_dict_backed(tilecontent))
+                        for tilecontent in mapobj.tilecontents)
+    entities = dict((id(entity), as_dict_backed(entity))
+                    for entity in mapobj.entities)
+    tiles = []
+    for row in mapobj.tiles:
+        tilerow = []
+        for tile in row:
+            copy = DictBacked()
+            copy.x = tile.x
+            copy.y = tile.y
+            for name in tile.column_types:
+                setattr(copy, name, getattr(tile, name))
+            copy.tilecontents = [tilecontents[id(tilecontent)]
+                                 for tilecontent in tile.tilecontents]
+            if tile.entity is None:
+                copy.entity = None
+            else:
+                copy.entity = entities[id(tile.entity)]
+            tilerow.append(copy)
+        tiles.append(tilerow)
+    return (tiles, list(tilecontents.values()), list(entities.values()))
+
+
+def measure(builder, *args):
+    """ Returns the result of the given builder and the bytes it allocated """
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    result = builder(*args)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return (result, used)
+
+
+def main():
+    c.switch_to_book(3)
+    (mapobj, current) = measure(build_map)
+    (old, dict_backed) = measure(build_dict_backed, mapobj)
+    (dict_objects, dict_objects_size) = measure(copy_objects, mapobj, True)
+    (slotted_objects, slotted_objects_size) = measure(copy_objects, mapobj, False)
+    print('Synthetic B3 savegame map: 20000 tiles, %d tilecontents, %d entities' % (
+        len(mapobj.tilecontents), len(mapobj.entities)))
+    print('  Whole map, TileGrid and __slots__ combined:')
+    print('    Dict-backed objects: %8.2f MiB' % (dict_backed / 1048576))
+    print('    Current storage:     %8.2f MiB' % (current / 1048576))
+    print('    Savings:             %8.1fx' % (dict_backed / current))
+    print('  Tilecontents, items and entities only, __slots__ alone:')
+    print('    Dict-backed objects: %8.2f MiB' % (dict_objects_size / 1048576))
+    print('    Slotted objects:     %8.2f MiB' % (slotted_objects_size / 1048576))
+    print('    Savings:             %8.1fx' % (dict_objects_size / slotted_objects_size))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
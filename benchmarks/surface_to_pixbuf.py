@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# vim: set expandtab tabstop=4 shiftwidth=4:
+#
+# Eschalon Savefile Editor
+# Copyright (C) 2008-2017 CJ Kucera, Elliot Kendall, Eitan Adler
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+"""
+Micro-benchmark for converting a Cairo surface to a GDK Pixbuf.  Builds
+a synthetic sprite sheet about the size of a Book 2/3 entity sheet (mostly
+transparent, with opaque sprites that have antialiased edges), and times
+the old PNG encode/decode route against the direct conversion in
+eschalon.pixels, with and without NumPy.  If Cairo and GdkPixbuf aren't
+available, only the raw pixel conversions are timed.
+
+Run from the top of the source tree:
+
+    python benchmarks/surface_to_pixbuf.py
+"""
+
+import io
+import random
+import sys
+import time
+from unittest import mock
+
+from eschalon import pixels
+
+try:
+    import cairo
+    from gi.repository import GdkPixbuf, GLib
+except ImportError:
+    cairo = None
+
+WIDTH = 1024
+HEIGHT = 768
+ROUNDS = 5
+
+
+def build_sheet():
+    """
+    Returns premultiplied ARGB32 data for our synthetic sheet: a grid of
+    opaque blobs with partially-transparent rims on a clear background.
+    """
+    rand = random.Random(3)
+    (b, g, r, a) = pixels.ARGB32_OFFSETS
+    data = bytearray(WIDTH * HEIGHT * 4)
+    for top in range(0, HEIGHT, 64):
+        for left in range(0, WIDTH, 64):
+            colour = [rand.randrange(256) for i in range(3)]
+            for y in range(top + 8, top + 56):
+                for x in range(left + 8, left + 56):
+                    edge = min(x - left - 8, left + 55 - x, y - top - 8, top + 55 - y)
+                    alpha = 255 if edge >= 3 else 64 * (edge + 1)
+                    pos = (y * WIDTH + x) * 4
+                    data[pos + a] = alpha
+                    for (offset, value) in zip((r, g, b), colour):
+                        data[pos + offset] = value * alpha // 255
+    return data
+
+
+def time_rounds(func):
+    """ Returns the best time, in seconds, of a few runs of func """
+    best = None
+    for i in range(ROUNDS):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def png_roundtrip(surface):
+    """ The way Gfx.surface_to_pixbuf() used to do it """
+    df = io.BytesIO()
+    surface.write_to_png(df)
+    loader = GdkPixbuf.PixbufLoader()
+    loader.write(df.getvalue())
+    loader.close()
+    return loader.get_pixbuf()
+
+
+def direct(surface):
+    """ The way Gfx.surface_to_pixbuf() does it now """
+    data = pixels.argb32_to_rgba(surface.get_data(), WIDTH, HEIGHT,
+                                 surface.get_stride())
+    return GdkPixbuf.Pixbuf.new_from_bytes(GLib.Bytes.new(data),
+                                           GdkPixbuf.Colorspace.RGB,
+                                           True, 8, WIDTH, HEIGHT, WIDTH * 4)
+
+
+def main():
+    data = build_sheet()
+    results = []
+    if pixels.numpy is not None:
+        results.append(('NumPy conversion', time_rounds(
+            lambda: pixels.argb32_to_rgba(data, WIDTH, HEIGHT, WIDTH * 4))))
+    with mock.patch.object(pixels, 'numpy', None):
+        results.append(('Fallback conversion', time_rounds(
+            lambda: pixels.argb32_to_rgba(data, WIDTH, HEIGHT, WIDTH * 4))))
+
+    if cairo is not None:
+        surface = cairo.ImageSurface.create_for_data(
+            data, cairo.FORMAT_ARGB32, WIDTH, HEIGHT, WIDTH * 4)
+        results.insert(0, ('PNG round-trip', time_rounds(lambda: png_roundtrip(surface))))
+        results.insert(1, ('Direct to Pixbuf', time_rounds(lambda: direct(surface))))
+    else:
+        print('(Cairo/GdkPixbuf not available; only timing raw conversions)')
+
+    print('Surface to Pixbuf, %d x %d sheet, best of %d:' % (WIDTH, HEIGHT, ROUNDS))
+    for (label, elapsed) in results:
+        print('  %-20s %8.2f ms' % (label + ':', elapsed * 1000))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
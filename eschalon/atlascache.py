@@ -0,0 +1,166 @@
+#!/usr/bin/python
+# vim: set expandtab tabstop=4 shiftwidth=4:
+#
+# Eschalon Savefile Editor
+# Copyright (C) 2008-2017 CJ Kucera, Elliot Kendall, Eitan Adler
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Optional, Tuple
+
+LOG = logging.getLogger(__name__)
+
+
+class AtlasCache(object):
+    """
+    An on-disk cache of the scaled sprite atlases built by GfxCache (see
+    SpriteAtlas), so that opening the map editor doesn't have to decode
+    and scale the same sheets at the same zoom level every time.  Each
+    atlas is stored as raw premultiplied ARGB32 pixel data, exactly as
+    Cairo keeps it in memory, behind a small header; loading one is just
+    a matter of mapping the file and pointing a surface at it.
+
+    Atlases are keyed by a hash of the source PNG data along with
+    everything else which affects the result: the book, how the sheet is
+    sliced up, the size it's scaled to, and any overlay drawn on it.  As
+    with our other caches, any problem with the cache just means that the
+    atlas gets built from scratch.
+
+    Atlases are big, and ones for old data or zoom levels we no longer
+    use would otherwise pile up forever, so the directory is kept under
+    "max_bytes" by removing the least recently used atlases whenever we
+    store a new one.
+    """
+
+    # Bump this if the way atlases are built ever changes
+    VERSION = 1
+    MAGIC = b'ESAT'
+    HEADER = struct.Struct('<4s4I')
+
+    DEFAULT_MAX_BYTES = 256 * 1048576
+
+    def __init__(self, cachedir: str, book: int, max_bytes: Optional[int] = None) -> None:
+        self.cachedir = cachedir
+        self.book = book
+        if max_bytes is None:
+            max_bytes = self.DEFAULT_MAX_BYTES
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def hash_data(data: bytes) -> str:
+        """ Returns the hash of some source data, for use in get_key() """
+        return hashlib.sha1(data).hexdigest()
+
+    def get_key(self, source_hash: str, *params) -> str:
+        """
+        Returns the key for an atlas built from the source data with the
+        given hash (see hash_data()).  "params" should be everything else
+        which affects the pixels in the atlas.  Cairo stores pixels in
+        native byte order, so that's part of the key too.
+        """
+        desc = repr((self.VERSION, sys.byteorder, self.book, source_hash) + params)
+        return hashlib.sha1(desc.encode('UTF-8')).hexdigest()
+
+    def get_path(self, key: str) -> str:
+        """ Returns the path of the file for the given key """
+        return os.path.join(self.cachedir, '%s.atlas' % (key))
+
+    def load(self, key: str) -> Optional[Tuple[int, int, int, memoryview]]:
+        """
+        Returns a tuple of the width, height and stride of the atlas stored
+        for the given key, along with a writable buffer of its pixel data
+        (a copy-on-write mapping of the file), or None if we don't have it.
+        """
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as df:
+                size = os.fstat(df.fileno()).st_size
+                if size < self.HEADER.size:
+                    return None
+                mapped = mmap.mmap(df.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (IOError, OSError, ValueError):
+            return None
+        (magic, version, width, height, stride) = self.HEADER.unpack_from(mapped)
+        if (magic != self.MAGIC or version != self.VERSION or stride < width * 4 or
+                size != self.HEADER.size + stride * height):
+            mapped.close()
+            return None
+
+        # Mark it as recently used, for prune()
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return (width, height, stride, memoryview(mapped)[self.HEADER.size:])
+
+    def store(self, key: str, width: int, height: int, stride: int, data) -> None:
+        """ Stores the given pixel data for the given key """
+        path = self.get_path(key)
+        try:
+            if not os.path.isdir(self.cachedir):
+                os.makedirs(self.cachedir)
+            (fd, tempname) = tempfile.mkstemp(dir=self.cachedir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as df:
+                    df.write(self.HEADER.pack(self.MAGIC, self.VERSION, width, height, stride))
+                    df.write(data)
+                os.replace(tempname, path)
+            except Exception:
+                os.remove(tempname)
+                raise
+        except (IOError, OSError) as e:
+            LOG.warning('Could not cache sprite atlas %s: %s' % (path, e))
+            return
+        self.prune(keep=path)
+
+    def prune(self, keep: Optional[str] = None) -> None:
+        """
+        Removes the least recently used atlases until the ones left add
+        up to no more than max_bytes.  The file at "keep" (the one we've
+        just stored) is never removed.
+        """
+        try:
+            names = os.listdir(self.cachedir)
+        except OSError:
+            return
+        atlases = []
+        total = 0
+        for name in names:
+            if not name.endswith('.atlas'):
+                continue
+            path = os.path.join(self.cachedir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            total += stat.st_size
+            if path != keep:
+                atlases.append((stat.st_mtime_ns, stat.st_size, path))
+        atlases.sort()
+        for (mtime, size, path) in atlases:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError as e:
+                LOG.warning('Could not remove cached sprite atlas %s: %s' % (path, e))
@@ -22,7 +22,9 @@ import os
 from struct import unpack
 from typing import Callable, Tuple
 
+from eschalon import lru
 from eschalon.constants import constants as c
+from eschalon.mapindex import MapIndex
 from eschalon.scripteditor import ScriptEditor
 from gi.repository import Gdk, GdkPixbuf, GObject, Gtk, Pango
 
@@ -252,6 +254,13 @@ class BaseGUI(object):
         # Prefs data object
         self.prefsobj = prefs
 
+        # Index of map files we've already identified, for our load dialogs
+        self.mapindex = MapIndex(prefs.sidecar_file('mapindex'))
+
+        # Size of our in-memory cache of game data files
+        lru.member_cache.set_budget(
+            prefs.get_int('datapak', 'memory_cache_mb') * 1048576)
+
         # Preferences window
         self.prefsbuilder = Gtk.Builder()
         self.prefsbuilder.add_from_file(self.datafile('preferences.ui'))
@@ -636,6 +645,33 @@ class BaseGUI(object):
         """
         return self.prefsobj.get_str('paths', self.get_gamedir_key())
 
+    def get_datapak_cachedir(self):
+        """
+        Returns the directory to cache decrypted datapak members in, or None
+        if we shouldn't be caching them.
+        """
+        if self.prefsobj.get_bool('datapak', 'extract_cache'):
+            return self.prefsobj.sidecar_file('cache')
+        else:
+            return None
+
+    def get_sprite_budget(self):
+        """
+        Returns the number of bytes our Gfx object's cache of scaled
+        graphics is allowed to use.
+        """
+        return self.prefsobj.get_int('mapgui', 'sprite_cache_mb') * 1048576
+
+    def get_atlas_cachedir(self):
+        """
+        Returns the directory to cache scaled map graphics in, or None if
+        we shouldn't be caching them.
+        """
+        if self.prefsobj.get_bool('mapgui', 'atlas_cache'):
+            return self.prefsobj.sidecar_file('atlases')
+        else:
+            return None
+
     def optional_gfx(self):
         if (not self.gamedir_set()):
             response = self.gfx_opt_window.run()
@@ -769,8 +805,8 @@ class BaseGUI(object):
     def get_comp_objects(self):
         """ Get the objects to compare against while checking for form changes. """
         if (self.curitemcategory == self.ITEM_EQUIP):
-            obj = self.char.__dict__[self.curitem]
-            origobj = self.origchar.__dict__[self.curitem]
+            obj = getattr(self.char, self.curitem)
+            origobj = getattr(self.origchar, self.curitem)
         elif (self.curitemcategory == self.ITEM_INV):
             obj = self.char.inventory[self.curitem[0]][self.curitem[1]]
             origobj = self.origchar.inventory[self.curitem[0]][self.curitem[1]]
@@ -790,11 +826,11 @@ class BaseGUI(object):
         """ What to do when a string value changes. """
         wname = widget.get_name()
         (obj, origobj) = self.get_comp_objects()
-        obj.__dict__[wname] = widget.get_text()
+        setattr(obj, wname, widget.get_text())
         if (self.curitemcategory != self.ITEM_MAP):
             (labelwidget, label) = self.get_label_cache(wname)
-            self.set_changed_widget((origobj.__dict__[wname] == obj.__dict__[
-                                    wname]), wname, labelwidget, label)
+            self.set_changed_widget((getattr(origobj, wname) == getattr(
+                                    obj, wname)), wname, labelwidget, label)
 
     def on_item_singleval_changed_str(self, widget):
         """ What to do when a string value changes on the item edit screen. """
@@ -807,11 +843,11 @@ class BaseGUI(object):
         """ What to do when an int value changes. """
         wname = widget.get_name()
         (obj, origobj) = self.get_comp_objects()
-        obj.__dict__[wname] = int(widget.get_value())
+        setattr(obj, wname, int(widget.get_value()))
         if (self.curitemcategory != self.ITEM_MAP):
             (labelwidget, label) = self.get_label_cache(wname)
-            self.set_changed_widget((origobj.__dict__[wname] == obj.__dict__[
-                                    wname]), wname, labelwidget, label)
+            self.set_changed_widget((getattr(origobj, wname) == getattr(
+                                    obj, wname)), wname, labelwidget, label)
 
     def on_item_singleval_changed_int(self, widget):
         """ What to do when an int value changes on our item screen. """
@@ -824,12 +860,12 @@ class BaseGUI(object):
         """ What to do when an int value changes. """
         wname = widget.get_name()
         (obj, origobj) = self.get_comp_objects()
-        obj.__dict__[wname] = widget.get_value()
+        setattr(obj, wname, widget.get_value())
         # Note that for floats, we shouldn't do exact precision, hence the 1e-6 comparison here.
         if (self.curitemcategory != self.ITEM_MAP):
             (labelwidget, label) = self.get_label_cache(wname)
             self.set_changed_widget(
-                (abs(origobj.__dict__[wname] - obj.__dict__[wname]) < 1e-6), wname, labelwidget, label)
+                (abs(getattr(origobj, wname) - getattr(obj, wname)) < 1e-6), wname, labelwidget, label)
 
     def on_item_singleval_changed_float(self, widget):
         """ What to do when an int value changes on our item screen. """
@@ -862,11 +898,11 @@ class BaseGUI(object):
         """ What to do when a dropdown is changed """
         wname = widget.get_name()
         (obj, origobj) = self.get_comp_objects()
-        obj.__dict__[wname] = widget.get_active()
+        setattr(obj, wname, widget.get_active())
         if (self.curitemcategory != self.ITEM_MAP):
             (labelwidget, label) = self.get_label_cache(wname)
-            self.set_changed_widget((origobj.__dict__[wname] == obj.__dict__[
-                                    wname]), wname, labelwidget, label)
+            self.set_changed_widget((getattr(origobj, wname) == getattr(
+                                    obj, wname)), wname, labelwidget, label)
 
     def on_item_dropdown_changed(self, widget):
         """ What to do when a dropdown changes on our item screen """
@@ -890,13 +926,13 @@ class BaseGUI(object):
         ischecked = widget.get_active()
         (obj, origobj) = self.get_comp_objects()
         if (ischecked):
-            obj.__dict__[wname] = 1
+            setattr(obj, wname, 1)
         else:
-            obj.__dict__[wname] = 0
+            setattr(obj, wname, 0)
         if (self.curitemcategory != self.ITEM_MAP):
             (labelwidget, label) = self.get_label_cache(wname)
-            self.set_changed_widget((origobj.__dict__[wname] == obj.__dict__[
-                                    wname]), wname, labelwidget, label)
+            self.set_changed_widget((getattr(origobj, wname) == getattr(
+                                    obj, wname)), wname, labelwidget, label)
 
     def on_item_checkbox_changed(self, widget):
         """ What to do when a regular checkbox changes on our item edit screen. """
@@ -913,13 +949,13 @@ class BaseGUI(object):
         mask = int(mask, 16)
         (obj, origobj) = self.get_comp_objects()
         if (ischecked):
-            obj.__dict__[shortname] |= mask
+            setattr(obj, shortname, getattr(obj, shortname) | mask)
         else:
-            obj.__dict__[shortname] &= ~mask
+            setattr(obj, shortname, getattr(obj, shortname) & ~mask)
         if (self.curitemcategory != self.ITEM_MAP):
             (labelwidget, label) = self.get_label_cache(wname)
-            self.set_changed_widget((origobj.__dict__[shortname] & mask == obj.__dict__[
-                                    shortname] & mask), wname, labelwidget, label)
+            self.set_changed_widget((getattr(origobj, shortname) & mask == getattr(
+                                    obj, shortname) & mask), wname, labelwidget, label)
 
     def on_modifier_changed(self, widget):
         """ What to do when our attr or skill modifier changes. """
@@ -931,13 +967,13 @@ class BaseGUI(object):
         modified = self.get_widget(modifiedtext).get_active()
         (obj, origobj) = self.get_comp_objects()
         if (wname == modifiertext):
-            obj.__dict__[modifiertext] = modifier
+            setattr(obj, modifiertext, modifier)
         elif (wname == modifiedtext):
-            obj.__dict__[modifiedtext] = modified
+            setattr(obj, modifiedtext, modified)
         if (self.curitemcategory != self.ITEM_MAP):
             (labelwidget, label) = self.get_label_cache(which)
-            self.set_changed_widget((origobj.__dict__[modifiertext] == obj.__dict__[modifiertext] and
-                                     origobj.__dict__[modifiedtext] == obj.__dict__[modifiedtext]), which, labelwidget, label)
+            self.set_changed_widget((getattr(origobj, modifiertext) == getattr(obj, modifiertext) and
+                                     getattr(origobj, modifiedtext) == getattr(obj, modifiedtext)), which, labelwidget, label)
 
     def on_b2_bonus_changed(self, widget):
         """ What to do when a book 2 item attribute changes. """
@@ -951,9 +987,9 @@ class BaseGUI(object):
         bonus = self.get_widget(bonustext).get_active()
         (obj, origobj) = self.get_comp_objects()
         if (wname == bonusvaluetext):
-            obj.__dict__[bonusvaluetext] = bonusvalue
+            setattr(obj, bonusvaluetext, bonusvalue)
         elif (wname == bonustext):
-            obj.__dict__[bonustext] = bonus
+            setattr(obj, bonustext, bonus)
         if num == 3:
             if obj.bonus_value_3 < 0:
                 self.get_widget('bonus_plusminus_3').set_text('')
@@ -961,8 +997,8 @@ class BaseGUI(object):
                 self.get_widget('bonus_plusminus_3').set_text('+')
         if (self.curitemcategory != self.ITEM_MAP):
             (labelwidget, label) = self.get_label_cache(bonusvaluetext)
-            self.set_changed_widget((origobj.__dict__[bonusvaluetext] == obj.__dict__[bonusvaluetext] and
-                                     origobj.__dict__[bonustext] == obj.__dict__[bonustext]), bonusvaluetext, labelwidget, label)
+            self.set_changed_widget((getattr(origobj, bonusvaluetext) == getattr(obj, bonusvaluetext) and
+                                     getattr(origobj, bonustext) == getattr(obj, bonustext)), bonusvaluetext, labelwidget, label)
 
     def on_item_close_clicked(self, widget=None, event=None, dohide=True):
         if (self.curitemcategory == self.ITEM_EQUIP):
@@ -1074,7 +1110,7 @@ class BaseGUI(object):
         # This will almost always result in duplicate calls because of the
         # set_text() and set_value() calls, but we need to do it so that
         # values left over from previous items don't interfere with our
-        # 'changed' labels.  As a side note, because of the __dict__ construct,
+        # 'changed' labels.  As a side note, because of the getattr() construct,
         # there's really no reason not to just use these same arrays for doing
         # the actual set_text() and set_value() calls, as well.
         #
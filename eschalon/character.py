@@ -38,10 +38,11 @@ class Character(ABC):
       * Time of day in the game world
       * Total time spent playing the game
 
-    Note that the base class does not define read() and write() methods, which
-    are left up to the specific Book classes (the theory being that the actual
-    underlying formats can be rather different, and it doesn't really make sense
-    to try and work around that.
+    Note that the base class does not define read(), and only wraps the
+    actual writing done by _sub_write(); those are left up to the specific
+    Book classes (the theory being that the actual underlying formats can be
+    rather different, and it doesn't really make sense to try and work around
+    that.
     """
 
     book = -1
@@ -197,6 +198,25 @@ class Character(ABC):
         # Now return our duplicated object
         return newchar
 
+    def write(self):
+        """
+        Writes out the save file.  The data is serialized in memory first
+        and only replaces the file on disk once it's complete.
+        """
+        self.df.open_w()
+        try:
+            self._sub_write()
+        except Exception:
+            self.df.abort()
+            raise
+        self.df.close()
+
+    def _sub_write(self):
+        """
+        Stub for superclasses to override, to write out the actual data
+        """
+        pass
+
     def _sub_replicate(self, newchar):
         """
         Just a stub function for superclasses to override, to replicate any
@@ -364,39 +384,39 @@ class B1Character(Character):
             self.origin = self.df.readstr().decode('UTF-8')
             self.axiom = self.df.readstr().decode('UTF-8')
             self.classname = self.df.readstr().decode('UTF-8')
-            self.unknown.charone = self.df.readint()
-            self.strength = self.df.readint()
-            self.dexterity = self.df.readint()
-            self.endurance = self.df.readint()
-            self.speed = self.df.readint()
-            self.intelligence = self.df.readint()
-            self.wisdom = self.df.readint()
-            self.perception = self.df.readint()
-            self.concentration = self.df.readint()
+            (self.unknown.charone,
+             self.strength,
+             self.dexterity,
+             self.endurance,
+             self.speed,
+             self.intelligence,
+             self.wisdom,
+             self.perception,
+             self.concentration) = self.df.read_record('9I')
 
             # Skills
-            for key in list(c.skilltable.keys()):
-                self.addskill(key, self.df.readint())
+            skillkeys = list(c.skilltable.keys())
+            for (key, level) in zip(skillkeys, self.df.read_record('%dI' % (len(skillkeys)))):
+                self.addskill(key, level)
 
             # More stats
-            self.maxhp = self.df.readint()
-            self.maxmana = self.df.readint()
-            self.curhp = self.df.readint()
-            self.curmana = self.df.readint()
-            self.experience = self.df.readint()
-            self.level = self.df.readint()
-            self.gold = self.df.readint()
-            self.extra_att_points = self.df.readint()
-            self.extra_skill_points = self.df.readint()
-
-            # Character statuses
-            for i in range(26):
-                self.statuses.append(self.df.readint())
-                self.unknown.sparseiblock.append(self.df.readint())
+            (self.maxhp,
+             self.maxmana,
+             self.curhp,
+             self.curmana,
+             self.experience,
+             self.level,
+             self.gold,
+             self.extra_att_points,
+             self.extra_skill_points) = self.df.read_record('9I')
+
+            # Character statuses (interleaved with an unknown block)
+            statuses = self.df.read_record('52I')
+            self.statuses.extend(statuses[0::2])
+            self.unknown.sparseiblock.extend(statuses[1::2])
 
             # More Unknowns
-            for i in range(17):
-                self.unknown.iblock1.append(self.df.readint())
+            self.unknown.iblock1.extend(self.df.read_record('17I'))
             for i in range(5):
                 self.unknown.ssiblocks1.append(self.df.readstr())
                 self.unknown.ssiblocks2.append(self.df.readstr())
@@ -404,25 +424,22 @@ class B1Character(Character):
             self.unknown.extstr1 = self.df.readstr().decode('UTF-8')
             self.unknown.extstr2 = self.df.readstr().decode('UTF-8')
 
-            # Torches
-            self.torches = self.df.readint()
-            self.torchused = self.df.readint()
-
-            # Further unknown
-            self.unknown.anotherzero = self.df.readint()
+            # Torches, and a further unknown
+            (self.torches,
+             self.torchused,
+             self.unknown.anotherzero) = self.df.read_record('3I')
 
             # Most of the spells (minus the last four Elemental)
-            for i in range(35):
-                self.addspell()
+            self.spells.extend(self.df.read_record('35I'))
 
             # Readied Spells
             for i in range(10):
                 self.addreadyslot(self.df.readstr().decode('UTF-8'), self.df.readint())
 
-            # Position/orientation
-            self.orientation = self.df.readint()
-            self.xpos = self.df.readint()
-            self.ypos = self.df.readint()
+            # Position/orientation, avatar fx, an unknown, profile pic, disease,
+            # and an unknown 2-byte integer, all described below.
+            values = self.df.read_record('10IH')
+            (self.orientation, self.xpos, self.ypos) = values[:3]
 
             # These have *something* to do with your avatar, or effects that your
             # avatar has.  For instance, my avatar ordinarily looks like this:
@@ -447,27 +464,25 @@ class B1Character(Character):
             #    00 7D 00 00    - 32000
             # Invisible/Chameleon doesn't seem to apply here though.  Maybe just lighting fx?
             # Also, these certainly could be Not Actually ints; perhaps they're something else.
-            for i in range(4):
-                self.fxblock.append(self.df.readint())
+            self.fxblock.extend(values[3:7])
 
             # An unknown, seems to be a multiple of 256
-            self.unknown.anotherint = self.df.readint()
+            self.unknown.anotherint = values[7]
 
             # Character profile pic (multiple of 256, for some reason)
-            self.picid = self.df.readint()
+            self.picid = values[8]
 
             # Disease flag
-            self.disease = self.df.readint()
+            self.disease = values[9]
 
             # More Unknowns.  Apparently there's one 2-byte integer in here, too.
-            self.unknown.shortval = self.df.readshort()
+            self.unknown.shortval = values[10]
             self.unknown.emptystr = self.df.readstr().decode('UTF-8')
-            for i in range(21):
-                self.unknown.iblock2.append(self.df.readint())
+            self.unknown.iblock2.extend(self.df.read_record('21I'))
             self.unknown.preinvs1 = self.df.readstr().decode('UTF-8')
             self.unknown.preinvs2 = self.df.readstr().decode('UTF-8')
-            self.unknown.preinvzero1 = self.df.readint()
-            self.unknown.preinvzero2 = self.df.readint()
+            (self.unknown.preinvzero1,
+             self.unknown.preinvzero2) = self.df.read_record('II')
 
             # Inventory
             for i in range(self.inv_rows * self.inv_cols):
@@ -516,11 +531,8 @@ class B1Character(Character):
         except (IOError, struct.error) as e:
             raise
 
-    def write(self):
-        """ Writes out the save file to the file descriptor. """
-
-        # Open the file
-        self.df.open_w()
+    def _sub_write(self):
+        """ Writes out the save file contents. """
 
         # Beginning
         self.df.writeint(self.unknown.initzero)
@@ -531,39 +543,41 @@ class B1Character(Character):
         self.df.writestr(self.origin)
         self.df.writestr(self.axiom)
         self.df.writestr(self.classname)
-        self.df.writeint(self.unknown.charone)
-        self.df.writeint(self.strength)
-        self.df.writeint(self.dexterity)
-        self.df.writeint(self.endurance)
-        self.df.writeint(self.speed)
-        self.df.writeint(self.intelligence)
-        self.df.writeint(self.wisdom)
-        self.df.writeint(self.perception)
-        self.df.writeint(self.concentration)
+        self.df.write_record('9I', (self.unknown.charone,
+                                    self.strength,
+                                    self.dexterity,
+                                    self.endurance,
+                                    self.speed,
+                                    self.intelligence,
+                                    self.wisdom,
+                                    self.perception,
+                                    self.concentration))
 
         # Skills
-        for skill in list(self.skills.values()):
-            self.df.writeint(skill)
+        self.df.write_record('%dI' % (len(self.skills)),
+                             list(self.skills.values()))
 
         # More stats
-        self.df.writeint(self.maxhp)
-        self.df.writeint(self.maxmana)
-        self.df.writeint(self.curhp)
-        self.df.writeint(self.curmana)
-        self.df.writeint(self.experience)
-        self.df.writeint(self.level)
-        self.df.writeint(self.gold)
-        self.df.writeint(self.extra_att_points)
-        self.df.writeint(self.extra_skill_points)
+        self.df.write_record('9I', (self.maxhp,
+                                    self.maxmana,
+                                    self.curhp,
+                                    self.curmana,
+                                    self.experience,
+                                    self.level,
+                                    self.gold,
+                                    self.extra_att_points,
+                                    self.extra_skill_points))
 
         # Statuses
+        statuses = []
         for i in range(len(self.statuses)):
-            self.df.writeint(self.statuses[i])
-            self.df.writeint(self.unknown.sparseiblock[i])
+            statuses.append(self.statuses[i])
+            statuses.append(self.unknown.sparseiblock[i])
+        self.df.write_record('%dI' % (len(statuses)), statuses)
 
         # More unknowns
-        for unknown in self.unknown.iblock1:
-            self.df.writeint(unknown)
+        self.df.write_record('%dI' % (len(self.unknown.iblock1)),
+                             self.unknown.iblock1)
         for i in range(len(self.unknown.ssiblocks1)):
             self.df.writestr(self.unknown.ssiblocks1[i])
             self.df.writestr(self.unknown.ssiblocks2[i])
@@ -571,49 +585,37 @@ class B1Character(Character):
         self.df.writestr(self.unknown.extstr1)
         self.df.writestr(self.unknown.extstr2)
 
-        # Torches
-        self.df.writeint(self.torches)
-        self.df.writeint(self.torchused)
-
-        # Further unknown
-        self.df.writeint(self.unknown.anotherzero)
+        # Torches, and a further unknown
+        self.df.write_record('3I', (self.torches,
+                                    self.torchused,
+                                    self.unknown.anotherzero))
 
         # Most of the spells
-        for spell in self.spells[:-4]:
-            self.df.writeint(spell)
+        self.df.write_record('%dI' % (len(self.spells[:-4])), self.spells[:-4])
 
         # Readied Spells
         for slot in self.readyslots:
             self.df.writestr(slot[0])
             self.df.writeint(slot[1])
 
-        # Position/orientation
-        self.df.writeint(self.orientation)
-        self.df.writeint(self.xpos)
-        self.df.writeint(self.ypos)
-
-        # Visual FX
-        for fx in self.fxblock:
-            self.df.writeint(fx)
-
-        # Unknown
-        self.df.writeint(self.unknown.anotherint)
-
-        # Profile pic
-        self.df.writeint(self.picid)
-
-        # Disease
-        self.df.writeint(self.disease)
+        # Position/orientation, visual FX, an unknown, profile pic, disease,
+        # and an unknown short
+        self.df.write_record('3I%dI3IH' % (len(self.fxblock)),
+                             [self.orientation, self.xpos, self.ypos] +
+                             self.fxblock +
+                             [self.unknown.anotherint,
+                              self.picid,
+                              self.disease,
+                              self.unknown.shortval])
 
         # More unknowns
-        self.df.writeshort(self.unknown.shortval)
         self.df.writestr(self.unknown.emptystr)
-        for val in self.unknown.iblock2:
-            self.df.writeint(val)
+        self.df.write_record('%dI' % (len(self.unknown.iblock2)),
+                             self.unknown.iblock2)
         self.df.writestr(self.unknown.preinvs1)
         self.df.writestr(self.unknown.preinvs2)
-        self.df.writeint(self.unknown.preinvzero1)
-        self.df.writeint(self.unknown.preinvzero2)
+        self.df.write_record('II', (self.unknown.preinvzero1,
+                                    self.unknown.preinvzero2))
 
         # Inventory
         for row in self.inventory:
@@ -648,9 +650,6 @@ class B1Character(Character):
         if self.unknown.extradata:
             self.df.writestr(self.unknown.extradata)
 
-        # Clean up
-        self.df.close()
-
     def _sub_replicate(self, newchar):
         """
         Replicate our Book 1 specific data
@@ -741,49 +740,49 @@ class B2Character(Character):
 
             # Character info
             self.name = self.df.readstr().decode('UTF-8')
-            self.gender = self.df.readuchar()
-            self.origin = self.df.readuchar()
-            self.axiom = self.df.readuchar()
-            self.classname = self.df.readuchar()
-            self.unknown.version = self.df.readuchar()
+            (self.gender,
+             self.origin,
+             self.axiom,
+             self.classname,
+             self.unknown.version) = self.df.read_record('5B')
             if self.unknown.version == 1:
                 LOG.verbose("read unknown value (expect !=1): {}".format(
                     self.unknown.version))
                 raise LoadException(
                     'This savegame was probably saved in v1.02 of Book 2, only 1.03 and higher is supported')
-            self.strength = self.df.readuchar()
-            self.dexterity = self.df.readuchar()
-            self.endurance = self.df.readuchar()
-            self.speed = self.df.readuchar()
-            self.intelligence = self.df.readuchar()
-            self.wisdom = self.df.readuchar()
-            self.perception = self.df.readuchar()
-            self.concentration = self.df.readuchar()
+            (self.strength,
+             self.dexterity,
+             self.endurance,
+             self.speed,
+             self.intelligence,
+             self.wisdom,
+             self.perception,
+             self.concentration) = self.df.read_record('8B')
 
             # Skills
-            for key in sorted(c.skilltable.keys()):
-                self.addskill(key, self.df.readuchar())
+            skillkeys = sorted(c.skilltable.keys())
+            for (key, level) in zip(skillkeys, self.df.read_record('%dB' % (len(skillkeys)))):
+                self.addskill(key, level)
 
             # More stats
-            self.extra_att_points = self.df.readuchar()
-            self.extra_skill_points = self.df.readuchar()
-            self.maxhp = self.df.readint()
-            self.maxmana = self.df.readint()
-            self.curhp = self.df.readint()
-            self.curmana = self.df.readint()
-            self.experience = self.df.readint()
-            self.level = self.df.readint()
-            self.hunger = self.df.readint()
-            self.thirst = self.df.readint()
+            (self.extra_att_points,
+             self.extra_skill_points,
+             self.maxhp,
+             self.maxmana,
+             self.curhp,
+             self.curmana,
+             self.experience,
+             self.level,
+             self.hunger,
+             self.thirst) = self.df.read_record('BB8I')
 
             # FX block
-            for i in range(7):
-                self.fxblock.append(self.df.readint())
+            self.fxblock.extend(self.df.read_record('7I'))
 
             # Non-permanent Chracter Statuses (will expire automatically)
-            for i in range(26):
-                self.statuses.append(self.df.readint())
-                self.statuses_extra.append(self.df.readint())
+            statuses = self.df.read_record('52I')
+            self.statuses.extend(statuses[0::2])
+            self.statuses_extra.extend(statuses[1::2])
 
             # Portal anchor locations
             for i in range(6):
@@ -799,8 +798,7 @@ class B2Character(Character):
                 self.unknown.zero1))
 
             # Spells
-            for i in range(len(c.spelltable)):
-                self.addspell()
+            self.spells.extend(self.df.read_record('%dB' % (len(c.spelltable))))
 
             # Currently-readied spell
             self.readied_spell = self.df.readstr().decode('UTF-8')
@@ -811,46 +809,43 @@ class B2Character(Character):
                 self.addreadyslot(self.df.readstr().decode('UTF-8'), self.df.readuchar())
 
             # Alchemy Recipes
-            for i in range(25):
-                self.addalchemy()
+            self.alchemy_book.extend(self.df.read_record('25I'))
 
             # Some unknown values (zeroes so far)
-            for i in range(14):
-                new_val = self.df.readint()
+            for new_val in self.df.read_record('14I'):
                 self.unknown.zeros.append(new_val)
                 LOG.spam("read unknown value (expect 0): {}".format(new_val))
 
-            # Position/orientation
-            self.orientation = self.df.readuchar()
-            self.xpos = self.df.readint()
-            self.ypos = self.df.readint()
+            # Position/orientation, a few unknowns, permanent statuses, and
+            # some more stats
+            values = self.df.read_record('BII5B3IBI4I')
+            (self.orientation, self.xpos, self.ypos) = values[:3]
 
             # Some unknowns
-            for i in range(5):
-                new_val = self.df.readuchar()
+            for new_val in values[3:8]:
                 self.unknown.strangeblock.append(new_val)
                 LOG.spam("read unknown value (expect ?): {}".format(new_val))
-            self.unknown.unknowni1 = self.df.readint()
+            (self.unknown.unknowni1,
+             self.unknown.unknowni2,
+             self.unknown.unknowni3,
+             self.unknown.usually_one) = values[8:12]
             LOG.spam("read unknown value (expect ?): {}".format(
                 self.unknown.unknowni1))
-            self.unknown.unknowni2 = self.df.readint()
             LOG.spam("read unknown value (expect ?): {}".format(
                 self.unknown.unknowni2))
-            self.unknown.unknowni3 = self.df.readint()
             LOG.spam("read unknown value (expect ?): {}".format(
                 self.unknown.unknowni3))
-            self.unknown.usually_one = self.df.readuchar()
             LOG.spam("read unknown value (expect 1): {}".format(
                 self.unknown.usually_one))
 
             # Permanent Statuses (bitfield)
-            self.permstatuses = self.df.readint()
+            self.permstatuses = values[12]
 
             # More stats
-            self.picid = self.df.readint()
-            self.gold = self.df.readint()
-            self.torches = self.df.readint()
-            self.torchused = self.df.readint()
+            (self.picid,
+             self.gold,
+             self.torches,
+             self.torchused) = values[13:]
 
             # Keyring
             for i in range(20):
@@ -863,8 +858,7 @@ class B2Character(Character):
             self.unknown.unknownstr1 = self.df.readstr().decode('UTF-8')
             LOG.spam("read unknown value (expect ?): {}".format(
                 self.unknown.unknowns2))
-            for i in range(29):
-                new_val = self.df.readuchar()
+            for new_val in self.df.read_record('29B'):
                 self.unknown.twentyninezeros.append(new_val)
                 LOG.spam("read unknown value (expect ?): {}".format(new_val))
             self.unknown.unknownstr2 = self.df.readstr().decode('UTF-8')
@@ -919,54 +913,53 @@ class B2Character(Character):
         except (IOError, struct.error) as e:
             raise LoadException(str(e))
 
-    def write(self):
-        """ Writes out the save file. """
-
-        self.df.open_w()
+    def _sub_write(self):
+        """ Writes out the save file contents. """
 
         # Initial Zero
         self.df.writeuchar(self.unknown.initzero)
 
         # Character info
         self.df.writestr(self.name)
-        self.df.writeuchar(self.gender)
-        self.df.writeuchar(self.origin)
-        self.df.writeuchar(self.axiom)
-        self.df.writeuchar(self.classname)
-        self.df.writeuchar(self.unknown.version)
-        self.df.writeuchar(self.strength)
-        self.df.writeuchar(self.dexterity)
-        self.df.writeuchar(self.endurance)
-        self.df.writeuchar(self.speed)
-        self.df.writeuchar(self.intelligence)
-        self.df.writeuchar(self.wisdom)
-        self.df.writeuchar(self.perception)
-        self.df.writeuchar(self.concentration)
+        self.df.write_record('13B', (self.gender,
+                                     self.origin,
+                                     self.axiom,
+                                     self.classname,
+                                     self.unknown.version,
+                                     self.strength,
+                                     self.dexterity,
+                                     self.endurance,
+                                     self.speed,
+                                     self.intelligence,
+                                     self.wisdom,
+                                     self.perception,
+                                     self.concentration))
 
         # Skills
-        for skill in list(self.skills.values()):
-            self.df.writeuchar(skill)
+        self.df.write_record('%dB' % (len(self.skills)),
+                             list(self.skills.values()))
 
         # More stats
-        self.df.writeuchar(self.extra_att_points)
-        self.df.writeuchar(self.extra_skill_points)
-        self.df.writeint(self.maxhp)
-        self.df.writeint(self.maxmana)
-        self.df.writeint(self.curhp)
-        self.df.writeint(self.curmana)
-        self.df.writeint(self.experience)
-        self.df.writeint(self.level)
-        self.df.writeint(self.hunger)
-        self.df.writeint(self.thirst)
+        self.df.write_record('BB8I', (self.extra_att_points,
+                                      self.extra_skill_points,
+                                      self.maxhp,
+                                      self.maxmana,
+                                      self.curhp,
+                                      self.curmana,
+                                      self.experience,
+                                      self.level,
+                                      self.hunger,
+                                      self.thirst))
 
         # FX Block
-        for fx in self.fxblock:
-            self.df.writeint(fx)
+        self.df.write_record('%dI' % (len(self.fxblock)), self.fxblock)
 
         # Non-permanent statuses
+        statuses = []
         for (status, extra) in zip(self.statuses, self.statuses_extra):
-            self.df.writeint(status)
-            self.df.writeint(extra)
+            statuses.append(status)
+            statuses.append(extra)
+        self.df.write_record('%dI' % (len(statuses)), statuses)
 
         # Portal anchor locations
         for anchor in self.portal_locs:
@@ -978,8 +971,7 @@ class B2Character(Character):
         self.df.writeuchar(self.unknown.zero1)
 
         # Spells
-        for spell in self.spells:
-            self.df.writeuchar(spell)
+        self.df.write_record('%dB' % (len(self.spells)), self.spells)
 
         # Readied Spells
         self.df.writestr(self.readied_spell)
@@ -989,34 +981,27 @@ class B2Character(Character):
             self.df.writeuchar(level)
 
         # Alchemy Recipes
-        for recipe in self.alchemy_book:
-            self.df.writeint(recipe)
+        self.df.write_record('%dI' % (len(self.alchemy_book)),
+                             self.alchemy_book)
 
         # Unknowns
-        for zero in self.unknown.zeros:
-            self.df.writeint(zero)
-
-        # Position/orientation
-        self.df.writeuchar(self.orientation)
-        self.df.writeint(self.xpos)
-        self.df.writeint(self.ypos)
-
-        # More unknowns
-        for val in self.unknown.strangeblock:
-            self.df.writeuchar(val)
-        self.df.writeint(self.unknown.unknowni1)
-        self.df.writeint(self.unknown.unknowni2)
-        self.df.writeint(self.unknown.unknowni3)
-        self.df.writeuchar(self.unknown.usually_one)
-
-        # Permanent statuses
-        self.df.writeint(self.permstatuses)
-
-        # More stats
-        self.df.writeint(self.picid)
-        self.df.writeint(self.gold)
-        self.df.writeint(self.torches)
-        self.df.writeint(self.torchused)
+        self.df.write_record('%dI' % (len(self.unknown.zeros)),
+                             self.unknown.zeros)
+
+        # Position/orientation, more unknowns, permanent statuses, and
+        # more stats
+        self.df.write_record('BII%dB3IBI4I' % (len(self.unknown.strangeblock)),
+                             [self.orientation, self.xpos, self.ypos] +
+                             self.unknown.strangeblock +
+                             [self.unknown.unknowni1,
+                              self.unknown.unknowni2,
+                              self.unknown.unknowni3,
+                              self.unknown.usually_one,
+                              self.permstatuses,
+                              self.picid,
+                              self.gold,
+                              self.torches,
+                              self.torchused])
 
         # Keyring
         for key in self.keyring:
@@ -1025,8 +1010,8 @@ class B2Character(Character):
         # Yet more unknowns
         self.df.writeshort(self.unknown.unknowns1)
         self.df.writestr(self.unknown.unknownstr1)
-        for zero in self.unknown.twentyninezeros:
-            self.df.writeuchar(zero)
+        self.df.write_record('%dB' % (len(self.unknown.twentyninezeros)),
+                             self.unknown.twentyninezeros)
         self.df.writestr(self.unknown.unknownstr2)
         self.df.writestr(self.unknown.unknownstr3)
         self.df.writeshort(self.unknown.unknowns2)
@@ -1064,9 +1049,6 @@ class B2Character(Character):
         if self.unknown.extradata:
             self.df.writestr(self.unknown.extradata)
 
-        # Clean up
-        self.df.close()
-
     def _sub_replicate(self, newchar):
         """
         Replicate our Book 2 specific data
@@ -1181,47 +1163,47 @@ class B3Character(Character):
 
             # Character info
             self.name = self.df.readstr().decode('UTF-8')
-            self.gender = self.df.readuchar()
-            self.origin = self.df.readuchar()
-            self.axiom = self.df.readuchar()
-            self.classname = self.df.readuchar()
-            self.unknown.version = self.df.readuchar()
+            (self.gender,
+             self.origin,
+             self.axiom,
+             self.classname,
+             self.unknown.version) = self.df.read_record('5B')
             if self.unknown.version == 1:
                 raise LoadException(
                     'This savegame was probably saved in v1.02 of Book 2, only 1.03 and higher is supported')
-            self.strength = self.df.readuchar()
-            self.dexterity = self.df.readuchar()
-            self.endurance = self.df.readuchar()
-            self.speed = self.df.readuchar()
-            self.intelligence = self.df.readuchar()
-            self.wisdom = self.df.readuchar()
-            self.perception = self.df.readuchar()
-            self.concentration = self.df.readuchar()
+            (self.strength,
+             self.dexterity,
+             self.endurance,
+             self.speed,
+             self.intelligence,
+             self.wisdom,
+             self.perception,
+             self.concentration) = self.df.read_record('8B')
 
             # Skills
-            for key in sorted(c.skilltable.keys()):
-                self.addskill(key, self.df.readuchar())
+            skillkeys = sorted(c.skilltable.keys())
+            for (key, level) in zip(skillkeys, self.df.read_record('%dB' % (len(skillkeys)))):
+                self.addskill(key, level)
 
             # More stats
-            self.extra_att_points = self.df.readuchar()
-            self.extra_skill_points = self.df.readuchar()
-            self.maxhp = self.df.readint()
-            self.maxmana = self.df.readint()
-            self.curhp = self.df.readint()
-            self.curmana = self.df.readint()
-            self.experience = self.df.readint()
-            self.level = self.df.readint()
-            self.hunger = self.df.readint()
-            self.thirst = self.df.readint()
+            (self.extra_att_points,
+             self.extra_skill_points,
+             self.maxhp,
+             self.maxmana,
+             self.curhp,
+             self.curmana,
+             self.experience,
+             self.level,
+             self.hunger,
+             self.thirst) = self.df.read_record('BB8I')
 
             # FX block
-            for i in range(7):
-                self.fxblock.append(self.df.readint())
+            self.fxblock.extend(self.df.read_record('7I'))
 
             # Non-permanent Chracter Statuses (will expire automatically)
-            for i in range(30):
-                self.statuses.append(self.df.readint())
-                self.statuses_extra.append(self.df.readint())
+            statuses = self.df.read_record('60I')
+            self.statuses.extend(statuses[0::2])
+            self.statuses_extra.extend(statuses[1::2])
 
             # Portal anchor locations
             for i in range(6):
@@ -1235,8 +1217,7 @@ class B3Character(Character):
             self.unknown.zero1 = self.df.readuchar()
 
             # Spells
-            for i in range(len(c.spelltable)):
-                self.addspell()
+            self.spells.extend(self.df.read_record('%dB' % (len(c.spelltable))))
 
             # Currently-readied spell
             self.readied_spell = self.df.readstr().decode('UTF-8')
@@ -1248,34 +1229,31 @@ class B3Character(Character):
                     'UTF-8'), self.df.readuchar())
 
             # Alchemy Recipes
-            for i in range(27):
-                self.addalchemy()
+            self.alchemy_book.extend(self.df.read_record('27I'))
 
             # Some unknown values (zeroes so far)
-            for i in range(12):
-                self.unknown.zeros.append(self.df.readint())
+            self.unknown.zeros.extend(self.df.read_record('12I'))
 
-            # Position/orientation
-            self.orientation = self.df.readuchar()
-            self.xpos = self.df.readint()
-            self.ypos = self.df.readint()
+            # Position/orientation, a few unknowns, permanent statuses, and
+            # some more stats
+            values = self.df.read_record('BII5B3IBI4I')
+            (self.orientation, self.xpos, self.ypos) = values[:3]
 
             # Some unknowns
-            for i in range(5):
-                self.unknown.strangeblock.append(self.df.readuchar())
-            self.unknown.unknowni1 = self.df.readint()
-            self.unknown.unknowni2 = self.df.readint()
-            self.unknown.unknowni3 = self.df.readint()
-            self.unknown.usually_one = self.df.readuchar()
+            self.unknown.strangeblock.extend(values[3:8])
+            (self.unknown.unknowni1,
+             self.unknown.unknowni2,
+             self.unknown.unknowni3,
+             self.unknown.usually_one) = values[8:12]
 
             # Permanent Statuses (bitfield)
-            self.permstatuses = self.df.readint()
+            self.permstatuses = values[12]
 
             # More stats
-            self.picid = self.df.readint()
-            self.gold = self.df.readint()
-            self.torches = self.df.readint()
-            self.torchused = self.df.readint()
+            (self.picid,
+             self.gold,
+             self.torches,
+             self.torchused) = values[13:]
 
             # Keyring
             for i in range(20):
@@ -1284,8 +1262,7 @@ class B3Character(Character):
             # More unknowns
             self.unknown.unknowns1 = self.df.readshort()
             self.unknown.unknownstr1 = self.df.readstr().decode('UTF-8')
-            for i in range(29):
-                self.unknown.twentyninezeros.append(self.df.readuchar())
+            self.unknown.twentyninezeros.extend(self.df.read_record('29B'))
             self.unknown.unknownstr2 = self.df.readstr().decode('UTF-8')
             self.unknown.unknownstr3 = self.df.readstr().decode('UTF-8')
             self.unknown.unknowns2 = self.df.readshort()
@@ -1331,54 +1308,53 @@ class B3Character(Character):
         except (IOError, struct.error) as e:
             raise
 
-    def write(self):
-        """ Writes out the save file. """
-
-        self.df.open_w()
+    def _sub_write(self):
+        """ Writes out the save file contents. """
 
         # Initial Zero
         self.df.writeuchar(self.unknown.initzero)
 
         # Character info
         self.df.writestr(self.name)
-        self.df.writeuchar(self.gender)
-        self.df.writeuchar(self.origin)
-        self.df.writeuchar(self.axiom)
-        self.df.writeuchar(self.classname)
-        self.df.writeuchar(self.unknown.version)
-        self.df.writeuchar(self.strength)
-        self.df.writeuchar(self.dexterity)
-        self.df.writeuchar(self.endurance)
-        self.df.writeuchar(self.speed)
-        self.df.writeuchar(self.intelligence)
-        self.df.writeuchar(self.wisdom)
-        self.df.writeuchar(self.perception)
-        self.df.writeuchar(self.concentration)
+        self.df.write_record('13B', (self.gender,
+                                     self.origin,
+                                     self.axiom,
+                                     self.classname,
+                                     self.unknown.version,
+                                     self.strength,
+                                     self.dexterity,
+                                     self.endurance,
+                                     self.speed,
+                                     self.intelligence,
+                                     self.wisdom,
+                                     self.perception,
+                                     self.concentration))
 
         # Skills
-        for skill in list(self.skills.values()):
-            self.df.writeuchar(skill)
+        self.df.write_record('%dB' % (len(self.skills)),
+                             list(self.skills.values()))
 
         # More stats
-        self.df.writeuchar(self.extra_att_points)
-        self.df.writeuchar(self.extra_skill_points)
-        self.df.writeint(self.maxhp)
-        self.df.writeint(self.maxmana)
-        self.df.writeint(self.curhp)
-        self.df.writeint(self.curmana)
-        self.df.writeint(self.experience)
-        self.df.writeint(self.level)
-        self.df.writeint(self.hunger)
-        self.df.writeint(self.thirst)
+        self.df.write_record('BB8I', (self.extra_att_points,
+                                      self.extra_skill_points,
+                                      self.maxhp,
+                                      self.maxmana,
+                                      self.curhp,
+                                      self.curmana,
+                                      self.experience,
+                                      self.level,
+                                      self.hunger,
+                                      self.thirst))
 
         # FX Block
-        for fx in self.fxblock:
-            self.df.writeint(fx)
+        self.df.write_record('%dI' % (len(self.fxblock)), self.fxblock)
 
         # Non-permanent statuses
+        statuses = []
         for (status, extra) in zip(self.statuses, self.statuses_extra):
-            self.df.writeint(status)
-            self.df.writeint(extra)
+            statuses.append(status)
+            statuses.append(extra)
+        self.df.write_record('%dI' % (len(statuses)), statuses)
 
         # Portal anchor locations
         for anchor in self.portal_locs:
@@ -1390,8 +1366,7 @@ class B3Character(Character):
         self.df.writeuchar(self.unknown.zero1)
 
         # Spells
-        for spell in self.spells:
-            self.df.writeuchar(spell)
+        self.df.write_record('%dB' % (len(self.spells)), self.spells)
 
         # Readied Spells
         self.df.writestr(self.readied_spell)
@@ -1401,34 +1376,27 @@ class B3Character(Character):
             self.df.writeuchar(level)
 
         # Alchemy Recipes
-        for recipe in self.alchemy_book:
-            self.df.writeint(recipe)
+        self.df.write_record('%dI' % (len(self.alchemy_book)),
+                             self.alchemy_book)
 
         # Unknowns
-        for zero in self.unknown.zeros:
-            self.df.writeint(zero)
-
-        # Position/orientation
-        self.df.writeuchar(self.orientation)
-        self.df.writeint(self.xpos)
-        self.df.writeint(self.ypos)
-
-        # More unknowns
-        for val in self.unknown.strangeblock:
-            self.df.writeuchar(val)
-        self.df.writeint(self.unknown.unknowni1)
-        self.df.writeint(self.unknown.unknowni2)
-        self.df.writeint(self.unknown.unknowni3)
-        self.df.writeuchar(self.unknown.usually_one)
-
-        # Permanent statuses
-        self.df.writeint(self.permstatuses)
-
-        # More stats
-        self.df.writeint(self.picid)
-        self.df.writeint(self.gold)
-        self.df.writeint(self.torches)
-        self.df.writeint(self.torchused)
+        self.df.write_record('%dI' % (len(self.unknown.zeros)),
+                             self.unknown.zeros)
+
+        # Position/orientation, more unknowns, permanent statuses, and
+        # more stats
+        self.df.write_record('BII%dB3IBI4I' % (len(self.unknown.strangeblock)),
+                             [self.orientation, self.xpos, self.ypos] +
+                             self.unknown.strangeblock +
+                             [self.unknown.unknowni1,
+                              self.unknown.unknowni2,
+                              self.unknown.unknowni3,
+                              self.unknown.usually_one,
+                              self.permstatuses,
+                              self.picid,
+                              self.gold,
+                              self.torches,
+                              self.torchused])
 
         # Keyring
         for key in self.keyring:
@@ -1437,8 +1405,8 @@ class B3Character(Character):
         # Yet more unknowns
         self.df.writeshort(self.unknown.unknowns1)
         self.df.writestr(self.unknown.unknownstr1)
-        for zero in self.unknown.twentyninezeros:
-            self.df.writeuchar(zero)
+        self.df.write_record('%dB' % (len(self.unknown.twentyninezeros)),
+                             self.unknown.twentyninezeros)
         self.df.writestr(self.unknown.unknownstr2)
         self.df.writestr(self.unknown.unknownstr3)
         self.df.writeshort(self.unknown.unknowns2)
@@ -1476,9 +1444,6 @@ class B3Character(Character):
         if self.unknown.extradata:
             self.df.writestr(self.unknown.extradata)
 
-        # Clean up
-        self.df.close()
-
     def _sub_replicate(self, newchar):
         """
         Replicate our Book 2 specific data
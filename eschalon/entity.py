@@ -21,6 +21,7 @@ import logging
 
 from eschalon.constants import constants as c
 from eschalon.savefile import FirstItemLoadException, LoadException
+from eschalon.schema import STR, Field, Schema
 
 LOG = logging.getLogger(__name__)
 
@@ -28,6 +29,32 @@ LOG = logging.getLogger(__name__)
 class Entity(object):
     """ A class to hold data about a particular entity on a map. """
 
+    __slots__ = ('savegame', 'entid', 'x', 'y', 'direction', 'entscript',
+                 'movement', 'friendly', 'frame', 'health', 'initial_loc')
+
+    # Our on-disk layout (see eschalon.schema), which also drives
+    # replication and equality
+    schema = None  # type: Schema
+
+    @staticmethod
+    def build_schema(*extra):
+        """
+        Returns the schema shared by all books, with the given extra
+        savegame-only fields tacked on to the end.
+        """
+        return Schema(
+            Field('entid', 'B'),
+            Field('x', 'B'),
+            Field('y', 'B'),
+            Field('direction', 'B'),
+            Field('entscript', STR),
+            Field('friendly', 'B', savegame=True),
+            Field('movement', 'B', savegame=True),
+            Field('health', 'I', savegame=True),
+            Field('frame', 'B', savegame=True),
+            Field('initial_loc', 'I', savegame=True),
+            *extra)
+
     def __init__(self, savegame=True):
         """ A fresh object with no data. """
 
@@ -68,34 +95,27 @@ class Entity(object):
         """
         pass
 
+    def read(self, df):
+        """ Given a file descriptor, read in the entity. """
+
+        # We throw an exception because there seems to be an arbitrary
+        # number of entities in the file, and no 'entity count' anywhere.
+        # TODO: verify that the count isn't in the main map file.
+        if df.eof():
+            raise FirstItemLoadException('Reached EOF')
+
+        # ... everything else
+        self.schema.read(self, df, self.savegame)
+
+    def write(self, df):
+        """ Write the entity to the file. """
+        self.schema.write(self, df, self.savegame)
+
     def replicate(self):
         newentity = Entity.new(self.book, self.savegame)
-
-        # Simple Values
-        newentity.savegame = self.savegame
-        newentity.entid = self.entid
-        newentity.x = self.x
-        newentity.y = self.y
-        newentity.direction = self.direction
-        newentity.entscript = self.entscript
-        newentity.friendly = self.friendly
-        newentity.frame = self.frame
-        newentity.health = self.health
-        newentity.initial_loc = self.initial_loc
-        newentity.movement = self.movement
-
-        # Call out to superclass replication
-        self._sub_replicate(newentity)
-
-        # ... aaand return our new object
+        self.schema.copy(self, newentity)
         return newentity
 
-    def _sub_replicate(self, newentity):
-        """
-        Stub for superclasses to override, to replicate specific vars
-        """
-        pass
-
     def _convert_savegame(self, savegame):
         """
         Converts ourself to a savegame or global object.  This should be
@@ -122,24 +142,8 @@ class Entity(object):
         checking if our values are the same, NOT if we're *actually*
         the same object.  Returns true for equality, false for inequality.
         """
-        return (self._sub_equals(entity) and
-                self.x == entity.x and
-                self.y == entity.y and
-                self.entid == entity.entid and
-                self.direction == entity.direction and
-                self.entscript == entity.entscript and
-                self.savegame == entity.savegame and
-                self.friendly == entity.friendly and
-                self.frame == entity.frame and
-                self.health == entity.health and
-                self.initial_loc == entity.initial_loc and
-                self.movement == entity.movement)
-
-    def _sub_equals(self, entity):
-        """
-        Stub for superclasses to override, to test specific vars
-        """
-        pass
+        return (self.savegame == entity.savegame and
+                self.schema.equals(self, entity))
 
     def set_initial(self, x, y):
         """
@@ -200,7 +204,10 @@ class B1Entity(Entity):
     Entity structure for Book 1
     """
 
+    __slots__ = ()
+
     book = 1
+    schema = Entity.build_schema()
     form_elements = [
         'wall_01_label', 'wall_01',
         'wall_04_label', 'wall_04',
@@ -217,51 +224,18 @@ class B1Entity(Entity):
         'map_b1_outsideflag_label', 'map_b1_outsideflag',
     ]
 
-    def read(self, df):
-        """ Given a file descriptor, read in the entity. """
-
-        # We throw an exception because there seems to be an arbitrary
-        # number of entities in the file, and no 'entity count' anywhere.
-        # TODO: verify that the count isn't in the main map file.
-        if df.eof():
-            raise FirstItemLoadException('Reached EOF')
-
-        # ... everything else
-        self.entid = df.readuchar()
-        self.x = df.readuchar()
-        self.y = df.readuchar()
-        self.direction = df.readuchar()
-        self.entscript = df.readstr().decode('UTF-8')
-        if self.savegame:
-            self.friendly = df.readuchar()
-            self.movement = df.readuchar()
-            self.health = df.readint()
-            self.frame = df.readuchar()
-            self.initial_loc = df.readint()
-
-    def write(self, df):
-        """ Write the entity to the file. """
-
-        df.writeuchar(self.entid)
-        df.writeuchar(self.x)
-        df.writeuchar(self.y)
-        df.writeuchar(self.direction)
-        df.writestr(self.entscript)
-        if self.savegame:
-            df.writeuchar(self.friendly)
-            df.writeuchar(self.movement)
-            df.writeint(self.health)
-            df.writeuchar(self.frame)
-            df.writeint(self.initial_loc)
-
 
 class B2Entity(Entity):
     """
     Entity structure for Book 2
     """
 
+    __slots__ = ('statuses',)
+
     book = 2
     num_statuses = 26
+    schema = Entity.build_schema(
+        Field('statuses', 'I', savegame=True, count=num_statuses))
     form_elements = [
         'huge_gfx_button',
         'decalpref_snow', 'decalpref_lava',
@@ -295,78 +269,25 @@ class B2Entity(Entity):
         for i in range(self.num_statuses):
             self.statuses.append(0)
 
-    def _sub_replicate(self, newentity):
-        """
-        Replication for B2 elements
-        """
-        newentity.statuses = []
-        for status in self.statuses:
-            newentity.statuses.append(status)
-
-    def _sub_equals(self, entity):
-        """
-        Equality function for B2
-        """
-        if len(self.statuses) != len(entity.statuses):
-            return False
-        for (mystatus, newstatus) in zip(self.statuses, entity.statuses):
-            if mystatus != newstatus:
-                return False
-        return True
-
     def read(self, df):
         """ Given a file descriptor, read in the entity. """
-
-        # We throw an exception because there seems to be an arbitrary
-        # number of entities in the file, and no 'entity count' anywhere.
-        # TODO: verify that the count isn't in the main map file.
-        if df.eof():
-            raise FirstItemLoadException('Reached EOF')
-
-        # ... everything else
         try:
-            self.entid = df.readuchar()
-            self.x = df.readuchar()
-            self.y = df.readuchar()
-            self.direction = df.readuchar()
-            self.entscript = df.readstr().decode('UTF-8')
-            if self.savegame:
-                self.friendly = df.readuchar()
-                self.movement = df.readuchar()
-                self.health = df.readint()
-                self.frame = df.readuchar()
-                self.initial_loc = df.readint()
-                self.statuses = []
-                for i in range(self.num_statuses):
-                    self.statuses.append(df.readint())
+            super(B2Entity, self).read(df)
         except LoadException:
             raise FirstItemLoadException('Reached EOF')
 
-    def write(self, df):
-        """ Write the entity to the file. """
-
-        df.writeuchar(self.entid)
-        df.writeuchar(self.x)
-        df.writeuchar(self.y)
-        df.writeuchar(self.direction)
-        df.writestr(self.entscript)
-        if self.savegame:
-            df.writeuchar(self.friendly)
-            df.writeuchar(self.movement)
-            df.writeint(self.health)
-            df.writeuchar(self.frame)
-            df.writeint(self.initial_loc)
-            for status in self.statuses:
-                df.writeint(status)
-
 
 class B3Entity(B2Entity):
     """
     Entity structure for Book 3
     """
 
+    __slots__ = ()
+
     book = 3
     num_statuses = 30
+    schema = Entity.build_schema(
+        Field('statuses', 'I', savegame=True, count=num_statuses))
     form_elements = [
         'huge_gfx_button',
         'decalpref_snow', 'decalpref_lava',
@@ -18,25 +18,105 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 import base64
+import bisect
 import csv
-import glob
+import hashlib
 import io
 import logging
+import marshal
 import os
+import shutil
+import struct
+import tempfile
+import threading
 import zipfile
+import zlib
 from typing import Optional
 
 from Crypto.Cipher import AES
 
+from eschalon import lru
 from eschalon.constants import constants as c
-from eschalon.savefile import LoadException
+from eschalon.savefile import LoadException, PositionalReader
+from eschalon.vfs import SOURCE_DATAPAK, SOURCE_FILE, GameVFS
 
 LOG = logging.getLogger(__name__)
 
 
+# If set, Datapak reads members with its own decrypter (see ZipCrypto)
+# rather than going through zipfile's.
 fast_zipfile = True
 
 
+def _crc_table():
+    """ Builds the standard CRC-32 lookup table used by ZipCrypto """
+    table = []
+    for i in range(256):
+        crc = i
+        for j in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xEDB88320
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+class ZipCrypto(object):
+    """
+    The traditional PKWARE zip encryption, as used by our datapak.  This
+    does the same job as zipfile's internal decrypter, but with the key
+    updates inlined into a single loop, and with the keystream byte
+    looked up from a table (it only depends on the low 16 bits of the
+    third key) rather than computed.  The cipher feeds each plaintext
+    byte back into the keys, so there's no way to hand the work off to
+    anything vectorized; this is about as fast as pure Python gets.
+    """
+
+    CRC_TABLE = _crc_table()
+    KEYSTREAM_TABLE = bytes([(((k | 2) * ((k | 2) ^ 1)) >> 8) & 0xFF
+                             for k in range(65536)])
+
+    __slots__ = ('key0', 'key1', 'key2')
+
+    def __init__(self, password):
+        self.key0 = 305419896
+        self.key1 = 591751049
+        self.key2 = 878082192
+        self.encrypt(password)
+
+    def decrypt(self, data):
+        """ Decrypts the given chunk of data, continuing from the last one """
+        crctable = self.CRC_TABLE
+        keystream = self.KEYSTREAM_TABLE
+        (key0, key1, key2) = (self.key0, self.key1, self.key2)
+        out = []
+        append = out.append
+        for char in data:
+            char ^= keystream[key2 & 0xFFFF]
+            append(char)
+            key0 = (key0 >> 8) ^ crctable[(key0 ^ char) & 0xFF]
+            key1 = ((key1 + (key0 & 0xFF)) * 134775813 + 1) & 0xFFFFFFFF
+            key2 = (key2 >> 8) ^ crctable[(key2 ^ (key1 >> 24)) & 0xFF]
+        (self.key0, self.key1, self.key2) = (key0, key1, key2)
+        return bytes(out)
+
+    def encrypt(self, data):
+        """ Encrypts the given chunk of data, continuing from the last one """
+        crctable = self.CRC_TABLE
+        keystream = self.KEYSTREAM_TABLE
+        (key0, key1, key2) = (self.key0, self.key1, self.key2)
+        out = []
+        append = out.append
+        for char in data:
+            append(char ^ keystream[key2 & 0xFFFF])
+            key0 = (key0 >> 8) ^ crctable[(key0 ^ char) & 0xFF]
+            key1 = ((key1 + (key0 & 0xFF)) * 134775813 + 1) & 0xFFFFFFFF
+            key2 = (key2 >> 8) ^ crctable[(key2 ^ (key1 >> 24)) & 0xFF]
+        (self.key0, self.key1, self.key2) = (key0, key1, key2)
+        return bytes(out)
+
+
 class GoldRanges(object):
     """
     Class to hold information about the gold ranges seen in general_items.csv.
@@ -59,6 +139,51 @@ class GoldRanges(object):
         self.ranges = []
         self.labels = []
         self.max_seen = -1
+        self.breakpoints = None
+        self.owners = None
+
+    def to_data(self):
+        """ Returns our state as plain data, for TableCache """
+        return (self.exact, self.ranges, self.labels, self.max_seen)
+
+    @staticmethod
+    def from_data(data):
+        """ Returns a new GoldRanges from the output of to_data() """
+        goldranges = GoldRanges()
+        (goldranges.exact, goldranges.ranges, goldranges.labels,
+         goldranges.max_seen) = data
+        goldranges.ranges = [tuple(r) for r in goldranges.ranges]
+        return goldranges
+
+    def build_index(self):
+        """
+        Splits the number line up at the edges of all our ranges, so that
+        finding the range a gold amount falls in is a bisect rather than a
+        scan.  Ranges may overlap; each piece is owned by the first range
+        (in file order) which covers it, just like a linear scan would do.
+        """
+        self.breakpoints = sorted(set([begin for (begin, end) in self.ranges] +
+                                      [end + 1 for (begin, end) in self.ranges]))
+        self.owners = []
+        for point in self.breakpoints:
+            owner = None
+            for (idx, (begin, end)) in enumerate(self.ranges):
+                if begin <= point <= end:
+                    owner = idx
+                    break
+            self.owners.append(owner)
+
+    def find_range(self, num_gold):
+        """
+        Returns the index of the first range containing the given amount
+        of gold, or None.
+        """
+        if self.breakpoints is None:
+            self.build_index()
+        idx = bisect.bisect_right(self.breakpoints, num_gold) - 1
+        if idx < 0:
+            return None
+        return self.owners[idx]
 
     def add_item(self, item_name):
         """
@@ -75,6 +200,7 @@ class GoldRanges(object):
                 if len(item_ranges) == 2:
                     self.ranges.append(
                         (int(item_ranges[0]), int(item_ranges[1])))
+                    self.breakpoints = None
                     self.labels.append(parts[0])
                     if int(item_ranges[1]) > self.max_seen:
                         self.max_seen = int(item_ranges[1])
@@ -105,13 +231,15 @@ class GoldRanges(object):
                         # We're already a known specific gold value
                         return item_name
 
-                    for (label, (begin, end)) in zip(self.labels, self.ranges):
-                        if begin <= num_gold <= end:
-                            # We found ourselves in a range we know about
-                            if c.book == 3:
-                                return '%s Gold (%d-%d)' % (label, begin, end)
-                            else:
-                                return '%s Gold' % (label)
+                    idx = self.find_range(num_gold)
+                    if idx is not None:
+                        # We found ourselves in a range we know about
+                        label = self.labels[idx]
+                        (begin, end) = self.ranges[idx]
+                        if c.book == 3:
+                            return '%s Gold (%d-%d)' % (label, begin, end)
+                        else:
+                            return '%s Gold' % (label)
 
                     # If we got here, we didn't have an exact number and also
                     # don't have a valid range.  Just re-run with our max
@@ -123,6 +251,52 @@ class GoldRanges(object):
         return item_name
 
 
+class MaterialIndex(object):
+    """
+    Index of the material-prefixed item names from general_items.csv
+    ("Oak Staff" and the like), used to find the base item name hiding
+    inside a savegame item name.  Rather than testing every one of the
+    (materials * items) names against the item name, we look for the
+    first word of each name (there are only as many of those as there
+    are materials) and then check just the names of the right lengths
+    starting at each spot that word turns up.  The result is the same
+    as checking every name in order and taking the first one which is
+    a substring of the item name.
+    """
+
+    def __init__(self, material_items):
+        """
+        "material_items" is the dict mapping material-prefixed names to
+        their base names, as generated by EschalonData.parse_items().
+        """
+        self.names = {}
+        self.lengths = {}
+        for (order, (key, val)) in enumerate(material_items.items()):
+            self.names[key] = (order, val)
+            word = key.split(' ', 1)[0]
+            if word not in self.lengths:
+                self.lengths[word] = set()
+            self.lengths[word].add(len(key))
+
+    def lookup(self, item_name):
+        """
+        Returns the base name for the material-prefixed name found in
+        "item_name", or None if there isn't one.
+        """
+        best = None
+        for (word, lengths) in self.lengths.items():
+            pos = item_name.find(word)
+            while pos >= 0:
+                for length in lengths:
+                    found = self.names.get(item_name[pos:pos + length])
+                    if found is not None and (best is None or found[0] < best[0]):
+                        best = found
+                pos = item_name.find(word, pos + 1)
+        if best is None:
+            return None
+        return best[1]
+
+
 class EntHelper(object):
     """
     Class to store data about our entities.  Basically just a glorified
@@ -147,6 +321,14 @@ class EntHelper(object):
         self.frames = frames
         self.entscript = entscript
 
+    # Our attributes, in constructor order; see to_data()
+    FIELDS = ('name', 'health', 'gfxfile', 'friendly', 'movement', 'dirs',
+              'width', 'height', 'frames', 'entscript')
+
+    def to_data(self):
+        """ Returns our attributes as a tuple, for TableCache """
+        return tuple([getattr(self, field) for field in self.FIELDS])
+
 
 class Datapak(object):
     """
@@ -156,45 +338,464 @@ class Datapak(object):
     wouldn't actually prevent anyone from getting to the data, but I feel
     obligated to go through the motions regardless.  Hi there!  Note that I 
     *did* get BW's permission to access the graphics data this way.
+
+    Members can be read from multiple threads at once.  zlib inflation
+    releases the GIL, though the decryption itself doesn't.
     """
 
+    # Local file header, up to (but not including) the filename
+    LOCAL_HEADER = struct.Struct('<4s5H3I2H')
+    LOCAL_MAGIC = b'PK\x03\x04'
+
+    # How much of a member we read, decrypt and inflate at a time, both
+    # when reading the whole thing and when streaming (see open_member())
+    CHUNK_SIZE = 65536
+    STREAM_CHUNK_SIZE = 2048
+
     def __init__(self, filename):
         self.filename = filename
 
         if not os.path.isfile(filename):
             raise LoadException('Datapak %s is not found' % (filename))
 
+        self.password = self.get_password()
+        self.cache_key = lru.file_key(os.path.abspath(filename), os.stat(filename))
+
+        # zipfile parses the central directory for us, once; after that
+        # we only use it to look up members.  Member data is read through
+        # self.reader, which any number of threads can share.
+        self.zipobj = zipfile.ZipFile(filename, 'r')
+        self.zipobj.setpassword(self.password)
+        self.reader = PositionalReader(filename)
+
+        # Per-thread ZipFile objects, for when fast_zipfile is off
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.zipobjs = []
+
+    @staticmethod
+    def get_password():
+        """
+        Returns the password for the current book's datapak.
+        """
         s = base64.urlsafe_b64decode(c.s)
         d = base64.urlsafe_b64decode(c.d)
         iv = d[:16]
-        self.aesenc = d[16:]
-        self.aes = AES.new(s, AES.MODE_CBC, iv)
-
-        plain = self.aes.decrypt(self.aesenc)
-        pad = ord(plain[-1])
-        text = plain[:-pad]
+        aes = AES.new(s, AES.MODE_CBC, iv)
 
-        self.zipobj = zipfile.ZipFile(filename, 'r')
-        self.zipobj.setpassword(text)
+        plain = aes.decrypt(d[16:])
+        pad = plain[-1]
+        return plain[:-pad]
 
-    def readfile(self, filename, directory='gfx'):
+    def thread_zipobj(self):
         """
-        Reads a given filename from the given dir.  Can raise a LoadException
-        if the file is not found
+        Returns a ZipFile for the datapak which belongs to the current
+        thread, since a ZipFile's file position is shared by everything
+        reading from it.
+        """
+        zipobj = getattr(self.local, 'zipobj', None)
+        if zipobj is None:
+            zipobj = zipfile.ZipFile(self.filename, 'r')
+            zipobj.setpassword(self.password)
+            self.local.zipobj = zipobj
+            with self.lock:
+                self.zipobjs.append(zipobj)
+        return zipobj
+
+    def close(self):
+        """ Closes all of the files we have open on the datapak """
+        self.zipobj.close()
+        self.reader.close()
+        with self.lock:
+            for zipobj in self.zipobjs:
+                zipobj.close()
+            self.zipobjs = []
+        self.local = threading.local()
+
+    def get_info(self, filename):
+        """
+        Returns the ZipInfo for the given full member name, raising a
+        LoadException if it's not present.
         """
-        filename = '%s/%s' % (directory, filename)
         try:
-            return self.zipobj.read(filename)
+            return self.zipobj.getinfo(filename)
         except KeyError:
             raise LoadException(
                 'Filename %s not found in datapak' % (filename))
 
+    def iter_member(self, info, chunk_size=None):
+        """
+        Generator which reads, decrypts and inflates the member described
+        by the given ZipInfo, yielding its data a chunk at a time (of
+        "chunk_size" compressed bytes, defaulting to CHUNK_SIZE).  The
+        member's CRC is checked once it's been completely read.  Members
+        using anything other than stored or deflated compression aren't
+        supported here (the datapak doesn't have any); use zipfile for
+        those.
+        """
+        if info.compress_type == zipfile.ZIP_STORED:
+            inflater = None
+        elif info.compress_type == zipfile.ZIP_DEFLATED:
+            inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+        else:
+            raise LoadException('Datapak member %s uses unsupported compression %d' % (
+                info.filename, info.compress_type))
+
+        pos = info.header_offset
+        header = self.reader.pread(self.LOCAL_HEADER.size, pos)
+        if len(header) != self.LOCAL_HEADER.size:
+            raise LoadException('Datapak member %s is truncated' % (info.filename))
+        (magic, version, flags, compression, modtime, moddate, crc,
+         compress_size, file_size, namelen, extralen) = self.LOCAL_HEADER.unpack(header)
+        if magic != self.LOCAL_MAGIC:
+            raise LoadException('Bad local header for datapak member %s' % (info.filename))
+        pos += self.LOCAL_HEADER.size + namelen + extralen
+
+        remaining = info.compress_size
+        decrypter = None
+        if info.flag_bits & 0x1:
+            decrypter = ZipCrypto(self.password)
+            check = decrypter.decrypt(self.reader.pread(12, pos))
+            pos += 12
+            remaining -= 12
+            if len(check) != 12 or check[11] != self.check_byte(info, modtime):
+                raise LoadException('Bad password for datapak member %s' % (info.filename))
+
+        if chunk_size is None:
+            chunk_size = self.CHUNK_SIZE
+        crc = 0
+        while remaining > 0:
+            chunk = self.reader.pread(min(remaining, chunk_size), pos)
+            if not chunk:
+                raise LoadException('Datapak member %s is truncated' % (info.filename))
+            pos += len(chunk)
+            remaining -= len(chunk)
+            if decrypter is not None:
+                chunk = decrypter.decrypt(chunk)
+            if inflater is not None:
+                chunk = self._inflate(info, inflater.decompress, chunk)
+            if chunk:
+                crc = zlib.crc32(chunk, crc)
+                yield chunk
+        if inflater is not None:
+            chunk = self._inflate(info, inflater.flush)
+            if chunk:
+                crc = zlib.crc32(chunk, crc)
+                yield chunk
+
+        if crc != info.CRC:
+            raise LoadException('Bad CRC for datapak member %s' % (info.filename))
+
+    @staticmethod
+    def check_byte(info, modtime):
+        """
+        Returns the value the last byte of the given member's encryption
+        header should decrypt to.  "modtime" is from its local header.
+        """
+        if info.flag_bits & 0x8:
+            return (modtime >> 8) & 0xFF
+        else:
+            return (info.CRC >> 24) & 0xFF
+
+    def check_password(self, info):
+        """
+        Returns whether our password decrypts the encryption header of the
+        given member correctly, without reading any further.  There's a
+        1 in 256 chance of a wrong password passing for any one member.
+        """
+        if not info.flag_bits & 0x1:
+            return True
+        header = self.reader.pread(self.LOCAL_HEADER.size, info.header_offset)
+        if len(header) != self.LOCAL_HEADER.size:
+            return False
+        fields = self.LOCAL_HEADER.unpack(header)
+        check = ZipCrypto(self.password).decrypt(self.reader.pread(
+            12, info.header_offset + self.LOCAL_HEADER.size + fields[9] + fields[10]))
+        return len(check) == 12 and check[11] == self.check_byte(info, fields[4])
+
+    @staticmethod
+    def _inflate(info, method, *args):
+        """ Calls the given inflater method, converting zlib errors """
+        try:
+            return method(*args)
+        except zlib.error as e:
+            raise LoadException('Could not inflate datapak member %s: %s' % (
+                info.filename, e))
+
+    def open_member(self, filename, directory='gfx'):
+        """
+        Returns a read-only binary file-like object for the given member,
+        which only decrypts and inflates as much of the member as is
+        actually read (in STREAM_CHUNK_SIZE pieces), so that looking at
+        the start of a member doesn't cost a read of the whole thing.
+        The CRC is only checked if the member is read to the end.  Can
+        raise a LoadException if the file is not found.
+        """
+        info = self.get_info('%s/%s' % (directory, filename))
+        return io.BufferedReader(
+            DatapakMember(self.iter_member(info, self.STREAM_CHUNK_SIZE)))
+
+    def member_key(self, filename, directory='gfx'):
+        """
+        Returns the key under which the given member is stored in the
+        shared in-memory member cache.
+        """
+        return self.cache_key + ('%s/%s' % (directory, filename),)
+
+    def readfile(self, filename, directory='gfx'):
+        """
+        Reads a given filename from the given dir.  Can raise a LoadException
+        if the file is not found.  Results are kept in the shared in-memory
+        member cache.
+        """
+        key = self.member_key(filename, directory)
+        data = lru.member_cache.get(key)
+        if data is None:
+            data = self.read_member(filename, directory)
+            lru.member_cache.put(key, data)
+        return data
+
+    def read_member(self, filename, directory='gfx'):
+        """
+        Reads, decrypts and inflates the given member, bypassing the
+        in-memory member cache.
+        """
+        filename = '%s/%s' % (directory, filename)
+        if not fast_zipfile:
+            try:
+                return self.thread_zipobj().read(filename)
+            except KeyError:
+                raise LoadException(
+                    'Filename %s not found in datapak' % (filename))
+        return b''.join(self.iter_member(self.get_info(filename)))
+
     def filelist(self):
         """
         Returns a list of all files inside the datapak.
         """
         return self.zipobj.namelist()
 
+    def fingerprint(self):
+        """
+        Returns a string identifying this exact datapak: its size and
+        modification time, plus a hash of its directory (which includes
+        the CRC of every member), so that a datapak which gets replaced
+        by a different one is noticed even if the size happens to match.
+        """
+        stat = os.stat(self.filename)
+        digest = hashlib.sha1()
+        for info in self.zipobj.infolist():
+            digest.update(('%s:%08x:%d\n' % (
+                info.filename, info.CRC, info.file_size)).encode('UTF-8'))
+        return '%d-%d-%s' % (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+
+
+class DatapakMember(io.RawIOBase):
+    """
+    Raw file-like object on top of one of Datapak.iter_member()'s
+    generators.  Generally wrapped in an io.BufferedReader; see
+    Datapak.open_member().
+    """
+
+    def __init__(self, chunks):
+        super(DatapakMember, self).__init__()
+        self.chunks = chunks
+        self.pending = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        while not self.pending:
+            try:
+                self.pending = memoryview(next(self.chunks))
+            except StopIteration:
+                return 0
+        size = min(len(buf), len(self.pending))
+        buf[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self):
+        # Stop the generator early; it reads through the datapak's shared
+        # PositionalReader, so there's no file of its own to close
+        self.chunks.close()
+        super(DatapakMember, self).close()
+
+
+class DatapakCache(object):
+    """
+    An on-disk cache of decrypted datapak members, so that we only pay for
+    the (slow) decryption of each member once.  Each datapak gets its own
+    directory underneath "cachedir", which is wiped out whenever the
+    datapak's fingerprint changes.  If "recompress" is set, members are
+    stored zlib-compressed rather than raw.
+
+    The cache is strictly an optimization: if anything goes wrong while
+    reading or writing it, we just fall back to the datapak itself.
+    """
+
+    FINGERPRINT_FILE = 'fingerprint'
+
+    def __init__(self, cachedir, datapak, recompress=False):
+        self.datapak = datapak
+        self.recompress = recompress
+        self.basedir = os.path.join(cachedir, hashlib.sha1(
+            os.path.abspath(datapak.filename).encode('UTF-8')).hexdigest()[:16])
+        try:
+            self.validate()
+        except (IOError, OSError) as e:
+            LOG.warning('Disabling datapak cache in %s: %s' % (self.basedir, e))
+            self.basedir = None
+
+    def validate(self):
+        """
+        Makes sure that our cache directory matches our datapak, clearing
+        it out if the datapak has changed since the cache was populated.
+        """
+        fingerprint = self.datapak.fingerprint()
+        fingerprint_file = os.path.join(self.basedir, self.FINGERPRINT_FILE)
+        try:
+            with open(fingerprint_file, 'r') as df:
+                if df.read() == fingerprint:
+                    return
+        except IOError:
+            pass
+        if os.path.exists(self.basedir):
+            LOG.info('Datapak has changed, clearing cache in %s' % (self.basedir))
+            shutil.rmtree(self.basedir)
+        os.makedirs(self.basedir)
+        self.write(fingerprint_file, fingerprint.encode('UTF-8'))
+
+    def write(self, path, data):
+        """
+        Writes the given data to "path", via a temporary file, so that an
+        interrupted write never leaves a truncated member in the cache.
+        """
+        dirname = os.path.dirname(path)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        (fd, tempname) = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as df:
+                df.write(data)
+            os.replace(tempname, path)
+        except Exception:
+            os.remove(tempname)
+            raise
+
+    def get_path(self, filename, directory):
+        """
+        Returns the path at which the given member is cached, or None if
+        the member can't be cached (or caching is disabled).
+        """
+        if self.basedir is None:
+            return None
+        path = os.path.normpath(os.path.join(self.basedir, directory, filename))
+        if not path.startswith(self.basedir + os.sep):
+            return None
+        if self.recompress:
+            path = '%s.z' % (path)
+        return path
+
+    def open_member(self, filename, directory='gfx'):
+        """
+        Returns a binary file object for the given member if it's in the
+        cache, or None if it isn't.
+        """
+        path = self.get_path(filename, directory)
+        if path is None:
+            return None
+        try:
+            if self.recompress:
+                with open(path, 'rb') as df:
+                    return io.BytesIO(zlib.decompress(df.read()))
+            return open(path, 'rb')
+        except (IOError, zlib.error):
+            return None
+
+    def readfile(self, filename, directory='gfx'):
+        """
+        Same as Datapak.read_member(), but served from the cache if possible.
+        """
+        path = self.get_path(filename, directory)
+        if path is None:
+            return self.datapak.read_member(filename, directory)
+        try:
+            with open(path, 'rb') as df:
+                data = df.read()
+            if self.recompress:
+                data = zlib.decompress(data)
+            return data
+        except (IOError, zlib.error):
+            pass
+        data = self.datapak.read_member(filename, directory)
+        try:
+            if self.recompress:
+                self.write(path, zlib.compress(data))
+            else:
+                self.write(path, data)
+        except (IOError, OSError) as e:
+            LOG.warning('Could not cache datapak member %s/%s: %s' % (
+                directory, filename, e))
+        return data
+
+
+class TableCache(object):
+    """
+    An on-disk cache of the tables we parse out of the game's CSV files
+    (see EschalonData.populate_items() and populate_entities()), so that
+    we don't have to parse them again in every process.  Each table is
+    stored as marshalled plain data in a file named after the table and
+    the key it was built from (a hash of the book and the source files'
+    contents), so switching between books or between modded and
+    unmodded data doesn't keep throwing away the other's tables.
+
+    As with DatapakCache, any problem with the cache just means we fall
+    back to parsing.
+    """
+
+    # Bump this if the layout of any cached table changes
+    VERSION = 1
+
+    def __init__(self, cachedir):
+        self.cachedir = cachedir
+
+    def get_path(self, name, key):
+        """ Returns the path of the given table's file for the given key """
+        return os.path.join(self.cachedir, '%s-%s.table' % (name, key))
+
+    def load(self, name, key):
+        """
+        Returns the data stored for the given table and key, or None if we
+        don't have it.
+        """
+        try:
+            with open(self.get_path(name, key), 'rb') as df:
+                (version, stored_key, data) = marshal.load(df)
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            return None
+        if version != self.VERSION or stored_key != key:
+            return None
+        return data
+
+    def store(self, name, key, data):
+        """ Stores the given table """
+        path = self.get_path(name, key)
+        try:
+            if not os.path.isdir(self.cachedir):
+                os.makedirs(self.cachedir)
+            (fd, tempname) = tempfile.mkstemp(dir=self.cachedir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as df:
+                    marshal.dump((self.VERSION, key, data), df)
+                os.replace(tempname, path)
+            except Exception:
+                os.remove(tempname)
+                raise
+        except (IOError, OSError, ValueError) as e:
+            LOG.warning('Could not cache table %s: %s' % (path, e))
+
 
 class EschalonData(object):
     """
@@ -212,10 +813,12 @@ class EschalonData(object):
     empty_name: Optional[str] = None
     random_name: Optional[str] = None
 
-    def __init__(self, gamedir, modpath=None):
+    def __init__(self, gamedir, modpath=None, cachedir=None):
         """
         Constructor.  "gamedir" should be the base game directory, whether
-        it contains a datapak or a filesystem structure.
+        it contains a datapak or a filesystem structure.  If "cachedir" is
+        passed in, decrypted datapak members and the tables we parse from
+        them will be cached underneath it (see DatapakCache and TableCache).
         """
 
         # Cache of our known item list, so that we only read it once.
@@ -223,6 +826,10 @@ class EschalonData(object):
         self.itemdict = None
         self.goldranges = None
         self.material_items = None
+        self.materialindex = None
+
+        # Memo of the global names we've already worked out
+        self.global_names = {}
 
         # Entities
         self.entitytable = None
@@ -231,12 +838,23 @@ class EschalonData(object):
         # reading from the filesystem structure instead.
         self.datapak = None
 
+        # Our cache of decrypted datapak members, if we're using one, and
+        # of the tables we parse out of them
+        self.cachedir = cachedir
+        self.cache = None
+        if cachedir is None:
+            self.tablecache = None
+        else:
+            self.tablecache = TableCache(os.path.join(cachedir, 'tables'))
+
+        # Index of all the files available to us (see GameVFS)
+        self.modpath = modpath
+        self.vfs = None
+
         # Set our base gamedir.  This also does the work of actually
         # finding out where our data is.
         self.set_gamedir(gamedir)
 
-        self.modpath = modpath
-
     def set_gamedir(self, gamedir: str):
         """
         Used to update our game directory - this might happen as the
@@ -255,6 +873,11 @@ class EschalonData(object):
         """
         self.gamedir = gamedir
 
+        # Let go of any datapak we had open before
+        if self.datapak is not None:
+            self.datapak.close()
+            self.datapak = None
+
         if not os.path.isdir(self.gamedir):
             raise LoadException(
                 '"%s" is not a valid directory' % (self.gamedir))
@@ -268,29 +891,52 @@ class EschalonData(object):
         if found_dirs:
             # We're using local directories
             self.datapak = None
+            self.cache = None
         else:
             # We'll try loading the datapak
             datapak_file = os.path.join(self.gamedir, 'datapak')
             if os.path.isfile(datapak_file):
                 self.datapak = Datapak(datapak_file)
+                if self.cachedir is None:
+                    self.cache = None
+                else:
+                    self.cache = DatapakCache(self.cachedir, self.datapak)
             else:
                 raise LoadException('Could not find datapak or gfx directory!')
 
+        self.vfs = GameVFS(self.gamedir, self.DATA_DIRS, self.datapak, self.modpath)
+
+    def refresh(self):
+        """
+        Rebuilds our file index (reopening the datapak if need be) if any
+        of the files or directories it was built from have changed.
+        Returns True if anything was rebuilt.
+        """
+        if self.vfs.stale():
+            self.set_gamedir(self.gamedir)
+            return True
+        return False
+
+    def lookup(self, filename, directory='gfx'):
+        """
+        Returns the VFS entry for the given file, raising a LoadException
+        if it isn't found.  A miss triggers a refresh(), in case the file
+        has appeared since we last looked.
+        """
+        path = '%s/%s' % (directory, filename)
+        entry = self.vfs.lookup(path)
+        if entry is None and self.refresh():
+            entry = self.vfs.lookup(path)
+        if entry is None:
+            raise LoadException('Filename %s could not be found' % (path))
+        return entry
+
     def filelist(self):
         """
-        Returns a list of all files available to us
-        """
-        if self.datapak is None:
-            namelist = []
-            for directory in self.DATA_DIRS:
-                namelist = namelist + \
-                    glob.glob(os.path.join(self.gamedir, directory, '*'))
-            retlist = []
-            for filename in namelist:
-                retlist.append(os.path.relpath(filename, self.gamedir))
-            return retlist
-        else:
-            return self.datapak.filelist()
+        Returns a list of all files available to us, as "dir/filename"
+        """
+        self.refresh()
+        return self.vfs.namelist()
 
     def readfile(self, filename, directory='gfx'):
         """
@@ -302,28 +948,73 @@ class EschalonData(object):
         This can raise a LoadException if the file is not found, or if other errors
         occur.
         """
-        if self.datapak is None:
-            to_open = os.path.join(self.gamedir, directory, filename)
-            if os.path.isfile(to_open):
-                try:
-                    with open(to_open, 'r') as df:
-                        return df.read()
-                except IOError as e:
-                    raise LoadException(
-                        'Filename %s could not be opened: %s' % (to_open, e))
-            else:
+        return self.read_entry(self.lookup(filename, directory))
+
+    def read_entry(self, entry):
+        """
+        Reads the file described by the given VFS entry.  Everything we
+        read is kept in the shared in-memory member cache.
+        """
+        (source, locator) = entry
+        if source == SOURCE_FILE:
+            try:
+                key = lru.file_key(os.path.abspath(locator), os.stat(locator))
+                data = lru.member_cache.get(key)
+                if data is None:
+                    with open(locator, 'rb') as df:
+                        data = df.read()
+                    lru.member_cache.put(key, data)
+                return data
+            except (IOError, OSError) as e:
                 raise LoadException(
-                    'Filename %s could not be found' % (to_open))
-        else:
+                    'Filename %s could not be opened: %s' % (locator, e))
+
+        (directory, filename) = locator.split('/', 1)
+        if self.cache is None:
             return self.datapak.readfile(filename, directory)
 
+        # Check memory before going to the on-disk cache
+        key = self.datapak.member_key(filename, directory)
+        data = lru.member_cache.get(key)
+        if data is None:
+            data = self.cache.readfile(filename, directory)
+            lru.member_cache.put(key, data)
+        return data
+
+    def open_member(self, filename, directory='gfx'):
+        """
+        Returns a read-only binary file-like object for the given file,
+        for callers which only need to look at the start of it.  Members
+        of the datapak which aren't already cached are streamed, so only
+        as much as is read gets decrypted.  Should be closed when done
+        (it can be used as a context manager).
+
+        This can raise a LoadException if the file is not found.
+        """
+        (source, locator) = self.lookup(filename, directory)
+        if source == SOURCE_FILE:
+            try:
+                return open(locator, 'rb')
+            except IOError as e:
+                raise LoadException(
+                    'Filename %s could not be opened: %s' % (locator, e))
+        (directory, filename) = locator.split('/', 1)
+        data = lru.member_cache.get(self.datapak.member_key(filename, directory))
+        if data is not None:
+            return io.BytesIO(data)
+        if self.cache is not None:
+            handle = self.cache.open_member(filename, directory)
+            if handle is not None:
+                return handle
+        return self.datapak.open_member(filename, directory)
+
     def get_filehandle(self, filename, directory='gfx'):
         """
         Reads a given filename from our dir and returns a filehandle-like object to
-        its data, using the cStringIO object.  Consequently, the returned filehandle
-        will be read-only.  Calls self.readfile() to do most of our work.
+        its data, as text, using a StringIO object.  Consequently, the returned
+        filehandle will be read-only.  Calls self.readfile() to do most of our work.
         """
-        return io.StringIO(self.readfile(filename, directory))
+        return io.StringIO(self.readfile(filename, directory).decode('UTF-8', 'replace'))
 
     def populate_datapak_info(self):
         """
@@ -334,67 +1025,147 @@ class EschalonData(object):
                tarnslate savegame gold values back to global values)
             3) Savegame Weapon/Armor names which can be mapped back to
                base global item names.
+            4) Entity information from entities.csv (plus the mod's)
+
+        The individual getters only populate the tables they need.
         """
-        self.itemlist = []
-        self.itemdict = {}
-        self.goldranges = GoldRanges()
-        self.material_items = {}
-        self.entitytable = {}
+        self.populate_items()
+        self.populate_entities()
+
+    def entry_hash(self, entry):
+        """
+        Returns a string identifying the contents of the file described
+        by the given VFS entry.  Datapak members already have a CRC in
+        the datapak's directory, so we use that rather than reading them.
+        """
+        (source, locator) = entry
+        if source == SOURCE_DATAPAK:
+            info = self.datapak.get_info(locator)
+            return 'crc:%08x:%d' % (info.CRC, info.file_size)
+        return 'sha1:%s' % (hashlib.sha1(self.read_entry(entry)).hexdigest())
+
+    def cached_table(self, name, entries, builder):
+        """
+        Returns the table "name", built by calling builder() (which should
+        return plain data, and None if it failed), from our TableCache if
+        it's there for the given source VFS entries.
+        """
+        if self.tablecache is None:
+            return builder()
+        try:
+            parts = ['%d' % (c.book)]
+            for entry in entries:
+                if entry is None:
+                    parts.append('-')
+                else:
+                    parts.append(self.entry_hash(entry))
+            key = hashlib.sha1('|'.join(parts).encode('UTF-8')).hexdigest()
+        except LoadException:
+            return builder()
+        data = self.tablecache.load(name, key)
+        if data is None:
+            data = builder()
+            if data is not None:
+                self.tablecache.store(name, key, data)
+        return data
+
+    def populate_items(self):
+        """
+        Populates our item information from general_items.csv: valid item
+        names, gold ranges, and material-prefixed item names.
+        """
+        entry = self.vfs.lookup('data/general_items.csv')
+        data = self.cached_table('items', [entry], lambda: self.parse_items(entry))
+        if data is None:
+            data = ([], GoldRanges().to_data(), {})
+        (names, goldranges, self.material_items) = data
+        self.itemdict = dict.fromkeys(names, True)
+        self.goldranges = GoldRanges.from_data(goldranges)
+        self.materialindex = MaterialIndex(self.material_items)
+        self.global_names = {}
 
-        # First load in all available information from general_items.csv
+        # Add RANDOM/EMPTY to the list of valid names, if we actually
+        # have data.
+        if len(self.itemdict) > 0:
+            if self.empty_name:
+                self.itemdict[self.empty_name] = True
+            if self.random_name:
+                self.itemdict[self.random_name] = True
+
+        # Populate a sorted itemlist object as well.
+        self.itemlist = sorted(list(self.itemdict.keys()),
+                               key=lambda s: s.lower())
+
+    def parse_items(self, entry):
+        """
+        Parses general_items.csv, returning a tuple of the item names,
+        the gold ranges (see GoldRanges.to_data()), and the dict mapping
+        material-prefixed names to their base names.  Returns None if the
+        file couldn't be parsed.
+        """
+        names = []
+        goldranges = GoldRanges()
+        material_items = {}
         try:
-            df = self.get_filehandle('general_items.csv', 'data')
+            if entry is None:
+                raise LoadException('Filename data/general_items.csv could not be found')
+            df = io.StringIO(self.read_entry(entry).decode('UTF-8', 'replace'))
             reader = csv.DictReader(df)
             for row in reader:
                 if row['DESCRIPTION'] != '':
-                    self.itemdict[row['DESCRIPTION']] = True
+                    names.append(row['DESCRIPTION'])
 
                 if row['Item Category'] == 'IC_GOLD':
-                    self.goldranges.add_item(row['DESCRIPTION'])
+                    goldranges.add_item(row['DESCRIPTION'])
 
                 materialid = int(row['Material'])
                 if materialid == 1:
                     for material in c.materials_wood:
-                        self.material_items['%s %s' % (
+                        material_items['%s %s' % (
                             material, row['DESCRIPTION'])] = row['DESCRIPTION']
                 elif materialid == 2:
                     for material in c.materials_metal:
-                        self.material_items['%s %s' % (
+                        material_items['%s %s' % (
                             material, row['DESCRIPTION'])] = row['DESCRIPTION']
                 elif materialid == 3:
                     for material in c.materials_fabric:
-                        self.material_items['%s %s' % (
+                        material_items['%s %s' % (
                             material, row['DESCRIPTION'])] = row['DESCRIPTION']
             df.close()
         except:
             LOG.exception("Failed to load general_items.csv")
+            return None
+        return (names, goldranges.to_data(), material_items)
 
-        # Add RANDOM/EMPTY to the list of valid names, if we actually
-        # have data.
-        if len(self.itemdict) > 0:
-            if self.empty_name:
-                self.itemdict[self.empty_name] = True
-            if self.random_name:
-                self.itemdict[self.random_name] = True
-
-        # Populate a sorted itemlist object as well.
-        self.itemlist = sorted(list(self.itemdict.keys()),
-                               key=lambda s: s.lower())
-
-        # Now try to load in all available entity information
-        try:
-            df = self.get_filehandle('entities.csv', 'data')
-            self.read_entities(df)
-            df.close()
-        except:
-            pass
-        try:
-            path = os.path.join(self.modpath, 'entities.csv')
-            df = open(path, 'r')
-            self.read_entities(df)
-            df.close()
-        except:
-            pass
+    def populate_entities(self):
+        """
+        Populates our entity information from entities.csv.  A mod's
+        entities add to the game's, rather than replacing them.
+        """
+        entries = [self.vfs.base.get('data/entities.csv'),
+                   self.vfs.mod.get('data/entities.csv')]
+        data = self.cached_table('entities', entries,
+                                 lambda: self.parse_entities(entries))
+        self.entitytable = dict([(entid, EntHelper(*fields))
+                                 for (entid, fields) in data.items()])
+
+    def parse_entities(self, entries):
+        """
+        Parses the entities.csv files described by the given VFS entries,
+        returning a dict of entity IDs to EntHelper.to_data() tuples.
+        """
+        self.entitytable = {}
+        for entry in entries:
+            if entry is None:
+                continue
+            try:
+                df = io.StringIO(self.read_entry(entry).decode('UTF-8', 'replace'))
+                self.read_entities(df)
+                df.close()
+            except:
+                pass
+        return dict([(entid, ent.to_data())
+                     for (entid, ent) in self.entitytable.items()])
 
     def read_entities(self, df):
         reader = csv.DictReader(df)
@@ -435,7 +1206,7 @@ class EschalonData(object):
         Returns a list of valid item names from the main general_items.csv
         """
         if self.itemlist is None:
-            self.populate_datapak_info()
+            self.populate_items()
         return self.itemlist
 
     def get_itemdict(self):
@@ -445,34 +1216,47 @@ class EschalonData(object):
         another list of items versus this
         """
         if self.itemdict is None:
-            self.populate_datapak_info()
+            self.populate_items()
         return self.itemdict
 
     def get_global_name(self, item_name):
         """
         Returns an attempt to normalize our given item_name into a value
-        appropriate for global map files.
+        appropriate for global map files.  Results are remembered, since
+        maps tend to have a lot of the same items on them.
         """
         if self.goldranges is None:
-            self.populate_datapak_info()
+            self.populate_items()
+
+        try:
+            return self.global_names[item_name]
+        except KeyError:
+            pass
 
         if 'Gold Piece' in item_name:
-            if self.goldranges:
-                return self.goldranges.get_equivalent(item_name)
+            new_name = self.goldranges.get_equivalent(item_name)
         elif item_name[:10] == 'Scroll of ':
-            return item_name[10:]
+            new_name = item_name[10:]
         else:
-            for (key, val) in list(self.material_items.items()):
-                if key in item_name:
-                    return val
-            return item_name
+            new_name = self.materialindex.lookup(item_name)
+            if new_name is None:
+                new_name = item_name
+        self.global_names[item_name] = new_name
+        return new_name
+
+    def get_global_names(self, item_names):
+        """
+        Returns a list of the global names (see get_global_name()) for
+        all the given item names, in the same order.
+        """
+        return [self.get_global_name(item_name) for item_name in item_names]
 
     def get_entitytable(self):
         """
         Returns a dict of entities from the main entities.csv
         """
         if self.entitytable is None:
-            self.populate_datapak_info()
+            self.populate_entities()
         return self.entitytable
 
     def get_entity(self, entid):
@@ -480,7 +1264,7 @@ class EschalonData(object):
         Returns the requested entity, or None if not found
         """
         if self.entitytable is None:
-            self.populate_datapak_info()
+            self.populate_entities()
 
         try:
             return self.entitytable[entid]
@@ -488,18 +1272,18 @@ class EschalonData(object):
             return None
 
     @staticmethod
-    def new(book, gamedir, modpath=None):
+    def new(book, gamedir, modpath=None, cachedir=None):
         """
         Returns a new object of the appropriate type.  For Books 2+3, we'll
         just instantiate ourselves.  For Book 1, we'll use a compatibility
-        object.
+        object (which has no datapak, and so ignores "cachedir").
         """
         if book == 1:
             return B1EschalonData(gamedir, modpath)
         elif book == 2:
-            return B2EschalonData(gamedir, modpath)
+            return B2EschalonData(gamedir, modpath, cachedir)
         else:
-            return B3EschalonData(gamedir, modpath)
+            return B3EschalonData(gamedir, modpath, cachedir)
 
 
 class B1EschalonData(object):
@@ -652,6 +1436,13 @@ class B1EschalonData(object):
         """
         return item_name
 
+    def get_global_names(self, item_names):
+        """
+        Theoretically returns a list of normalized "global" map item names,
+        but in reality just returns the passed-in names.
+        """
+        return list(item_names)
+
     def get_entitytable(self):
         """
         Returns a dict of entities
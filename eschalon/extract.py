@@ -0,0 +1,251 @@
+#!/usr/bin/python
+# vim: set expandtab tabstop=4 shiftwidth=4:
+#
+# Eschalon Savefile Editor
+# Copyright (C) 2008-2017 CJ Kucera, Elliot Kendall, Eitan Adler
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+"""
+Bulk extractor for Book 1's gfx.pak and the Book 2/3 datapak, installed
+as "eschalon-extract".  Members are extracted (or just verified) in
+parallel, and each one is written out as soon as it's done.
+"""
+
+import argparse
+import concurrent.futures
+import fnmatch
+import os
+import sys
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from eschalon.constants import constants as c
+from eschalon.eschalondata import Datapak
+from eschalon.pakarchive import PakArchive
+from eschalon.savefile import LoadException
+
+PAK_MAGIC = b'!PAK'
+ZIP_MAGIC = b'PK\x03\x04'
+
+# The archive our pool workers read from; see init_worker()
+_worker_archive = None
+
+
+def parse_args(input: Optional[Sequence[str]]):
+    """ Parses our commandline arguments """
+    parser = argparse.ArgumentParser(
+        prog='eschalon-extract',
+        description='Extracts (or verifies) the contents of gfx.pak or datapak')
+    parser.add_argument('archive', type=str,
+                        help='gfx.pak (Book 1) or datapak (Books 2 and 3)')
+    parser.add_argument('patterns', type=str, nargs='*',
+                        help='Only process members matching these glob patterns')
+    parser.add_argument('-o', '--output', type=str, default='.',
+                        help='Directory to extract into (default: current directory)')
+    parser.add_argument('--book', type=int, choices=[2, 3],
+                        help='Book the datapak belongs to (detected if not given)')
+    parser.add_argument('--verify', action='store_true',
+                        help='Check every member without writing anything')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Number of members to process at once')
+    parser.add_argument('--processes', action='store_true',
+                        help='Use processes rather than threads (datapak decryption '
+                             'holds the GIL, so this is faster for Books 2 and 3)')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="Don't list members as they're processed")
+
+    args = parser.parse_args(input)
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    return args
+
+
+def open_archive(filename: str, book: Optional[int] = None):
+    """
+    Opens the given archive, returning a PakArchive or a Datapak.  For a
+    datapak, "book" selects the password to use; if it's None we try
+    each in turn.  Raises a LoadException if the archive can't be read.
+    """
+    try:
+        with open(filename, 'rb') as df:
+            magic = df.read(4)
+    except IOError as e:
+        raise LoadException(str(e))
+
+    if magic == PAK_MAGIC:
+        return PakArchive(filename)
+    elif magic != ZIP_MAGIC:
+        raise LoadException('%s is not a gfx.pak or datapak' % (filename))
+
+    if book is not None:
+        c.switch_to_book(book)
+        return Datapak(filename)
+
+    # Find the book whose password works for the first few members
+    for book in (3, 2):
+        c.switch_to_book(book)
+        datapak = Datapak(filename)
+        found = False
+        try:
+            infos = [info for info in datapak.zipobj.infolist() if not info.is_dir()]
+            found = all([datapak.check_password(info) for info in infos[:8]])
+        finally:
+            if not found:
+                datapak.close()
+        if found:
+            return datapak
+    raise LoadException('Could not find the password for datapak %s' % (filename))
+
+
+def member_names(archive, patterns: Sequence[str]) -> List[str]:
+    """ Returns the sorted member names of the archive matching our patterns """
+    if isinstance(archive, PakArchive):
+        names = archive.namelist()
+    else:
+        names = [name for name in archive.filelist() if not name.endswith('/')]
+    if patterns:
+        names = [name for name in names
+                 if any([fnmatch.fnmatchcase(name, pattern) for pattern in patterns])]
+    return sorted(names)
+
+
+def output_path(output: str, name: str) -> str:
+    """
+    Returns where the given member should be written, refusing names
+    which would end up outside of the output directory.
+    """
+    base = os.path.abspath(output)
+    path = os.path.normpath(os.path.join(base, name))
+    if not path.startswith(base + os.sep):
+        raise LoadException('Refusing to extract %s outside of %s' % (name, output))
+    return path
+
+
+def process_member(archive, name: str, output: Optional[str]) -> Tuple[str, int, Optional[str]]:
+    """
+    Extracts a single member into "output", or just verifies it if
+    "output" is None.  Datapak members are CRC-checked as they're
+    streamed out; gfx.pak has no checksums, so its members are checked
+    against their recorded size.  Returns a tuple of the member name,
+    its size, and an error message (or None).  The member is written to
+    a temporary file first, so a failed member never leaves a partial
+    file behind.
+    """
+    tempname = None
+    try:
+        if isinstance(archive, PakArchive):
+            data = archive.read_member(name)
+            if len(data) != archive.fileindex[name].size_real:
+                raise LoadException('Member %s has the wrong size' % (name))
+            chunks = [data]
+        else:
+            chunks = archive.iter_member(archive.get_info(name))
+
+        size = 0
+        if output is None:
+            for chunk in chunks:
+                size += len(chunk)
+        else:
+            path = output_path(output, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tempname = '%s.tmp' % (path)
+            with open(tempname, 'wb') as df:
+                for chunk in chunks:
+                    df.write(chunk)
+                    size += len(chunk)
+            os.replace(tempname, path)
+            tempname = None
+        return (name, size, None)
+    except (LoadException, IOError, OSError) as e:
+        return (name, 0, str(e))
+    finally:
+        if tempname is not None and os.path.exists(tempname):
+            os.remove(tempname)
+
+
+def init_worker(filename: str, book: Optional[int]) -> None:
+    """ Opens the archive in a pool worker process """
+    global _worker_archive
+    _worker_archive = open_archive(filename, book)
+
+
+def worker_process_member(name: str, output: Optional[str]):
+    """ process_member() for pool worker processes """
+    return process_member(_worker_archive, name, output)
+
+
+def main(input: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(sys.argv[1:] if input is None else input)
+    try:
+        archive = open_archive(args.archive, args.book)
+    except LoadException as e:
+        print('Error: %s' % (e), file=sys.stderr)
+        return 2
+    try:
+        return extract_members(args, archive)
+    finally:
+        archive.close()
+
+
+def extract_members(args, archive) -> int:
+    """
+    Extracts (or verifies) the members of the open archive which match
+    our arguments, returning the exit status for main().
+    """
+    if isinstance(archive, Datapak):
+        book = c.book
+    else:
+        book = None
+    names = member_names(archive, args.patterns)
+    output = None if args.verify else args.output
+
+    if args.processes:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            args.jobs, initializer=init_worker, initargs=(args.archive, book))
+        submit = lambda name: executor.submit(worker_process_member, name, output)
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(args.jobs)
+        submit = lambda name: executor.submit(process_member, archive, name, output)
+
+    start = time.perf_counter()
+    total = 0
+    failures = []
+    with executor:
+        futures = [submit(name) for name in names]
+        for future in concurrent.futures.as_completed(futures):
+            (name, size, error) = future.result()
+            if error is None:
+                total += size
+                if not args.quiet:
+                    print(name)
+            else:
+                failures.append(name)
+                print('Error: %s: %s' % (name, error), file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    print('%s %d of %d members, %.2f MiB in %.2fs (%.2f MiB/s)' % (
+        'Verified' if args.verify else 'Extracted',
+        len(names) - len(failures), len(names), total / 1048576, elapsed,
+        total / 1048576 / max(elapsed, 1e-6)))
+    if failures:
+        print('%d members failed' % (len(failures)), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
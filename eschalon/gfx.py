@@ -23,17 +23,123 @@ import io
 import logging
 import math
 import os
-import zlib
-from struct import unpack
+import struct
 from typing import Any, Dict, Set
 
 import cairo
-from eschalon.savefile import LoadException, Savefile
-from gi.repository import GdkPixbuf
+from eschalon import lru, pixels
+from eschalon.atlascache import AtlasCache
+from eschalon.pakarchive import PakArchive
+from eschalon.savefile import LoadException
+from gi.repository import GdkPixbuf, GLib
 
 LOG = logging.getLogger(__name__)
 
 
+def sprite_size(image):
+    """
+    Returns the number of bytes of pixel data in a surface, pixbuf or
+    SpriteAtlas
+    """
+    if isinstance(image, SpriteAtlas):
+        image = image.surface
+    if isinstance(image, cairo.ImageSurface):
+        return image.get_stride() * image.get_height()
+    return image.get_rowstride() * image.get_height()
+
+
+def new_sprite_cache(budget=None):
+    """
+    Returns a new LRUCache for scaled sprites, with the given budget in
+    bytes (or our default budget).
+    """
+    if budget is None:
+        budget = lru.DEFAULT_SPRITE_BUDGET_MB * 1048576
+    return lru.LRUCache(budget, sprite_size)
+
+
+class SpriteAtlas(object):
+    """
+    A whole sheet of sprites from a GfxCache, scaled to a single size and
+    laid out on one surface in the same grid as the original.  Sprites
+    are handed out as subsurfaces of the atlas, so drawing a map at a new
+    zoom level doesn't have to allocate and scale a new surface for each
+    sprite the first time it shows up.
+    """
+
+    def __init__(self, surface, sizex, sizey):
+        """
+        "surface" is the already-built atlas, whose cells are "sizex"
+        by "sizey" pixels.  Use build() to make a new one.
+        """
+        self.surface = surface
+        self.sizex = sizex
+        self.sizey = sizey
+        self.cols = surface.get_width() // sizex
+        self.rows = surface.get_height() // sizey
+        self.sprites = {}
+
+    @staticmethod
+    def grid(sheetwidth, sheetheight, width, height, cols):
+        """
+        Returns the number of (cols, rows) of whole "width" by "height"
+        sprites on a sheet of the given size which is laid out "cols"
+        sprites across.
+        """
+        return (min(cols, sheetwidth // width), sheetheight // height)
+
+    @staticmethod
+    def build(gfxcache, sizex, sizey):
+        """
+        Returns a new SpriteAtlas of the given GfxCache's sheet, scaled so
+        that each sprite is "sizex" by "sizey" pixels.
+        """
+        sheet = gfxcache.surface
+        (cols, rows) = SpriteAtlas.grid(sheet.get_width(), sheet.get_height(),
+                                        gfxcache.width, gfxcache.height, gfxcache.cols)
+        surface = cairo.ImageSurface(
+            cairo.FORMAT_ARGB32, cols * sizex, rows * sizey)
+
+        # Each cell is scaled from a subsurface of the sheet, rather than
+        # scaling the sheet in one go, so that the filtering at the edges
+        # of a sprite doesn't pick up pixels from its neighbours.  The
+        # results match what GfxCache.getimg() does for a single sprite.
+        scale = float(sizex) / gfxcache.width
+        ctx = cairo.Context(surface)
+        for row in range(rows):
+            for col in range(cols):
+                cell = sheet.create_for_rectangle(
+                    col * gfxcache.width, row * gfxcache.height,
+                    gfxcache.width, gfxcache.height)
+                ctx.save()
+                ctx.translate(col * sizex, row * sizey)
+                ctx.rectangle(0, 0, sizex, sizey)
+                ctx.clip()
+                ctx.scale(scale, scale)
+                ctx.set_source_surface(cell, 0, 0)
+                ctx.get_source().set_filter(cairo.FILTER_BILINEAR)
+                ctx.paint()
+                ctx.restore()
+        surface.flush()
+        return SpriteAtlas(surface, sizex, sizey)
+
+    def get_sprite(self, number):
+        """
+        Returns the given (zero-based) sprite as a subsurface of our
+        atlas, or None if it's not on the sheet.
+        """
+        if number not in self.sprites:
+            if self.cols == 0:
+                return None
+            row = number // self.cols
+            col = number % self.cols
+            if row >= self.rows:
+                return None
+            self.sprites[number] = self.surface.create_for_rectangle(
+                col * self.sizex, row * self.sizey, self.sizex, self.sizey)
+        return self.sprites[number]
+
+
 class GfxCache(object):
     """
     A class to hold graphic data, with resizing abilities and the like.
@@ -41,26 +147,38 @@ class GfxCache(object):
     Pixbuf (via getimg_gdk()).  There's some code duplication between
     those two functions, which isn't ideal, but I didn't want to take the
     time to abstract the common stuff out.  So there.
-    """
 
-    def __init__(self, pngdata, width, height, cols, overlay_func=None):
-        # First load the data as a Cairo surface
-        self.surface = cairo.ImageSurface.create_from_png(
-            io.BytesIO(pngdata))
+    The sheet itself is only decoded once we actually need it, and only
+    into the form that's asked for: sheets drawn on the map canvas never
+    turn into a Pixbuf, and sheets only shown in GTK widgets never turn
+    into a Cairo surface.  If we end up needing both, the second is
+    converted directly from the first rather than decoding the PNG again.
 
-        if overlay_func:
-            self.surface = overlay_func(self.surface, width, height, cols)
-            df = io.BytesIO()
-            self.surface.write_to_png(df)
-            pngdata = df.getvalue()
-            df.close()
+    If "atlas" is set, scaled Cairo sprites come out of a SpriteAtlas of
+    the whole sheet at that size, rather than being scaled one by one.
+    Those sprites are subsurfaces, though, so classes whose callers need
+    to ask the sprite for its dimensions should leave it off.
+    """
+
+    atlas = True
 
-        # For ease-of-use, we're also going to import it to a GDK Pixbuf
-        # This shouldn't hurt performance really since there's only a few files
-        loader = GdkPixbuf.PixbufLoader()
-        loader.write(pngdata)
-        loader.close()
-        self.pixbuf = loader.get_pixbuf()
+    def __init__(self, pngdata, width, height, cols, overlay_func=None, sprites=None,
+                 atlascache=None):
+        """
+        "sprites" is the LRUCache which our scaled images are kept in,
+        normally shared by all the caches of a Gfx object.  The unscaled
+        originals are kept by us, and never evicted.  If "atlascache" is
+        passed in, our atlases are also kept on disk in that AtlasCache.
+        """
+        if sprites is None:
+            sprites = new_sprite_cache()
+        self.sprites = sprites
+        self.atlascache = atlascache
+        self.pnghash = None
+        self.pngdata = pngdata
+        self.overlay_func = overlay_func
+        self._surface = None
+        self._pixbuf = None
         self.gdkcache = {}
 
         # Now assign the rest of our attributes
@@ -69,11 +187,78 @@ class GfxCache(object):
         self.cols = cols
         self.cache = {}
 
+    @staticmethod
+    def png_size(pngdata):
+        """
+        Returns the (width, height) of the given PNG data, straight out of
+        its header, so that we don't have to decode the image to find out.
+        """
+        if len(pngdata) < 24 or pngdata[:8] != b'\x89PNG\r\n\x1a\n' or pngdata[12:16] != b'IHDR':
+            raise LoadException('Graphics data is not a PNG image')
+        return struct.unpack('>II', pngdata[16:24])
+
+    @property
+    def surface(self):
+        """ Our sheet, as a Cairo surface """
+        if self._surface is None:
+            if self._pixbuf is not None:
+                self._surface = Gfx.pixbuf_to_surface(self._pixbuf)
+            else:
+                surface = cairo.ImageSurface.create_from_png(
+                    io.BytesIO(self.pngdata))
+                if self.overlay_func:
+                    surface = self.overlay_func(
+                        surface, self.width, self.height, self.cols)
+                self._surface = self.prepare_surface(surface)
+        return self._surface
+
+    @surface.setter
+    def surface(self, surface):
+        self._surface = surface
+
+    @property
+    def pixbuf(self):
+        """ Our sheet, as a GDK Pixbuf """
+        if self._pixbuf is None:
+            if self._surface is not None or self.overlay_func:
+                # Overlays are drawn with Cairo, so those sheets have to
+                # go through a surface regardless
+                self._pixbuf = Gfx.surface_to_pixbuf(self.surface)
+            else:
+                loader = GdkPixbuf.PixbufLoader()
+                loader.write(self.pngdata)
+                loader.close()
+                self._pixbuf = self.prepare_pixbuf(loader.get_pixbuf())
+        return self._pixbuf
+
+    @pixbuf.setter
+    def pixbuf(self, pixbuf):
+        self._pixbuf = pixbuf
+
+    def prepare_surface(self, surface):
+        """
+        Hook for implementing classes which need to rearrange the sheet
+        after it's been decoded into a Cairo surface.
+        """
+        return surface
+
+    def prepare_pixbuf(self, pixbuf):
+        """
+        Hook for implementing classes which need to rearrange the sheet
+        after it's been decoded into a GDK Pixbuf.  This should end up
+        with the same image as prepare_surface() does.
+        """
+        return pixbuf
+
     def getimg(self, number, sizex=None, gdk=False):
         """ Grab an image from the cache, as a Cairo surface. """
         if (gdk):
             return self.getimg_gdk(number, sizex)
         number -= 1
+        if (self.atlas and sizex is not None and sizex != self.width):
+            atlas = self.get_atlas(sizex)
+            if (atlas is not None):
+                return atlas.get_sprite(number)
         row = math.floor(number / self.cols)
         col = number % self.cols
         if (number not in self.cache):
@@ -82,35 +267,108 @@ class GfxCache(object):
             if (copy_x_from + self.width > self.surface.get_width() or
                     copy_y_from + self.height > self.surface.get_height()):
                 return None
-            self.cache[number] = {}
-            self.cache[number]['orig'] = cairo.ImageSurface(
+            self.cache[number] = cairo.ImageSurface(
                 cairo.FORMAT_ARGB32, self.width, self.height)
-            ctx = cairo.Context(self.cache[number]['orig'])
+            ctx = cairo.Context(self.cache[number])
             # Note the negative values here; nothing to be worried about.
             ctx.set_source_surface(self.surface, -copy_x_from, -copy_y_from)
             ctx.paint()
-            self.cache[number][self.width] = self.cache[number]['orig']
-        if (sizex is None):
-            return self.cache[number]['orig']
+        if (sizex is None or sizex == self.width):
+            return self.cache[number]
         else:
-            if (sizex not in self.cache[number]):
-                sizey = (sizex * self.height) / self.width
+            key = (self, False, number, sizex)
+            scaled = self.sprites.get(key)
+            if (scaled is None):
+                sizey = (sizex * self.height) // self.width
                 # This is crazy, seems like a million calls just to resize a bitmap
                 if (sizex > sizey):
                     scale = float(self.width) / sizex
                 else:
                     scale = float(self.height) / sizey
-                self.cache[number][sizex] = cairo.ImageSurface(
+                scaled = cairo.ImageSurface(
                     cairo.FORMAT_ARGB32, sizex, sizey)
-                imgpat = cairo.SurfacePattern(self.cache[number]['orig'])
+                imgpat = cairo.SurfacePattern(self.cache[number])
                 scaler = cairo.Matrix()
                 scaler.scale(scale, scale)
                 imgpat.set_matrix(scaler)
                 imgpat.set_filter(cairo.FILTER_BILINEAR)
-                ctx = cairo.Context(self.cache[number][sizex])
+                ctx = cairo.Context(scaled)
                 ctx.set_source(imgpat)
                 ctx.paint()
-            return self.cache[number][sizex]
+                self.sprites.put(key, scaled)
+            return scaled
+
+    def sheet_size(self):
+        """
+        Returns the (width, height) of our sheet, without decoding it if
+        we haven't already.
+        """
+        if self._surface is not None:
+            return (self._surface.get_width(), self._surface.get_height())
+        return self.png_size(self.pngdata)
+
+    def atlas_bytes(self, sizex, sizey):
+        """
+        Returns the number of bytes of pixel data in a SpriteAtlas of our
+        sheet with "sizex" by "sizey" sprites.
+        """
+        (sheetwidth, sheetheight) = self.sheet_size()
+        (cols, rows) = SpriteAtlas.grid(sheetwidth, sheetheight,
+                                        self.width, self.height, self.cols)
+        return cols * sizex * 4 * rows * sizey
+
+    def get_atlas(self, sizex):
+        """
+        Returns our SpriteAtlas for the given width, or None if sprites of
+        that width wouldn't come out a whole number of pixels high, or if
+        the atlas is too big to be kept in our sprite cache (in which case
+        it would just be built over again for every sprite).
+        """
+        if ((sizex * self.height) % self.width != 0):
+            return None
+        key = (self, 'atlas', sizex)
+        atlas = self.sprites.get(key)
+        if (atlas is None):
+            sizey = (sizex * self.height) // self.width
+            if (self.atlas_bytes(sizex, sizey) > self.sprites.budget):
+                return None
+            if (self.atlascache is None):
+                atlas = SpriteAtlas.build(self, sizex, sizey)
+            else:
+                atlas = self.get_disk_atlas(sizex, sizey)
+            self.sprites.put(key, atlas)
+        return atlas
+
+    def get_disk_atlas(self, sizex, sizey):
+        """
+        Returns our SpriteAtlas for the given sprite size out of our
+        AtlasCache, building and storing it if it's not there.  Loading
+        one maps the file straight into a surface, without decoding (or
+        even looking at) our sheet.
+        """
+        if self.overlay_func is None:
+            overlay = None
+        else:
+            overlay = self.overlay_func.__name__
+        if self.pnghash is None:
+            self.pnghash = self.atlascache.hash_data(self.pngdata)
+        diskkey = self.atlascache.get_key(
+            self.pnghash, type(self).__name__,
+            self.width, self.height, self.cols, sizex, overlay)
+        found = self.atlascache.load(diskkey)
+        if (found is not None):
+            (width, height, stride, data) = found
+            try:
+                surface = cairo.ImageSurface.create_for_data(
+                    data, cairo.FORMAT_ARGB32, width, height, stride)
+                return SpriteAtlas(surface, sizex, sizey)
+            except (cairo.Error, TypeError, ValueError) as e:
+                LOG.warning('Discarding unusable sprite atlas: %s' % (e))
+        atlas = SpriteAtlas.build(self, sizex, sizey)
+        surface = atlas.surface
+        self.atlascache.store(diskkey, surface.get_width(), surface.get_height(),
+                              surface.get_stride(), surface.get_data())
+        return atlas
 
     def getimg_gdk(self, number, sizex=None):
         """ Grab an image from the cache, as a GDK pixbuf """
@@ -123,26 +381,27 @@ class GfxCache(object):
             if (copy_x_from + self.width > self.pixbuf.get_property('width') or
                     copy_y_from + self.height > self.pixbuf.get_property('height')):
                 return None
-            self.gdkcache[number] = {}
-            self.gdkcache[number]['orig'] = GdkPixbuf.Pixbuf(self.pixbuf.get_colorspace(),
-                                                             self.pixbuf.get_has_alpha(),
-                                                             self.pixbuf.get_bits_per_sample(),
-                                                             self.width, self.height)
+            self.gdkcache[number] = GdkPixbuf.Pixbuf(self.pixbuf.get_colorspace(),
+                                                     self.pixbuf.get_has_alpha(),
+                                                     self.pixbuf.get_bits_per_sample(),
+                                                     self.width, self.height)
             self.pixbuf.copy_area(copy_x_from,
                                   copy_y_from,
                                   self.width,
                                   self.height,
-                                  self.gdkcache[number]['orig'],
+                                  self.gdkcache[number],
                                   0, 0)
-            self.gdkcache[number][self.width] = self.gdkcache[number]['orig']
-        if (sizex is None):
-            return self.gdkcache[number]['orig']
+        if (sizex is None or sizex == self.width):
+            return self.gdkcache[number]
         else:
-            if sizex not in self.gdkcache[number]:
+            key = (self, True, number, sizex)
+            scaled = self.sprites.get(key)
+            if scaled is None:
                 sizey = (sizex * self.height) // self.width
-                self.gdkcache[number][sizex] = self.gdkcache[number]['orig'].scale_simple(
+                scaled = self.gdkcache[number].scale_simple(
                     sizex, sizey, GdkPixbuf.InterpType.BILINEAR)
-            return self.gdkcache[number][sizex]
+                self.sprites.put(key, scaled)
+            return scaled
 
 
 class B1GfxEntCache(GfxCache):
@@ -153,33 +412,42 @@ class B1GfxEntCache(GfxCache):
     off much of the loaded image.
     """
 
-    def __init__(self, pngdata, cols=15, rows=8):
+    # The map drawing code needs to know how big our sprites are
+    atlas = False
+
+    def __init__(self, pngdata, cols=15, rows=8, sprites=None):
 
-        # Read in the data as usual, with junk for width and height
-        super(B1GfxEntCache, self).__init__(pngdata, -1, -1, 1)
+        # Set up as usual, with junk for width and height
+        super(B1GfxEntCache, self).__init__(pngdata, -1, -1, 1, sprites=sprites)
 
         # ... and now that we have the image dimensions, fix that junk
-        imgwidth = self.surface.get_width()
-        imgheight = self.surface.get_height()
+        (imgwidth, imgheight) = self.png_size(pngdata)
         self.width = int(imgwidth / cols)
         self.height = int(imgheight / rows)
 
         # Some information on size scaling
         self.size_scale = self.width / 52.0
 
-        # Lop off the data we don't need, to save on memory usage
+    def prepare_surface(self, surface):
+        """
+        Lop off the data we don't need, to save on memory usage
+        """
         newsurf = cairo.ImageSurface(
-            cairo.FORMAT_ARGB32, self.width, imgheight)
+            cairo.FORMAT_ARGB32, self.width, surface.get_height())
         newctx = cairo.Context(newsurf)
-        newctx.set_source_surface(self.surface, 0, 0)
+        newctx.set_source_surface(surface, 0, 0)
         newctx.paint()
-        self.surface = newsurf
+        return newsurf
 
-        # (and on our pixbuf copy as well)
+    def prepare_pixbuf(self, pixbuf):
+        """
+        (and on our pixbuf copy as well)
+        """
+        imgheight = pixbuf.get_property('height')
         newbuf = GdkPixbuf.Pixbuf(
             GdkPixbuf.Colorspace.RGB, True, 8, self.width, imgheight)
-        self.pixbuf.copy_area(0, 0, self.width, imgheight, newbuf, 0, 0)
-        self.pixbuf = newbuf
+        pixbuf.copy_area(0, 0, self.width, imgheight, newbuf, 0, 0)
+        return newbuf
 
 
 class B23GfxEntCache(GfxCache):
@@ -188,42 +456,67 @@ class B23GfxEntCache(GfxCache):
     of things here to support Book 2.
     """
 
-    def __init__(self, ent, pngdata):
+    # (as with B1GfxEntCache, our sprites get measured when drawn)
+    atlas = False
+
+    def __init__(self, ent, pngdata, sprites=None):
 
-        # Read in the data as usual, with junk for width and height
-        super(B23GfxEntCache, self).__init__(pngdata, -1, -1, 1)
+        # Set up as usual, with junk for width and height
+        super(B23GfxEntCache, self).__init__(pngdata, -1, -1, 1, sprites=sprites)
 
         # Figure out various dimensions
-        imgwidth = self.surface.get_width()
-        imgheight = self.surface.get_height()
+        (imgwidth, imgheight) = self.png_size(pngdata)
         self.width = ent.width
         self.height = ent.height
-        cols = int(imgwidth / ent.width)
-        # print '%s - %d x %d: %d cols' % (ent.name, self.width, self.height, cols)
+        self.ent = ent
+        self.sheet_cols = int(imgwidth / ent.width)
+        # print '%s - %d x %d: %d cols' % (ent.name, self.width, self.height, self.sheet_cols)
 
         # Some information on size scaling
         self.size_scale = self.width / 64.0
 
-        # Construct an abbreviated image with just one frame per direction
+    def frame_positions(self):
+        """
+        Yields the (x, y) position in the full sheet of the single frame we
+        keep for each direction.
+        """
+        for i in range(self.ent.dirs):
+            frame = self.ent.frames * i
+            col = (frame % self.sheet_cols)
+            row = int(frame / self.sheet_cols)
+            yield (col * self.width, row * self.height)
+
+    def prepare_surface(self, surface):
+        """
+        Construct an abbreviated image with just one frame per direction
+        """
         newsurf = cairo.ImageSurface(
-            cairo.FORMAT_ARGB32, self.width, self.height * ent.dirs)
+            cairo.FORMAT_ARGB32, self.width, self.height * self.ent.dirs)
         newctx = cairo.Context(newsurf)
         newctx.save()
-        for i in range(ent.dirs):
-            frame = ent.frames * i
-            col = (frame % cols)
-            row = int(frame / cols)
+        for (i, (x, y)) in enumerate(self.frame_positions()):
             newctx.set_operator(cairo.OPERATOR_SOURCE)
             newctx.set_source_surface(
-                self.surface, -col * self.width, -row * self.height + (i * self.height))
+                surface, -x, -y + (i * self.height))
             newctx.rectangle(0, i * self.height, self.width, self.height)
             newctx.fill()
         newctx.restore()
-        self.surface = newsurf
-        #newsurf.write_to_png('computed_%s' % (ent.gfxfile))
+        #newsurf.write_to_png('computed_%s' % (self.ent.gfxfile))
+        return newsurf
 
-        # (and on our pixbuf copy as well)
-        self.pixbuf = Gfx.surface_to_pixbuf(newsurf)
+    def prepare_pixbuf(self, pixbuf):
+        """
+        (and the same for our pixbuf copy)
+        """
+        newbuf = GdkPixbuf.Pixbuf(
+            GdkPixbuf.Colorspace.RGB, True, 8, self.width, self.height * self.ent.dirs)
+        newbuf.fill(0)
+        for (i, (x, y)) in enumerate(self.frame_positions()):
+            if (x + self.width <= pixbuf.get_property('width') and
+                    y + self.height <= pixbuf.get_property('height')):
+                pixbuf.copy_area(x, y, self.width, self.height,
+                                 newbuf, 0, i * self.height)
+        return newbuf
 
 
 class SingleImageGfxCache(GfxCache):
@@ -232,29 +525,19 @@ class SingleImageGfxCache(GfxCache):
     Only used for Book 2 at the moment, hence our "64" hardcode down below.
     """
 
-    def __init__(self, pngdata, scale=64.0):
+    # There's only one image on our sheet anyway
+    atlas = False
+
+    def __init__(self, pngdata, scale=64.0, sprites=None):
 
-        # Read the data as usual, with junk for width and height
-        super(SingleImageGfxCache, self).__init__(pngdata, -1, -1, 1)
+        # Set up as usual, with junk for width and height
+        super(SingleImageGfxCache, self).__init__(pngdata, -1, -1, 1, sprites=sprites)
 
         # And now set the image dimensions appropriately
-        self.width = self.surface.get_width()
-        self.height = self.surface.get_height()
+        (self.width, self.height) = self.png_size(pngdata)
         self.size_scale = self.width / scale
 
 
-class PakIndex(object):
-    """ A class to hold information on an individual file in the pak. """
-
-    def __init__(self, data):
-        (self.size_compressed,
-         self.abs_index,
-         self.size_real,
-         self.unknowni1) = unpack('<IIII', data[:16])
-        self.filename = data[16:]
-        self.filename = self.filename[:self.filename.index(b"\x00")].decode("UTF-8")
-
-
 class Gfx(object):
     """ A class to hold graphics data. """
 
@@ -296,6 +579,13 @@ class Gfx(object):
         self.entcache = {}
         self.flamecache = None
 
+        # Scaled versions of the graphics from all of the above, which
+        # get thrown out as needed to stay within our memory budget
+        self.sprites = new_sprite_cache()
+
+        # On-disk cache of our scaled sheets, if we've been given one
+        self.atlascache = None
+
         # Now do an initial read
         self.initialread()
 
@@ -310,34 +600,78 @@ class Gfx(object):
     @staticmethod
     def surface_to_pixbuf(surface):
         """
-        Helper function to convert a Cairo surface to a GDK Pixbuf.  It's
-        very slow, don't use it if you need speed.  It's probably about as
-        fast as you're going to get, though, since every other method I've
-        found would require you to loop through and fix each pixel in the
-        pixbuf afterwards.
+        Helper function to convert a Cairo surface to a GDK Pixbuf.  The
+        pixels are copied straight across (see eschalon.pixels), with no
+        PNG encode/decode in between.
+        """
+        surface.flush()
+        width = surface.get_width()
+        height = surface.get_height()
+        data = pixels.argb32_to_rgba(surface.get_data(), width, height,
+                                     surface.get_stride())
+        return GdkPixbuf.Pixbuf.new_from_bytes(GLib.Bytes.new(data),
+                                               GdkPixbuf.Colorspace.RGB,
+                                               True, 8, width, height, width * 4)
+
+    @staticmethod
+    def pixbuf_to_surface(pixbuf):
+        """
+        Helper function to convert a GDK Pixbuf to a Cairo surface, the
+        opposite of surface_to_pixbuf().
+        """
+        if not pixbuf.get_has_alpha():
+            pixbuf = pixbuf.add_alpha(False, 0, 0, 0)
+        width = pixbuf.get_width()
+        height = pixbuf.get_height()
+        data = pixels.rgba_to_argb32(pixbuf.get_pixels(), width, height,
+                                     pixbuf.get_rowstride())
+        return cairo.ImageSurface.create_for_data(
+            data, cairo.FORMAT_ARGB32, width, height, width * 4)
+
+    def set_sprite_budget(self, budget):
+        """
+        Sets the number of bytes our scaled graphics are allowed to take
+        up.  The unscaled originals don't count towards this.
+        """
+        self.sprites.set_budget(budget)
+
+    def get_sprite_stats(self):
+        """
+        Returns a dict of statistics about our cache of scaled graphics
+        (see LRUCache.stats()).
         """
-        df = io.BytesIO()
-        surface.write_to_png(df)
-        loader = GdkPixbuf.PixbufLoader()
-        loader.write(df.getvalue())
-        loader.close()
-        df.close()
-        return loader.get_pixbuf()
+        return self.sprites.stats()
+
+    def set_atlas_cachedir(self, cachedir):
+        """
+        Sets the directory our scaled sheets get cached in, across sessions
+        (see AtlasCache).  This should be done before any graphics are
+        loaded.
+        """
+        self.atlascache = AtlasCache(cachedir, self.book)
 
     @staticmethod
-    def new(book, datadir, eschalondata):
+    def new(book, datadir, eschalondata, sprite_budget=None, atlas_cachedir=None):
         """
-        Returns a B1Gfx or B2Gfx object, depending on the book that we're working with
+        Returns a B1Gfx or B2Gfx object, depending on the book that we're working with.
+        "sprite_budget" optionally overrides the default size, in bytes, of our
+        cache of scaled graphics, and "atlas_cachedir" is where to cache scaled
+        sheets on disk, if anywhere.
         """
         if book == 1:
-            return B1Gfx(datadir, eschalondata)
+            gfx = B1Gfx(datadir, eschalondata)
         elif book == 2:
-            return B2Gfx(datadir, eschalondata)
+            gfx = B2Gfx(datadir, eschalondata)
         elif book == 3:
-            return B3Gfx(datadir, eschalondata)
+            gfx = B3Gfx(datadir, eschalondata)
         else:
             raise LoadException(
                 'Book number must be 1, 2, or 3 (passed %d)' % (book))
+        if sprite_budget is not None:
+            gfx.set_sprite_budget(sprite_budget)
+        if atlas_cachedir is not None:
+            gfx.set_atlas_cachedir(atlas_cachedir)
+        return gfx
 
 
 class B1Gfx(Gfx):
@@ -410,24 +744,14 @@ class B1Gfx(Gfx):
         # Restricted entities (only one direction)
         self.restrict_ents = [50, 55, 58, 66, 67, 71]
 
-        # Book 1 specific vars (just the PAK structure stuff)
-        self.unknownh1 = -1
-        self.unknownh2 = -1
-        self.numfiles = -1
-        self.compressed_idx_size = -1
-        self.unknowni1 = -1
-        self.fileindex = {}
-        self.zeroindex = -1
+        # Our PAK archive, once we've loaded it
+        self.pak = None
 
         # Book 1 specific caches
         self.itemcache = None
 
         # Graphics PAK file
         self.pakloc = os.path.join(eschalondata.gamedir, 'gfx.pak')
-        if os.path.isfile(self.pakloc):
-            self.df = Savefile(self.pakloc)
-        else:
-            self.df = None
 
         # Set our loaded status
         self.loaded = False
@@ -438,65 +762,27 @@ class B1Gfx(Gfx):
     def readfile(self, filename: str) -> object:
         """ Reads a given filename out of the PAK. """
         if self.loaded:
-            filepath = os.path.join(
-                self.eschalondata.gamedir, 'packedgraphics', filename)
-            if os.path.isfile(filepath):
-                return open(filepath, 'rb').read()
-            if filename in self.fileindex:
-                self.df.open_r()
-                self.df.seek(self.zeroindex +
-                             self.fileindex[filename].abs_index)
-                # On Windows, we need to specify bufsize or memory gets clobbered
-                filedata = zlib.decompress(
-                    self.df.read(self.fileindex[filename].size_compressed),
-                    15,
-                    self.fileindex[filename].size_real)
-                self.df.close()
-                return filedata
-            else:
-                raise LoadException(
-                    'Filename %s not found in archive' % (filename))
+            return self.pak.readfile(filename)
         else:
             raise LoadException('PAK Index has not been loaded')
 
     def initialread(self):
-        """ Read in the main file index. """
-
-        df = self.df
-        if df is None:
-            self.loaded = True
-            return
-
-        df.open_r()
-        header = df.read(4)
-        if (header != b'!PAK'):
-            df.close()
-            raise LoadException('Invalid PAK header')
-
-        # Initial Values
-        self.unknownh1 = df.readshort()
-        self.unknownh2 = df.readshort()
-        self.numfiles = df.readint()
-        self.compressed_idx_size = df.readint()
-        self.unknowni1 = df.readint()
-
-        # Now load in the index
-        decobj = zlib.decompressobj()
-        indexdata = decobj.decompress(df.read())
-        self.zeroindex = df.tell() - len(decobj.unused_data)
-        for i in range(self.numfiles):
-            index = PakIndex(indexdata[:272])
-            indexdata = indexdata[272:]
-            self.fileindex[index.filename] = index
-
-        # Close and clean up
-        df.close()
+        """
+        Read in the main file index.  Files in the game's "packedgraphics"
+        directory override the contents of the PAK.
+        """
+        if os.path.isfile(self.pakloc):
+            pakloc = self.pakloc
+        else:
+            pakloc = None
+        self.pak = PakArchive(pakloc, os.path.join(
+            self.eschalondata.gamedir, 'packedgraphics'))
         self.loaded = True
 
     def get_item(self, item, size=None, gdk=True):
         if (self.itemcache is None):
             self.itemcache = GfxCache(self.readfile(
-                'items_mastersheet.png'), 42, 42, 10)
+                'items_mastersheet.png'), 42, 42, 10, sprites=self.sprites)
         return self.itemcache.getimg(item.pictureid + 1, size, gdk)
 
     def get_floor(self, floornum, size=None, gdk=False):
@@ -504,7 +790,8 @@ class B1Gfx(Gfx):
             return None
         if (self.floorcache is None):
             self.floorcache = GfxCache(self.readfile(
-                'iso_tileset_base.png'), 52, 26, 6)
+                'iso_tileset_base.png'), 52, 26, 6, sprites=self.sprites,
+                atlascache=self.atlascache)
         return self.floorcache.getimg(floornum, size, gdk)
 
     def get_decal(self, decalnum, size=None, gdk=False):
@@ -512,7 +799,8 @@ class B1Gfx(Gfx):
             return None
         if (self.decalcache is None):
             self.decalcache = GfxCache(self.readfile(
-                'iso_tileset_base_decals.png'), 52, 26, 6)
+                'iso_tileset_base_decals.png'), 52, 26, 6, sprites=self.sprites,
+                atlascache=self.atlascache)
         return self.decalcache.getimg(decalnum, size, gdk)
 
     # Returns a tuple, first item is the surface, second is the extra height to add while drawing
@@ -529,22 +817,26 @@ class B1Gfx(Gfx):
         if gfxgroup == self.GFX_SET_A:
             if (self.objcache1 is None):
                 self.objcache1 = GfxCache(self.readfile(
-                    'iso_tileset_obj_a.png'), 52, 52, 6)
+                    'iso_tileset_obj_a.png'), 52, 52, 6, sprites=self.sprites,
+                    atlascache=self.atlascache)
             return (self.objcache1.getimg(objnum, size, gdk), 1, 0)
         elif gfxgroup == self.GFX_SET_B:
             if (self.objcache2 is None):
                 self.objcache2 = GfxCache(self.readfile(
-                    'iso_tileset_obj_b.png'), 52, 78, 6)
+                    'iso_tileset_obj_b.png'), 52, 78, 6, sprites=self.sprites,
+                    atlascache=self.atlascache)
             return (self.objcache2.getimg(objnum - 100, size, gdk), 2, 0)
         elif gfxgroup == self.GFX_SET_C:
             if (self.objcache3 is None):
                 self.objcache3 = GfxCache(self.readfile(
-                    'iso_tileset_obj_c.png'), 52, 78, 6)
+                    'iso_tileset_obj_c.png'), 52, 78, 6, sprites=self.sprites,
+                    atlascache=self.atlascache)
             return (self.objcache3.getimg(objnum - 160, size, gdk), 2, 0)
         else:
             if (self.objcache4 is None):
                 self.objcache4 = GfxCache(
-                    self.readfile('iso_trees.png'), 52, 130, 5)
+                    self.readfile('iso_trees.png'), 52, 130, 5, sprites=self.sprites,
+                    atlascache=self.atlascache)
             if (objnum in self.treemap):
                 return (self.objcache4.getimg(self.treemap[objnum], size, gdk), 4, 0)
             else:
@@ -555,7 +847,8 @@ class B1Gfx(Gfx):
             return None
         if (self.objdecalcache is None):
             self.objdecalcache = GfxCache(self.readfile(
-                'iso_tileset_obj_decals.png'), 52, 78, 6)
+                'iso_tileset_obj_decals.png'), 52, 78, 6, sprites=self.sprites,
+                atlascache=self.atlascache)
         return self.objdecalcache.getimg(decalnum, size, gdk)
 
     def get_flame(self, size=None, gdk=False):
@@ -567,7 +860,7 @@ class B1Gfx(Gfx):
         if (self.flamecache is None):
             with open(os.path.join(self.datadir, 'torch_single.png'), 'rb') as df:
                 flamedata = df.read()
-            self.flamecache = B1GfxEntCache(flamedata, 1, 1)
+            self.flamecache = B1GfxEntCache(flamedata, 1, 1, sprites=self.sprites)
         if (size is None):
             size = self.tile_width
         return self.flamecache.getimg(1, int(size * self.flamecache.size_scale), gdk)
@@ -581,9 +874,10 @@ class B1Gfx(Gfx):
             filename = 'mo%d.png' % (entnum)
             if (entnum in self.restrict_ents):
                 self.entcache[entnum] = B1GfxEntCache(
-                    self.readfile(filename), 2, 1)
+                    self.readfile(filename), 2, 1, sprites=self.sprites)
             else:
-                self.entcache[entnum] = B1GfxEntCache(self.readfile(filename))
+                self.entcache[entnum] = B1GfxEntCache(
+                    self.readfile(filename), sprites=self.sprites)
         cache = self.entcache[entnum]
         if (size is None):
             size = self.tile_width
@@ -754,7 +1048,8 @@ class B2Gfx(Gfx):
             idx = self.itemcategory_gfxcache_idx[item.category]
         if (self.itemcache[idx] is None):
             self.itemcache[idx] = GfxCache(self.eschalondata.readfile(
-                '%s_sheet.png' % (idx)), 50, 50, 10, self.itemcache_overlayfunc[idx])
+                '%s_sheet.png' % (idx)), 50, 50, 10, self.itemcache_overlayfunc[idx],
+                sprites=self.sprites)
         return self.itemcache[idx].getimg(item.pictureid + 1, size, gdk)
 
     def get_floor(self, floornum, size=None, gdk=False):
@@ -762,7 +1057,8 @@ class B2Gfx(Gfx):
             return None
         if (self.floorcache is None):
             self.floorcache = GfxCache(
-                self.eschalondata.readfile('iso_base.png'), 64, 32, 8)
+                self.eschalondata.readfile('iso_base.png'), 64, 32, 8, sprites=self.sprites,
+                atlascache=self.atlascache)
         return self.floorcache.getimg(floornum, size, gdk)
 
     def get_decal(self, decalnum, size=None, gdk=False):
@@ -770,7 +1066,8 @@ class B2Gfx(Gfx):
             return None
         if (self.decalcache is None):
             self.decalcache = GfxCache(self.eschalondata.readfile(
-                'iso_basedecals.png'), 64, 32, 16)
+                'iso_basedecals.png'), 64, 32, 16, sprites=self.sprites,
+                atlascache=self.atlascache)
         return self.decalcache.getimg(decalnum, size, gdk)
 
     # Returns a tuple, first item is the surface, second is the extra height to add while drawing
@@ -784,17 +1081,20 @@ class B2Gfx(Gfx):
         if (walltype == self.GFX_SET_OBJ):
             if (self.objcache1 is None):
                 self.objcache1 = GfxCache(
-                    self.eschalondata.readfile('iso_obj.png'), 64, 64, 16)
+                    self.eschalondata.readfile('iso_obj.png'), 64, 64, 16,
+                    sprites=self.sprites, atlascache=self.atlascache)
             return (self.objcache1.getimg(objnum, size, gdk), 1, 0)
         elif (walltype == self.GFX_SET_WALL):
             if (self.objcache2 is None):
                 self.objcache2 = GfxCache(
-                    self.eschalondata.readfile('iso_walls.png'), 64, 96, 16)
+                    self.eschalondata.readfile('iso_walls.png'), 64, 96, 16,
+                    sprites=self.sprites, atlascache=self.atlascache)
             return (self.objcache2.getimg(objnum - 255, size, gdk), 2, 0)
         elif (walltype == self.GFX_SET_TREE):
             if (self.treecache[treeset] is None):
                 self.treecache[treeset] = GfxCache(self.eschalondata.readfile(
-                    'iso_trees%d.png' % (treeset)), 96, 160, 5)
+                    'iso_trees%d.png' % (treeset)), 96, 160, 5, sprites=self.sprites,
+                    atlascache=self.atlascache)
             if (objnum in self.treemap):
                 # note the size difference for Book 2 trees (50% wider)
                 if not size:
@@ -810,7 +1110,8 @@ class B2Gfx(Gfx):
             return None
         if (self.objdecalcache is None):
             self.objdecalcache = GfxCache(
-                self.eschalondata.readfile('iso_objdecals.png'), 64, 96, 16)
+                self.eschalondata.readfile('iso_objdecals.png'), 64, 96, 16,
+                sprites=self.sprites, atlascache=self.atlascache)
         return self.objdecalcache.getimg(decalnum, size, gdk)
 
     def get_flame(self, size=None, gdk=False):
@@ -826,7 +1127,8 @@ class B2Gfx(Gfx):
             # The torch image came from Book 1 and is scaled to 52 pixels, not
             # 64, which is why we're passing that in here.  I figure there's not
             # much point to having a separate Book 1 and Book 2 flame graphic.
-            self.flamecache = SingleImageGfxCache(flamedata, 52.0)
+            self.flamecache = SingleImageGfxCache(
+                flamedata, 52.0, sprites=self.sprites)
         if (size is None):
             size = self.tile_width
         return self.flamecache.getimg(1, int(size * self.flamecache.size_scale), gdk)
@@ -839,7 +1141,8 @@ class B2Gfx(Gfx):
             df = open(os.path.join(self.datadir, 'zappy_single.png'), 'rb')
             zapperdata = df.read()
             df.close()
-            self.zappercache = SingleImageGfxCache(zapperdata)
+            self.zappercache = SingleImageGfxCache(
+                zapperdata, sprites=self.sprites)
         if (size is None):
             size = self.tile_width
         return self.zappercache.getimg(1, int(size * self.zappercache.size_scale), gdk)
@@ -854,7 +1157,7 @@ class B2Gfx(Gfx):
                 return None
             try:
                 self.hugegfxcache[filename] = SingleImageGfxCache(
-                    self.eschalondata.readfile(filename))
+                    self.eschalondata.readfile(filename), sprites=self.sprites)
             except LoadException:
                 LOG.exception("failed to load huge graphics")
                 return None
@@ -869,7 +1172,7 @@ class B2Gfx(Gfx):
         if (entnum not in self.entcache):
             filename = ent.gfxfile
             self.entcache[entnum] = B23GfxEntCache(
-                ent, self.eschalondata.readfile(filename))
+                ent, self.eschalondata.readfile(filename), sprites=self.sprites)
         cache = self.entcache[entnum]
         if (size is None):
             size = self.tile_width
@@ -22,6 +22,7 @@ import logging
 from typing import Any, List, Optional
 
 from eschalon.constants import constants as c
+from eschalon.schema import STR, Field, Schema
 
 LOG = logging.getLogger(__name__)
 
@@ -29,9 +30,17 @@ LOG = logging.getLogger(__name__)
 class Item(object):
     """Class to hold a single Item's information."""
 
+    __slots__ = ('item_name', 'script', 'category', 'subcategory', 'weight',
+                 'pictureid', 'value', 'canstack', 'quantity', 'basedamage',
+                 'basearmor', 'rarity')
+
     book: Optional[int] = None
     form_elements = []  # type: List[Any]
 
+    # Our on-disk layout (see eschalon.schema), which also drives
+    # replication and equality
+    schema: Optional[Schema] = None
+
     def __init__(self, zero=False):
         """ Create a new Item object with no information. """
 
@@ -75,34 +84,19 @@ class Item(object):
         """
         pass
 
-    def replicate(self):
-
-        newitem = Item.new(self.book)
+    def read(self, df):
+        """ Given a file descriptor, read in the item. """
+        self.schema.read(self, df)
 
-        newitem.category = self.category
-        newitem.subcategory = self.subcategory
-        newitem.item_name = self.item_name
-        newitem.weight = self.weight
-        newitem.pictureid = self.pictureid
-        newitem.value = self.value
-        newitem.canstack = self.canstack
-        newitem.quantity = self.quantity
-        newitem.basedamage = self.basedamage
-        newitem.basearmor = self.basearmor
-        newitem.script = self.script
-        newitem.rarity = self.rarity
-
-        # Call out to superclass replication
-        self._sub_replicate(newitem)
+    def write(self, df):
+        """ Write the item to the file. """
+        self.schema.write(self, df)
 
+    def replicate(self):
+        newitem = Item.new(self.book)
+        self.schema.copy(self, newitem)
         return newitem
 
-    def _sub_replicate(self, newitem):
-        """
-        Stub for superclasses to override, to replicate specific vars
-        """
-        pass
-
     def _convert_savegame(self, savegame):
         """
         Converts ourself to a savegame or global object.  This could be
@@ -125,25 +119,7 @@ class Item(object):
         checking if our values are the same, NOT if we're *actually*
         the same object.  Returns true for equality, false for inequality.
         """
-        return (self._sub_equals(item) and
-                self.category == item.category and
-                self.subcategory == item.subcategory and
-                self.item_name == item.item_name and
-                self.weight == item.weight and
-                self.pictureid == item.pictureid and
-                self.value == item.value and
-                self.canstack == item.canstack and
-                self.quantity == item.quantity and
-                self.basedamage == item.basedamage and
-                self.basearmor == item.basearmor and
-                self.script == item.script and
-                self.rarity == item.rarity)
-
-    def _sub_equals(self, item):
-        """
-        Stub for superclasses to override, to check for equality
-        """
-        pass
+        return self.schema.equals(self, item)
 
     def display(self, unknowns=False):
         """
@@ -220,8 +196,8 @@ class Item(object):
             else:
                 if c.book == 1:
                     for i in range(1, 4):
-                        modified_var = self.__dict__['attr_modified_%d' % (i)]
-                        modifier_var = self.__dict__['attr_modifier_%d' % (i)]
+                        modified_var = getattr(self, 'attr_modified_%d' % (i))
+                        modifier_var = getattr(self, 'attr_modifier_%d' % (i))
                         if modified_var > 0 or modifier_var > 0:
                             if modified_var in c.itemeffecttable:
                                 modified_var = c.itemeffecttable[modified_var]
@@ -229,8 +205,8 @@ class Item(object):
                                        (i, modifier_var, modified_var))
                 else:
                     for i in range(1, 3):
-                        modified_var = self.__dict__['bonus_value_%d' % (i)]
-                        modifier_var = self.__dict__['bonus_%d' % (i)]
+                        modified_var = getattr(self, 'bonus_value_%d' % (i))
+                        modifier_var = getattr(self, 'bonus_%d' % (i))
                         if modified_var != 0:
                             if modifier_var in c.itemeffecttable:
                                 modifier_var = c.itemeffecttable[modifier_var]
@@ -281,7 +257,41 @@ class B1Item(Item):
     Item structure for Book 1
     """
 
+    __slots__ = ('attr_modified', 'attr_modifier', 'skill_modified',
+                 'skill_modifier', 'mana', 'tohit', 'damage', 'armor', 'incr',
+                 'flags', 'hitpoint', 'duration', 'zero1', 'emptystr')
+
     book = 1
+
+    schema = Schema(
+        Field('category', 'I'),
+        Field('item_name', STR),
+        Field('weight', 'd'),
+        Field('subcategory', 'I'),
+        Field('rarity', 'I'),
+        Field('pictureid', 'I'),
+        Field('value', 'I'),
+        Field('canstack', 'I'),
+        Field('quantity', 'I'),
+        Field('basedamage', 'I'),
+        Field('basearmor', 'I'),
+        Field('attr_modified', 'I'),
+        Field('attr_modifier', 'I'),
+        Field('skill_modified', 'I'),
+        Field('skill_modifier', 'I'),
+        Field('hitpoint', 'I'),
+        Field('mana', 'I'),
+        Field('tohit', 'I'),
+        Field('damage', 'I'),
+        Field('armor', 'I'),
+        Field('incr', 'I'),
+        Field('flags', 'I'),
+        Field('script', STR),
+        Field('emptystr', STR),
+        Field('zero1', 'I'),
+        Field('duration', 'I'),
+    )
+
     form_elements = ['item_b1_modifier_box',
                      'subcategory_label', 'subcategory',
                      'zero1_label', 'zero1',
@@ -314,84 +324,9 @@ class B1Item(Item):
 
     def read(self, df):
         """ Given a file descriptor, read in the item. """
-
-        self.category = df.readint()
-        self.item_name = df.readstr().decode('UTF-8')
-        self.weight = df.readdouble()
+        super(B1Item, self).read(df)
         assert self.weight >= 0
-        self.subcategory = df.readint()
-        self.rarity = df.readint()
-        self.pictureid = df.readint()
-        self.value = df.readint()
-        self.canstack = df.readint()
-        self.quantity = df.readint()
         assert self.quantity >= 0
-        self.basedamage = df.readint()
-        self.basearmor = df.readint()
-        self.attr_modified = df.readint()
-        self.attr_modifier = df.readint()
-        self.skill_modified = df.readint()
-        self.skill_modifier = df.readint()
-        self.hitpoint = df.readint()
-        self.mana = df.readint()
-        self.tohit = df.readint()
-        self.damage = df.readint()
-        self.armor = df.readint()
-        self.incr = df.readint()
-        self.flags = df.readint()
-        self.script = df.readstr().decode('UTF-8')
-        self.emptystr = df.readstr().decode('UTF-8')
-        self.zero1 = df.readint()
-        self.duration = df.readint()
-
-    def write(self, df):
-        """ Write the item to the file. """
-
-        df.writeint(self.category)
-        df.writestr(self.item_name)
-        df.writedouble(self.weight)
-        df.writeint(self.subcategory)
-        df.writeint(self.rarity)
-        df.writeint(self.pictureid)
-        df.writeint(self.value)
-        df.writeint(self.canstack)
-        df.writeint(self.quantity)
-        df.writeint(self.basedamage)
-        df.writeint(self.basearmor)
-        df.writeint(self.attr_modified)
-        df.writeint(self.attr_modifier)
-        df.writeint(self.skill_modified)
-        df.writeint(self.skill_modifier)
-        df.writeint(self.hitpoint)
-        df.writeint(self.mana)
-        df.writeint(self.tohit)
-        df.writeint(self.damage)
-        df.writeint(self.armor)
-        df.writeint(self.incr)
-        df.writeint(self.flags)
-        df.writestr(self.script)
-        df.writestr(self.emptystr)
-        df.writeint(self.zero1)
-        df.writeint(self.duration)
-
-    def _sub_replicate(self, newitem):
-        """
-        Replicate Book 1 specific item vars
-        """
-        newitem.attr_modified = self.attr_modified
-        newitem.attr_modifier = self.attr_modifier
-        newitem.skill_modified = self.skill_modified
-        newitem.skill_modifier = self.skill_modifier
-        newitem.hitpoint = self.hitpoint
-        newitem.mana = self.mana
-        newitem.tohit = self.tohit
-        newitem.damage = self.damage
-        newitem.armor = self.armor
-        newitem.incr = self.incr
-        newitem.flags = self.flags
-        newitem.duration = self.duration
-        newitem.zero1 = self.zero1
-        newitem.emptystr = self.emptystr
 
     def _sub_tozero(self):
         """
@@ -412,25 +347,6 @@ class B1Item(Item):
         self.zero1 = 0
         self.emptystr = ''
 
-    def _sub_equals(self, item):
-        """
-        Book 1 specific equality.
-        """
-        return (self.attr_modified == item.attr_modified and
-                self.attr_modifier == item.attr_modifier and
-                self.skill_modified == item.skill_modified and
-                self.skill_modifier == item.skill_modifier and
-                self.hitpoint == item.hitpoint and
-                self.mana == item.mana and
-                self.tohit == item.tohit and
-                self.damage == item.damage and
-                self.armor == item.armor and
-                self.incr == item.incr and
-                self.flags == item.flags and
-                self.duration == item.duration and
-                self.zero1 == item.zero1 and
-                self.emptystr == item.emptystr)
-
     def hasborder(self):
         """ Decide whether or not a blue border would be drawn for this
             item, in the game. """
@@ -451,7 +367,40 @@ class B2Item(Item):
     Item structure for Book 2
     """
 
+    __slots__ = ('quest', 'max_hp', 'cur_hp', 'bonus_1', 'bonus_value_1',
+                 'bonus_2', 'bonus_value_2', 'bonus_3', 'bonus_value_3',
+                 'material', 'spell', 'spell_power', 'is_projectile')
+
     book = 2
+
+    schema = Schema(
+        Field('category', 'B'),
+        Field('quest', 'B'),
+        Field('item_name', STR),
+        Field('weight', 'f'),
+        Field('subcategory', 'B'),
+        Field('max_hp', 'H'),
+        Field('cur_hp', 'H'),
+        Field('material', 'B'),
+        Field('rarity', 'B'),
+        Field('pictureid', 'H'),
+        Field('value', 'H'),
+        Field('canstack', 'B'),
+        Field('quantity', 'H'),
+        Field('basedamage', 'B'),
+        Field('basearmor', 'B'),
+        Field('bonus_1', 'B'),
+        Field('bonus_value_1', 'B'),
+        Field('bonus_2', 'B'),
+        Field('bonus_value_2', 'B'),
+        Field('bonus_3', 'B'),
+        Field('bonus_value_3', 'i'),
+        Field('script', STR),
+        Field('spell', STR),
+        Field('spell_power', 'B'),
+        Field('is_projectile', 'B'),
+    )
+
     form_elements = ['item_b2_modifier_box',
                      'subcategory_label', 'subcategory',
                      'cur_hp_label', 'cur_hp',
@@ -485,82 +434,6 @@ class B2Item(Item):
         # Now the parent constructor
         super(B2Item, self).__init__(zero)
 
-    def read(self, df):
-        """ Given a file descriptor, read in the item. """
-
-        self.category = df.readuchar()
-        self.quest = df.readuchar()
-        self.item_name = df.readstr().decode('UTF-8')
-        self.weight = df.readfloat()
-        self.subcategory = df.readuchar()
-        self.max_hp = df.readshort()
-        self.cur_hp = df.readshort()
-        self.material = df.readuchar()
-        self.rarity = df.readuchar()
-        self.pictureid = df.readshort()
-        self.value = df.readshort()
-        self.canstack = df.readuchar()
-        self.quantity = df.readshort()
-        self.basedamage = df.readuchar()
-        self.basearmor = df.readuchar()
-        self.bonus_1 = df.readuchar()
-        self.bonus_value_1 = df.readuchar()
-        self.bonus_2 = df.readuchar()
-        self.bonus_value_2 = df.readuchar()
-        self.bonus_3 = df.readuchar()
-        self.bonus_value_3 = df.readsint()
-        self.script = df.readstr().decode('UTF-8')
-        self.spell = df.readstr().decode('UTF-8')
-        self.spell_power = df.readuchar()
-        self.is_projectile = df.readuchar()
-
-    def write(self, df):
-        """ Write the item to the file. """
-
-        df.writeuchar(self.category)
-        df.writeuchar(self.quest)
-        df.writestr(self.item_name)
-        df.writefloat(self.weight)
-        df.writeuchar(self.subcategory)
-        df.writeshort(self.max_hp)
-        df.writeshort(self.cur_hp)
-        df.writeuchar(self.material)
-        df.writeuchar(self.rarity)
-        df.writeshort(self.pictureid)
-        df.writeshort(self.value)
-        df.writeuchar(self.canstack)
-        df.writeshort(self.quantity)
-        df.writeuchar(self.basedamage)
-        df.writeuchar(self.basearmor)
-        df.writeuchar(self.bonus_1)
-        df.writeuchar(self.bonus_value_1)
-        df.writeuchar(self.bonus_2)
-        df.writeuchar(self.bonus_value_2)
-        df.writeuchar(self.bonus_3)
-        df.writesint(self.bonus_value_3)
-        df.writestr(self.script)
-        df.writestr(self.spell)
-        df.writeuchar(self.spell_power)
-        df.writeuchar(self.is_projectile)
-
-    def _sub_replicate(self, newitem):
-        """
-        Replicate Book 2 specific item vars
-        """
-        newitem.quest = self.quest
-        newitem.max_hp = self.max_hp
-        newitem.cur_hp = self.cur_hp
-        newitem.bonus_1 = self.bonus_1
-        newitem.bonus_value_1 = self.bonus_value_1
-        newitem.bonus_2 = self.bonus_2
-        newitem.bonus_value_2 = self.bonus_value_2
-        newitem.bonus_3 = self.bonus_3
-        newitem.bonus_value_3 = self.bonus_value_3
-        newitem.material = self.material
-        newitem.spell = self.spell
-        newitem.spell_power = self.spell_power
-        newitem.is_projectile = self.is_projectile
-
     def _sub_tozero(self):
         """
         Zeroes out all Book 2 specific vars
@@ -579,24 +452,6 @@ class B2Item(Item):
         self.spell_power = 0
         self.is_projectile = 0
 
-    def _sub_equals(self, item):
-        """
-        Book 2 specific equality.
-        """
-        return (self.quest == item.quest and
-                self.max_hp == item.max_hp and
-                self.cur_hp == item.cur_hp and
-                self.bonus_1 == item.bonus_1 and
-                self.bonus_value_1 == item.bonus_value_1 and
-                self.bonus_2 == item.bonus_2 and
-                self.bonus_value_2 == item.bonus_value_2 and
-                self.bonus_3 == item.bonus_3 and
-                self.bonus_value_3 == item.bonus_value_3 and
-                self.material == item.material and
-                self.spell == item.spell and
-                self.spell_power == item.spell_power and
-                self.is_projectile == item.is_projectile)
-
     def hasborder(self):
         """ Decide whether or not a blue border would be drawn for this
             item, in the game. """
@@ -611,4 +466,6 @@ class B3Item(B2Item):
     Item structure for Book 3
     """
 
+    __slots__ = ()
+
     book = 3
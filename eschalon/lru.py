@@ -0,0 +1,140 @@
+#!/usr/bin/python
+# vim: set expandtab tabstop=4 shiftwidth=4:
+#
+# Eschalon Savefile Editor
+# Copyright (C) 2008-2017 CJ Kucera, Elliot Kendall, Eitan Adler
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+"""
+A byte-budgeted least-recently-used cache, and the shared instance of
+it which holds the decrypted and inflated members we read out of game
+data archives (the Book 2/3 datapak, the Book 1 gfx.pak, and loose data
+files).  Keeping these around means that reopening maps, rebuilding
+graphics caches or switching books within a session doesn't have to do
+all that work again.  The same class also holds the scaled sprites
+built by each Gfx object.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+# Default size of the shared member cache, in megabytes
+DEFAULT_BUDGET_MB = 64
+
+# Default size of each Gfx object's cache of scaled sprites, in megabytes
+DEFAULT_SPRITE_BUDGET_MB = 48
+
+
+class LRUCache(object):
+    """
+    An LRU cache of immutable values (typically bytes), which evicts the
+    least-recently-used entries once the total length of the values it
+    holds goes over "budget" bytes.  A value which is larger than the
+    whole budget is simply not stored.  Keeps hit, miss and eviction
+    counters, for the curious.  Values which don't support len() can
+    be stored if a "sizeof" function returning their size is passed in.
+    """
+
+    def __init__(self, budget: int, sizeof: Optional[Callable] = None) -> None:
+        self.budget = budget
+        self.sizeof = len if sizeof is None else sizeof
+        self.entries = OrderedDict()  # type: OrderedDict
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def get(self, key: Hashable, default=None):
+        """
+        Returns the value stored for "key", marking it as most recently
+        used, or "default" if we don't have it.
+        """
+        with self.lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value) -> None:
+        """ Stores "value" for "key", evicting older entries as needed """
+        size = self.sizeof(value)
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.sizeof(self.entries.pop(key))
+            if size > self.budget:
+                return
+            self.entries[key] = value
+            self.size += size
+            self._evict()
+
+    def _evict(self) -> None:
+        """ Drops least-recently-used entries until we're within budget """
+        while self.size > self.budget:
+            (key, value) = self.entries.popitem(last=False)
+            self.size -= self.sizeof(value)
+            self.evictions += 1
+
+    def set_budget(self, budget: int) -> None:
+        """ Changes our budget, evicting entries if it's shrunk """
+        with self.lock:
+            self.budget = budget
+            self._evict()
+
+    def clear(self) -> None:
+        """ Empties the cache (our counters are left alone) """
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """ Returns a dict of our counters and current usage """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'budget': self.budget,
+            }
+
+
+# The cache shared by everything which reads out of game data archives.
+# Keys should start with something identifying the exact archive file
+# (see file_key()), so that a changed or different archive never serves
+# stale data.
+member_cache = LRUCache(DEFAULT_BUDGET_MB * 1048576)
+
+
+def file_key(path: str, stat) -> tuple:
+    """
+    Returns a cache key prefix for the given file, based on its path,
+    modification time and size as reported by os.stat().
+    """
+    return (path, stat.st_mtime_ns, stat.st_size)
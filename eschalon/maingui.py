@@ -62,7 +62,8 @@ class CharLoaderDialog(Gtk.Dialog):
     SOURCE_SAVES = 0
     SOURCE_OTHER = 1
 
-    def __init__(self, starting_path, savegame_dir, transient=None, last_source=None):
+    def __init__(self, starting_path, savegame_dir, transient=None, last_source=None,
+                 mapindex=None):
         """
         Constructor to set up everything
 
@@ -72,6 +73,8 @@ class CharLoaderDialog(Gtk.Dialog):
         last_source is the last source we loaded from - this should be None on the
            first run, but passed in on subsequent calls (though of course it's not
            actually necessary)
+        mapindex is a MapIndex used to avoid re-reading maps we've already seen,
+           while detecting which book a slot belongs to
         """
 
         # Call back to the stock gtk Dialog stuff
@@ -117,12 +120,14 @@ class CharLoaderDialog(Gtk.Dialog):
         self.slots = []
         for slotdir in slotdirs:
             try:
-                slot = Saveslot(slotdir, c.book)
+                slot = Saveslot(slotdir, c.book, mapindex=mapindex)
                 slot.load_charname()
                 self.slots.append(slot)
             except:
                 # If there's an error, just don't show the slot
                 pass
+        if mapindex is not None:
+            mapindex.save()
         self.slots.sort()
         if self.slots:
 
@@ -377,7 +382,8 @@ class MainGUI(BaseGUI):
         if self.gamedir_set():
             try:
                 self.eschalondata = EschalonData.new(
-                    c.book, self.get_current_gamedir())
+                    c.book, self.get_current_gamedir(),
+                    cachedir=self.get_datapak_cachedir())
                 c.set_eschalondata(self.eschalondata)
             except Exception as e:
                 LOG.error("Failed to load echalondata object", exc_info=True)
@@ -387,7 +393,8 @@ class MainGUI(BaseGUI):
         self.optional_gfx()
         if self.eschalondata:
             try:
-                self.gfx = Gfx.new(c.book, self.datadir, self.eschalondata)
+                self.gfx = Gfx.new(c.book, self.datadir, self.eschalondata,
+                                   sprite_budget=self.get_sprite_budget())
             except Exception as e:
                 print('Exception instantiating Gfx: %s' % e)
         self.assert_gfx_buttons()
@@ -484,7 +491,8 @@ class MainGUI(BaseGUI):
         dialog = CharLoaderDialog(starting_path=path,
                                   savegame_dir=self.get_current_savegame_dir(),
                                   transient=self.window,
-                                  last_source=self.last_char_source)
+                                  last_source=self.last_char_source,
+                                  mapindex=self.mapindex)
         rundialog = True
         while rundialog:
             rundialog = False
@@ -715,9 +723,9 @@ class MainGUI(BaseGUI):
         wname = widget.get_name()
         (labelwidget, label) = self.get_label_cache(wname)
         (obj, origobj) = self.get_comp_objects()
-        obj.__dict__[wname] = widget.get_active() + 1
-        self.set_changed_widget((origobj.__dict__[wname] == obj.__dict__[
-                                wname]), wname, labelwidget, label)
+        setattr(obj, wname, widget.get_active() + 1)
+        self.set_changed_widget((getattr(origobj, wname) == getattr(
+                                obj, wname)), wname, labelwidget, label)
 
     def on_dropdownplusone_changed_b2(self, widget):
         """
@@ -728,9 +736,9 @@ class MainGUI(BaseGUI):
         objwname = wname[2:]
         (labelwidget, label) = self.get_label_cache(wname)
         (obj, origobj) = self.get_comp_objects()
-        obj.__dict__[objwname] = widget.get_active() + 1
-        self.set_changed_widget((origobj.__dict__[objwname] == obj.__dict__[
-                                objwname]), wname, labelwidget, label)
+        setattr(obj, objwname, widget.get_active() + 1)
+        self.set_changed_widget((getattr(origobj, objwname) == getattr(
+                                obj, objwname)), wname, labelwidget, label)
 
     def on_b2picid_changed(self, widget):
         """
@@ -744,9 +752,9 @@ class MainGUI(BaseGUI):
             val = 0xFFFFFFFF
         else:
             val = widget.get_active() + 1
-        obj.__dict__[objwname] = val
-        self.set_changed_widget((origobj.__dict__[objwname] == obj.__dict__[
-                                objwname]), wname, labelwidget, label)
+        setattr(obj, objwname, val)
+        self.set_changed_widget((getattr(origobj, objwname) == getattr(
+                                obj, objwname)), wname, labelwidget, label)
         if self.gfx is None:
             self.get_widget('b2_picid_image').set_from_stock(Gtk.STOCK_EDIT, 4)
         else:
@@ -786,7 +794,7 @@ class MainGUI(BaseGUI):
         labelname = 'statuses_%d' % arrnum
         (labelwidget, label) = self.get_label_cache(labelname)
         (obj, origobj) = self.get_comp_objects()
-        obj.__dict__[shortname][arrnum] = int(widget.get_value())
+        getattr(obj, shortname)[arrnum] = int(widget.get_value())
         changed = (origobj.statuses[arrnum] != obj.statuses[arrnum])
         if c.book > 1 and (origobj.statuses_extra[arrnum] != obj.statuses_extra[arrnum]):
             changed = True
@@ -799,9 +807,9 @@ class MainGUI(BaseGUI):
         arrnum = int(arrnum)
         (labelwidget, label) = self.get_label_cache(wname)
         (obj, origobj) = self.get_comp_objects()
-        obj.__dict__[shortname][arrnum] = widget.get_text()
-        self.set_changed_widget((origobj.__dict__[shortname][arrnum] == obj.__dict__[
-                                shortname][arrnum]), wname, labelwidget, label)
+        getattr(obj, shortname)[arrnum] = widget.get_text()
+        self.set_changed_widget((getattr(origobj, shortname)[arrnum] == getattr(
+                                obj, shortname)[arrnum]), wname, labelwidget, label)
 
     def on_multarray_changed(self, widget):
         """ What to do when an int value changes in an array. """
@@ -810,9 +818,9 @@ class MainGUI(BaseGUI):
         arrnum = int(arrnum)
         (labelwidget, label) = self.get_label_cache(wname)
         (obj, origobj) = self.get_comp_objects()
-        obj.__dict__[shortname][arrnum] = int(widget.get_value())
-        self.set_changed_widget((origobj.__dict__[shortname][arrnum] == obj.__dict__[
-                                shortname][arrnum]), wname, labelwidget, label)
+        getattr(obj, shortname)[arrnum] = int(widget.get_value())
+        self.set_changed_widget((getattr(origobj, shortname)[arrnum] == getattr(
+                                obj, shortname)[arrnum]), wname, labelwidget, label)
 
     def on_checkbox_arr_changed(self, widget):
         """ What to do when a checkbox changes, and it's in an array. """
@@ -825,9 +833,9 @@ class MainGUI(BaseGUI):
         arrnum = int(arrnum)
         (labelwidget, label) = self.get_label_cache(wname)
         (obj, origobj) = self.get_comp_objects()
-        obj.__dict__[shortname][arrnum] = val
-        self.set_changed_widget((origobj.__dict__[shortname][arrnum] == obj.__dict__[
-                                shortname][arrnum]), wname, labelwidget, label)
+        getattr(obj, shortname)[arrnum] = val
+        self.set_changed_widget((getattr(origobj, shortname)[arrnum] == getattr(
+                                obj, shortname)[arrnum]), wname, labelwidget, label)
 
     def on_cur_ready_changed(self, widget):
         """ What to do when our currently-readied spell changes (only on Book 2). """
@@ -876,7 +884,7 @@ class MainGUI(BaseGUI):
         (equipname, foo) = wname.rsplit('_', 1)
         self.curitemcategory = self.ITEM_EQUIP
         self.curitem = equipname
-        self.populate_itemform_from_item(self.char.__dict__[equipname])
+        self.populate_itemform_from_item(getattr(self.char, equipname))
         self.get_widget('item_notebook').set_current_page(0)
         if doshow:
             self.itemwindow.show()
@@ -929,14 +937,14 @@ class MainGUI(BaseGUI):
             self.on_equip_action_clicked(
                 self.get_widget('%s_delete' % equipname))
         elif action == 'copy':
-            self.itemclipboard = self.char.__dict__[equipname]
+            self.itemclipboard = getattr(self.char, equipname)
         elif action == 'paste':
             if self.itemclipboard is not None:
-                self.char.__dict__[equipname] = self.itemclipboard.replicate()
+                setattr(self.char, equipname, self.itemclipboard.replicate())
                 self.register_equip_change(equipname)
             pass
         elif action == 'delete':
-            self.char.__dict__[equipname] = Item.new(c.book, True)
+            setattr(self.char, equipname, Item.new(c.book, True))
             self.register_equip_change(equipname)
         else:
             raise Exception('invalid action')
@@ -1083,9 +1091,9 @@ class MainGUI(BaseGUI):
         widget = self.get_widget('%s_text' % name)
         imgwidget = self.get_widget('%s_image' % name)
         if orig:
-            item = self.origchar.__dict__[name]
+            item = getattr(self.origchar, name)
         else:
-            item = self.char.__dict__[name]
+            item = getattr(self.char, name)
         self.populate_item_button(
             item, widget, imgwidget, self.get_widget('equiptable'))
 
@@ -20,10 +20,12 @@
 import logging
 import os
 import struct
+from array import array
 
 from eschalon.constants import constants as c
 from eschalon.entity import Entity
 from eschalon.savefile import FirstItemLoadException, LoadException, Savefile
+from eschalon.schema import STR, Field, Schema
 from eschalon.tile import Tile
 from eschalon.tilecontent import Tilecontent
 
@@ -159,9 +161,138 @@ class BigGraphicMappings(object):
         return self.mappings_gfx
 
 
+class TileRow(object):
+    """
+    A single row of a TileGrid, which acts like a list of Tile objects.
+    """
+
+    def __init__(self, grid, y):
+        self.grid = grid
+        self.y = y
+
+    def __len__(self):
+        return self.grid.width
+
+    def __getitem__(self, x):
+        if x < 0:
+            x += self.grid.width
+        if not 0 <= x < self.grid.width:
+            raise IndexError('Tile index out of range')
+        return self.grid.tileclass.view(self.grid, x, self.y)
+
+    def __setitem__(self, x, tile):
+        if x < 0:
+            x += self.grid.width
+        if not 0 <= x < self.grid.width:
+            raise IndexError('Tile index out of range')
+        self.grid.set_tile(x, self.y, tile)
+
+    def __iter__(self):
+        view = self.grid.tileclass.view
+        for x in range(self.grid.width):
+            yield view(self.grid, x, self.y)
+
+
+class TileGrid(object):
+    """
+    Storage for all the tiles on a map.  Rather than keeping a Tile object
+    around for every square, each tile attribute is stored as a column in
+    an array, and tilecontents and entities are kept in sparse tables keyed
+    by tile index.  Indexing a TileGrid gives TileRow objects, so the usual
+    map.tiles[y][x] construct hands out Tile views onto this storage.
+    """
+
+    width = 100
+    height = 200
+
+    def __init__(self, book):
+        """
+        A fresh grid, with every tile zeroed out.
+        """
+        self.tileclass = Tile.get_class(book)
+        size = self.width * self.height
+        self.columns = dict((name, array(typecode, [0]) * size)
+                            for (name, typecode) in self.tileclass.column_types.items())
+        self.tilecontents = {}
+        self.entities = {}
+        self.rows = [TileRow(self, y) for y in range(self.height)]
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        return self.rows[y]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def index(self, x, y):
+        """ Returns the index into our columns of the given tile. """
+        return y * self.width + x
+
+    def set_tile(self, x, y, tile):
+        """
+        Copies the given tile's values into our storage at the given
+        coordinates.  Tilecontent and entity objects are shared, not
+        replicated.
+        """
+        idx = self.index(x, y)
+        for (name, column) in self.columns.items():
+            column[idx] = getattr(tile, name)
+        if len(tile.tilecontents) > 0:
+            self.tilecontents[idx] = list(tile.tilecontents)
+        else:
+            self.tilecontents.pop(idx, None)
+        if tile.entity is None:
+            self.entities.pop(idx, None)
+        else:
+            self.entities[idx] = tile.entity
+
+    def fill(self, name, value):
+        """ Sets the given attribute to the same value on every tile. """
+        column = self.columns[name]
+        self.columns[name] = array(column.typecode, [value]) * len(column)
+
+    def set_records(self, fields, records):
+        """
+        Loads a full grid's worth of records (as read from a map file,
+        in left-to-right, top-to-bottom order) into the given columns.
+        """
+        for (name, values) in zip(fields, zip(*records)):
+            self.columns[name] = array(self.columns[name].typecode, values)
+
+    def get_records(self, fields):
+        """
+        Returns an iterator of tuples of the given columns, one per tile,
+        in the order that they're stored in a map file.
+        """
+        return zip(*[self.columns[name] for name in fields])
+
+    def replicate(self):
+        """
+        Returns a copy of ourselves, with replicated tilecontents and
+        entities.
+        """
+        newgrid = TileGrid(self.tileclass.book)
+        for (name, column) in self.columns.items():
+            newgrid.columns[name] = array(column.typecode, column)
+        for (idx, tilecontents) in self.tilecontents.items():
+            newgrid.tilecontents[idx] = [tilecontent.replicate()
+                                         for tilecontent in tilecontents]
+        for (idx, entity) in self.entities.items():
+            newgrid.entities[idx] = entity.replicate()
+        return newgrid
+
+
 class Map(object):
     """ The base Map class.  """
 
+    header = None  # type: Schema
+
+    # How much of a map file get_mapinfo() reads in order to identify it.
+    # Map headers are a handful of short strings, so this is plenty.
+    PROBE_SIZE = 4096
+
     DIR_NO_CHANGE = 0x00
     DIR_N = 0x01
     DIR_NE = 0x02
@@ -226,14 +357,7 @@ class Map(object):
         # sake we're putting it in the base class
         self.tree_set = 0
 
-        self.cursqcol = 0
-        self.cursqrow = 0
-
-        self.tiles = []
-        for i in range(200):
-            self.tiles.append([])
-            for j in range(100):
-                self.tiles[i].append(Tile.new(c.book, j, i))
+        self.tiles = TileGrid(c.book)
 
         self.tilecontents = []
         self.entities = []
@@ -251,9 +375,7 @@ class Map(object):
         """
         Sets the savegame flags as-requested.
         """
-        for row in self.tiles:
-            for tile in row:
-                tile.savegame = savegame
+        self.tiles.fill('savegame', savegame)
         for entity in self.entities:
             entity.savegame = savegame
         for tilecontent in self.tilecontents:
@@ -267,6 +389,97 @@ class Map(object):
         if self.df.filename[-4:].lower() != '.map':
             self.df.filename = '%s.map' % self.df.filename
 
+    def write(self):
+        """
+        Writes out the map and its entities.  Both files are serialized in
+        memory first, and are only published once both are complete, so
+        an error partway through leaves the files on disk as they were.
+        """
+
+        # We require a '.map' extension
+        self.check_map_extension()
+
+        # Entities actually live in a different file.  We write that
+        # regardless of entities, because we'd have to zero out the file.
+        self.set_df_ent()
+
+        self.df.open_w()
+        self.df_ent.open_w()
+        try:
+            self._write_header()
+
+            # Tiles
+            self.write_tiles()
+
+            # Tilecontents
+            for tilecontent in self.tilecontents:
+                tilecontent.write(self.df)
+
+            # Any extra data we might have
+            if len(self.extradata) > 0:
+                self.df.writestr(self.extradata)
+
+            # Entities
+            for entity in self.entities:
+                entity.write(self.df_ent)
+
+        except Exception:
+            self.df.abort()
+            self.df_ent.abort()
+            raise
+
+        # Clean up
+        Savefile.commit_all([self.df, self.df_ent])
+
+    def read(self):
+        """ Read in the whole map from a file descriptor. """
+
+        try:
+
+            # Open the file
+            self.df.open_r()
+
+            # Start processing
+            self.header.read(self, self.df)
+
+            # Tiles
+            self.set_tile_savegame()
+            self.read_tiles()
+
+            # Tilecontents...  Just keep going until EOF
+            try:
+                while self.addtilecontent():
+                    pass
+            except FirstItemLoadException as e:
+                pass
+
+            # Entities...  Just keep going until EOF (note that this is in a separate file)
+            # Also note that we have to support situations where there is no entity file
+            if self.df_ent.exists():
+                self.df_ent.open_r()
+                try:
+                    while self.addentity():
+                        pass
+                except FirstItemLoadException as e:
+                    pass
+                self.df_ent.close()
+
+            # If there's extra data at the end, we likely don't have
+            # a valid char file
+            self.extradata = self.df.read()
+            if len(self.extradata) > 0:
+                raise LoadException('Extra data at end of file')
+
+            # Close the file
+            self.df.close()
+
+        except (IOError, struct.error) as e:
+            raise LoadException(str(e))
+
+    def _write_header(self):
+        """ Writes out the map header, which precedes the tiles. """
+        self.header.write(self, self.df)
+
     def set_df_ent(self):
         try:
             self.df_ent = Savefile(
@@ -310,24 +523,12 @@ class Map(object):
                                     self.df.stringdata), new_df_ent)
 
         # Single vals (no need to do actual replication)
-        newmap.mapname = self.mapname
-        newmap.music1 = self.music1
-        newmap.music2 = self.music2
-        newmap.skybox = self.skybox
-        newmap.atmos_sound_day = self.atmos_sound_day
-        newmap.color_r = self.color_r
-        newmap.color_g = self.color_g
-        newmap.color_b = self.color_b
-        newmap.color_a = self.color_a
+        self.header.copy(self, newmap)
         newmap.extradata = self.extradata
         newmap.tree_set = self.tree_set
-        newmap.parallax_x = self.parallax_x
-        newmap.parallax_y = self.parallax_y
 
         # Copy tiles
-        for i in range(200):
-            for j in range(100):
-                newmap.tiles[i][j] = self.tiles[i][j].replicate()
+        newmap.tiles = self.tiles.replicate()
 
         # At this point, tilecontents and entities have been replicated as well;
         # loop through our list to repopulate from the new objects, so that
@@ -357,36 +558,35 @@ class Map(object):
                 else:
                     newmap.tilecontents.append(tilecontent.replicate())
 
-        # Call out to superclass replication
-        self._sub_replicate(newmap)
-
         # Now return our duplicated object
         return newmap
 
-    def _sub_replicate(self, newmap):
+    def set_tile_savegame(self):
+        """ Sets the savegame flag appropriately for all tiles """
+        self.tiles.fill('savegame', self.is_savegame())
+
+    def read_tiles(self):
         """
-        Stub for superclasses to override, to replicate specific vars
+        Reads in the whole tile grid, which is stored in a left-to-right,
+        top-to-bottom format in the map.  Every tile is a fixed-width
+        record, so the whole block gets decoded in a single pass.  The
+        tiles' savegame flags must already be set.
         """
-        pass
+        first = self.tiles[0][0]
+        (codec, fields) = first.layout(first.savegame)
+        self.tiles.set_records(fields,
+                               self.df.read_records(codec, 200 * 100))
 
-    def set_tile_savegame(self):
-        """ Sets the savegame flag appropriately for all tiles """
-        savegame = self.is_savegame()
-        for row in self.tiles:
-            for tile in row:
-                tile.savegame = savegame
-
-    def addtile(self):
-        """ Add a new tile, assuming that the tiles are stored in a
-            left-to-right, top-to-bottom format in the map. """
-        self.tiles[self.cursqrow][self.cursqcol].read(self.df)
-        self.cursqcol += 1
-        if self.cursqcol == 100:
-            self.cursqcol = 0
-            self.cursqrow += 1
+    def write_tiles(self):
+        """
+        Writes out the whole tile grid in one go; see read_tiles().
+        """
+        first = self.tiles[0][0]
+        (codec, fields) = first.layout(first.savegame)
+        self.df.write_records(codec, self.tiles.get_records(fields))
 
     def addtilecontent(self):
-        """ Add a tilecontent. """
+        """ Add a tilecontent.  Returns False once we've reached EOF. """
         try:
             tilecontent = Tilecontent.new(c.book, self.is_savegame())
             tilecontent.read(self.df)
@@ -413,7 +613,7 @@ class Map(object):
             self.tiles[y][x].deltilecontent(tilecontent)
 
     def addentity(self):
-        """ Add an entity. """
+        """ Add an entity.  Returns False once we've reached EOF. """
         try:
             entity = Entity.new(c.book, self.is_savegame())
             entity.read(self.df_ent)
@@ -607,6 +807,49 @@ class Map(object):
         and a Savefile object pointing to the map.  Will raise a LoadException
         if it encounters errors.
 
+        Only the first PROBE_SIZE bytes of the file are read, in one go (see
+        probe_handle()); we only fall back to reading the whole file if the
+        header turns out to be larger than that.
+        """
+        if filename is not None:
+            df = Savefile(filename)
+        elif map_df is not None:
+            df = map_df
+        else:
+            raise LoadException('One of filename or map_df must be passed in')
+
+        if df.is_stringdata():
+            return Map.probe_header(df.stringdata) + (df,)
+
+        try:
+            with open(df.filename, 'rb') as handle:
+                return Map.probe_handle(handle) + (df,)
+        except IOError as e:
+            raise LoadException(str(e))
+
+    @staticmethod
+    def probe_handle(handle):
+        """
+        Given a binary file-like object positioned at the start of a map,
+        returns the same tuple as probe_header().  Only PROBE_SIZE bytes
+        are read, unless the header turns out to be larger than that.
+        """
+        data = handle.read(Map.PROBE_SIZE)
+        try:
+            return Map.probe_header(data)
+        except LoadException:
+            if len(data) < Map.PROBE_SIZE:
+                raise
+        return Map.probe_header(data + handle.read())
+
+    @staticmethod
+    def probe_header(data):
+        """
+        Given the start of a map file, returns a tuple containing the
+        Eschalon Book the map belongs to, and the internal "map name" of
+        the map.  Will raise a LoadException if the data doesn't contain
+        enough of a map header.
+
         Book 1 files start with 10 strings
         Book 2 files start with 9 strings, followed by a uchar whose value
           will always be 1 (the "loadhook" var, presumably)
@@ -622,37 +865,25 @@ class Map(object):
         Theoretically, that way this works even if a Book 2 map happens
         to use a mapname of 0.992, in an effort to be cheeky.
         """
-        if filename is not None:
-            df = Savefile(filename)
-        elif map_df is not None:
-            df = map_df
-        else:
-            raise LoadException('One of filename or map_df must be passed in')
-        stringlist = []
+        df = Savefile(stringdata=data)
         try:
             df.open_r()
-            for i in range(9):
-                stringlist.append(df.readstr())
+            stringlist = [df.readstr().decode('UTF-8') for i in range(9)]
             nextbyte = df.readuchar()
             df.close()
-        except (IOError, struct.error) as e:
+        except (struct.error, UnicodeDecodeError) as e:
             raise LoadException(str(e))
 
         if nextbyte == 1:
-            detected_book = 2
-            detected_mapname = stringlist[0]
+            return (2, stringlist[0])
         # TODO: We're checking for a blank string here to cover up
         # for some invalid data that older versions of the unofficial
         # pre-1.0.0 builds.  By the time 1.1.0 rolls around, or so,
         # we should get rid of that.
         elif stringlist[0] == '0.992' or stringlist[0] == '':
-            detected_book = 3
-            detected_mapname = stringlist[1]
+            return (3, stringlist[1])
         else:
-            detected_book = 1
-            detected_mapname = stringlist[1]
-
-        return detected_book, detected_mapname, df
+            return (1, stringlist[1])
 
     @staticmethod
     def load(filename, req_book=None):
@@ -756,6 +987,34 @@ class B1Map(Map):
 
     book = 1
 
+    # Our map header (see eschalon.schema), which precedes the tiles
+    header = Schema(
+        Field('mapid', STR),
+        Field('mapname', STR),
+        Field('music1', STR),
+        Field('music2', STR),
+        Field('exit_north', STR),
+        Field('exit_east', STR),
+        Field('exit_south', STR),
+        Field('exit_west', STR),
+        Field('skybox', STR),
+        Field('atmos_sound_day', STR),
+        Field('map_b1_last_xpos', 'B'),
+        Field('map_b1_last_ypos', 'B'),
+        Field('map_b1_outsideflag', 'H'),
+        Field('map_unknownh1', 'H'),
+        Field('color_r', 'B'),
+        Field('color_g', 'B'),
+        Field('color_b', 'B'),
+        Field('color_a', 'B'),
+        Field('parallax_x', 'I'),
+        Field('parallax_y', 'I'),
+        Field('clouds', 'I'),
+        Field('savegame_1', 'I'),
+        Field('savegame_2', 'I'),
+        Field('savegame_3', 'I'),
+    )
+
     def __init__(self, df, ent_df=None):
 
         # Book 1-specific vars
@@ -776,137 +1035,6 @@ class B1Map(Map):
         # Base class attributes
         super(B1Map, self).__init__(df, ent_df)
 
-    def read(self):
-        """ Read in the whole map from a file descriptor. """
-
-        try:
-
-            # Open the file
-            self.df.open_r()
-
-            # Start processing
-            self.mapid = self.df.readstr().decode('UTF-8')
-            self.mapname = self.df.readstr().decode('UTF-8')
-            self.music1 = self.df.readstr().decode('UTF-8')
-            self.music2 = self.df.readstr().decode('UTF-8')
-            self.exit_north = self.df.readstr().decode('UTF-8')
-            self.exit_east = self.df.readstr().decode('UTF-8')
-            self.exit_south = self.df.readstr().decode('UTF-8')
-            self.exit_west = self.df.readstr().decode('UTF-8')
-            self.skybox = self.df.readstr().decode('UTF-8')
-            self.atmos_sound_day = self.df.readstr().decode('UTF-8')
-            self.map_b1_last_xpos = self.df.readuchar()
-            self.map_b1_last_ypos = self.df.readuchar()
-            self.map_b1_outsideflag = self.df.readshort()
-            self.map_unknownh1 = self.df.readshort()
-
-            self.color_r = self.df.readuchar()
-            self.color_g = self.df.readuchar()
-            self.color_b = self.df.readuchar()
-            self.color_a = self.df.readuchar()
-
-            self.parallax_x = self.df.readint()
-            self.parallax_y = self.df.readint()
-            self.clouds = self.df.readint()
-            self.savegame_1 = self.df.readint()
-            self.savegame_2 = self.df.readint()
-            self.savegame_3 = self.df.readint()
-
-            # Tiles
-            self.set_tile_savegame()
-            for i in range(200 * 100):
-                self.addtile()
-
-            # Tilecontents...  Just keep going until EOF
-            try:
-                while self.addtilecontent():
-                    pass
-            except FirstItemLoadException as e:
-                pass
-
-            # Entities...  Just keep going until EOF (note that this is in a separate file)
-            # Also note that we have to support situations where there is no entity file
-            if self.df_ent.exists():
-                self.df_ent.open_r()
-                try:
-                    while self.addentity():
-                        pass
-                except FirstItemLoadException as e:
-                    pass
-                self.df_ent.close()
-
-            # If there's extra data at the end, we likely don't have
-            # a valid char file
-            self.extradata = self.df.read()
-            if len(self.extradata) > 0:
-                raise LoadException('Extra data at end of file')
-
-            # Close the file
-            self.df.close()
-
-        except (IOError, struct.error) as e:
-            raise LoadException(str(e))
-
-    def write(self):
-        """ Writes out the map to the file descriptor. """
-
-        # We require a '.map' extension
-        self.check_map_extension()
-
-        # Open the file
-        self.df.open_w()
-
-        # Start
-        self.df.writestr(self.mapid)
-        self.df.writestr(self.mapname)
-        self.df.writestr(self.music1)
-        self.df.writestr(self.music2)
-        self.df.writestr(self.exit_north)
-        self.df.writestr(self.exit_east)
-        self.df.writestr(self.exit_south)
-        self.df.writestr(self.exit_west)
-        self.df.writestr(self.skybox)
-        self.df.writestr(self.atmos_sound_day)
-        self.df.writeuchar(self.map_b1_last_xpos)
-        self.df.writeuchar(self.map_b1_last_ypos)
-        self.df.writeshort(self.map_b1_outsideflag)
-        self.df.writeshort(self.map_unknownh1)
-        self.df.writeuchar(self.color_r)
-        self.df.writeuchar(self.color_g)
-        self.df.writeuchar(self.color_b)
-        self.df.writeuchar(self.color_a)
-        self.df.writeint(self.parallax_x)
-        self.df.writeint(self.parallax_y)
-        self.df.writeint(self.clouds)
-        self.df.writeint(self.savegame_1)
-        self.df.writeint(self.savegame_2)
-        self.df.writeint(self.savegame_3)
-
-        # Tiles
-        for row in self.tiles:
-            for tile in row:
-                tile.write(self.df)
-
-        # Tilecontents
-        for tilecontent in self.tilecontents:
-            tilecontent.write(self.df)
-
-        # Any extra data we might have
-        if len(self.extradata) > 0:
-            self.df.writestr(self.extradata)
-
-        # Clean up
-        self.df.close()
-
-        # Now write out entities, which actually happens in a different file
-        # We open regardless of entities, because we'd have to zero out the
-        # file.
-        self.set_df_ent()
-        self.df_ent.open_w()
-        for entity in self.entities:
-            entity.write(self.df_ent)
-        self.df_ent.close()
-
     def is_global(self):
         return self.savegame_1 == 0 and self.savegame_2 == 0 and self.savegame_3 == 0
 
@@ -937,24 +1065,6 @@ class B1Map(Map):
             self.savegame_2 = 0
             self.savegame_3 = 0
 
-    def _sub_replicate(self, newmap):
-        """
-        Replicate b1-specific vars
-        """
-        newmap.mapid = self.mapid
-        newmap.exit_north = self.exit_north
-        newmap.exit_east = self.exit_east
-        newmap.exit_south = self.exit_south
-        newmap.exit_west = self.exit_west
-        newmap.clouds = self.clouds
-        newmap.savegame_1 = self.savegame_1
-        newmap.savegame_2 = self.savegame_2
-        newmap.savegame_3 = self.savegame_3
-        newmap.map_unknownh1 = self.map_unknownh1
-        newmap.map_b1_last_xpos = self.map_b1_last_xpos
-        newmap.map_b1_last_ypos = self.map_b1_last_ypos
-        newmap.map_b1_outsideflag = self.map_b1_outsideflag
-
 
 class B2Map(Map):
     """
@@ -963,6 +1073,36 @@ class B2Map(Map):
 
     book = 2
 
+    # Our map header (see eschalon.schema), which precedes the tiles
+    header = Schema(
+        Field('mapname', STR),
+        Field('entrancescript', STR),
+        Field('returnscript', STR),
+        Field('exitscript', STR),
+        Field('skybox', STR),
+        Field('music1', STR),
+        Field('music2', STR),
+        Field('atmos_sound_day', STR),
+        Field('random_sound1', STR),
+        Field('loadhook', 'B'),
+        Field('unusedc1', 'B'),
+        Field('random_entity_1', 'B'),
+        Field('random_entity_2', 'B'),
+        Field('color_r', 'B'),
+        Field('color_g', 'B'),
+        Field('color_b', 'B'),
+        Field('color_a', 'B'),
+        Field('parallax_x', 'I'),
+        Field('parallax_y', 'I'),
+        Field('map_flags', 'I'),
+        Field('start_tile', 'I'),
+        Field('tree_set', 'I'),
+        Field('last_turn', 'I'),
+        Field('unusedstr1', STR),
+        Field('unusedstr2', STR),
+        Field('unusedstr3', STR),
+    )
+
     def __init__(self, df, ent_df=None):
 
         # Book 2 specific vars
@@ -985,141 +1125,6 @@ class B2Map(Map):
         # Now the base attributes
         super(B2Map, self).__init__(df, ent_df)
 
-    def read(self):
-        """ Read in the whole map from a file descriptor. """
-
-        try:
-
-            # Open the file
-            self.df.open_r()
-
-            # Start processing
-            self.mapname = self.df.readstr().decode('UTF-8')
-            self.entrancescript = self.df.readstr().decode('UTF-8')
-            self.returnscript = self.df.readstr().decode('UTF-8')
-            self.exitscript = self.df.readstr().decode('UTF-8')
-            self.skybox = self.df.readstr().decode('UTF-8')
-            self.music1 = self.df.readstr().decode('UTF-8')
-            self.music2 = self.df.readstr().decode('UTF-8')
-            self.atmos_sound_day = self.df.readstr().decode('UTF-8')
-            self.random_sound1 = self.df.readstr().decode('UTF-8')
-            self.loadhook = self.df.readuchar()
-            self.unusedc1 = self.df.readuchar()
-            self.random_entity_1 = self.df.readuchar()
-            self.random_entity_2 = self.df.readuchar()
-            self.color_r = self.df.readuchar()
-            self.color_g = self.df.readuchar()
-            self.color_b = self.df.readuchar()
-            self.color_a = self.df.readuchar()
-            self.parallax_x = self.df.readint()
-            self.parallax_y = self.df.readint()
-            self.map_flags = self.df.readint()
-            self.start_tile = self.df.readint()
-            self.tree_set = self.df.readint()
-
-            self.last_turn = self.df.readint()
-
-            self.unusedstr1 = self.df.readstr().decode('UTF-8')
-            self.unusedstr2 = self.df.readstr().decode('UTF-8')
-            self.unusedstr3 = self.df.readstr().decode('UTF-8')
-
-            # Tiles
-            self.set_tile_savegame()
-            for i in range(200 * 100):
-                self.addtile()
-
-            # Tilecontents...  Just keep going until EOF
-            try:
-                while self.addtilecontent():
-                    pass
-            except FirstItemLoadException as e:
-                pass
-
-            # Entities...  Just keep going until EOF (note that this is in a separate file)
-            # Also note that we have to support situations where there is no entity file
-            if self.df_ent.exists():
-                self.df_ent.open_r()
-                try:
-                    while self.addentity():
-                        pass
-                except FirstItemLoadException as e:
-                    pass
-                self.df_ent.close()
-
-            # If there's extra data at the end, we likely don't have
-            # a valid char file
-            self.extradata = self.df.read()
-            if len(self.extradata) > 0:
-                raise LoadException('Extra data at end of file')
-
-            # Close the file
-            self.df.close()
-
-        except (IOError, struct.error) as e:
-            raise LoadException(str(e))
-
-    def write(self):
-        """ Writes out the map to the file descriptor. """
-
-        # We require a '.map' extension
-        self.check_map_extension()
-
-        # Open the file
-        self.df.open_w()
-
-        # Start
-        self.df.writestr(self.mapname)
-        self.df.writestr(self.entrancescript)
-        self.df.writestr(self.returnscript)
-        self.df.writestr(self.exitscript)
-        self.df.writestr(self.skybox)
-        self.df.writestr(self.music1)
-        self.df.writestr(self.music2)
-        self.df.writestr(self.atmos_sound_day)
-        self.df.writestr(self.random_sound1)
-        self.df.writeuchar(self.loadhook)
-        self.df.writeuchar(self.unusedc1)
-        self.df.writeuchar(self.random_entity_1)
-        self.df.writeuchar(self.random_entity_2)
-        self.df.writeuchar(self.color_r)
-        self.df.writeuchar(self.color_g)
-        self.df.writeuchar(self.color_b)
-        self.df.writeuchar(self.color_a)
-        self.df.writeint(self.parallax_x)
-        self.df.writeint(self.parallax_y)
-        self.df.writeint(self.map_flags)
-        self.df.writeint(self.start_tile)
-        self.df.writeint(self.tree_set)
-        self.df.writeint(self.last_turn)
-        self.df.writestr(self.unusedstr1)
-        self.df.writestr(self.unusedstr2)
-        self.df.writestr(self.unusedstr3)
-
-        # Tiles
-        for row in self.tiles:
-            for tile in row:
-                tile.write(self.df)
-
-        # Tilecontents
-        for tilecontent in self.tilecontents:
-            tilecontent.write(self.df)
-
-        # Any extra data we might have
-        if len(self.extradata) > 0:
-            self.df.writestr(self.extradata)
-
-        # Clean up
-        self.df.close()
-
-        # Now write out entities, which actually happens in a different file
-        # We open regardless of entities, because we'd have to zero out the
-        # file.
-        self.set_df_ent()
-        self.df_ent.open_w()
-        for entity in self.entities:
-            entity.write(self.df_ent)
-        self.df_ent.close()
-
     def is_global(self):
         return self.last_turn == 0
 
@@ -1136,26 +1141,6 @@ class B2Map(Map):
         else:
             self.last_turn = 0
 
-    def _sub_replicate(self, newmap):
-        """
-        Replicate b2-specific vars
-        """
-        newmap.entrancescript = self.entrancescript
-        newmap.returnscript = self.returnscript
-        newmap.exitscript = self.exitscript
-        newmap.random_sound1 = self.random_sound1
-        newmap.loadhook = self.loadhook
-        newmap.unusedc1 = self.unusedc1
-        newmap.random_entity_1 = self.random_entity_1
-        newmap.random_entity_2 = self.random_entity_2
-        newmap.map_flags = self.map_flags
-        newmap.start_tile = self.start_tile
-        newmap.tree_set = self.tree_set
-        newmap.last_turn = self.last_turn
-        newmap.unusedstr1 = self.unusedstr1
-        newmap.unusedstr2 = self.unusedstr2
-        newmap.unusedstr3 = self.unusedstr3
-
 
 class B3Map(B2Map):
     """
@@ -1164,6 +1149,41 @@ class B3Map(B2Map):
 
     book = 3
 
+    # Our map header (see eschalon.schema), which precedes the tiles
+    header = Schema(
+        Field('version', STR),
+        Field('mapname', STR),
+        Field('entrancescript', STR),
+        Field('returnscript', STR),
+        Field('exitscript', STR),
+        Field('skybox', STR),
+        Field('music1', STR),
+        Field('music2', STR),
+        Field('atmos_sound_day', STR),
+        Field('atmos_sound_night', STR),
+        Field('random_sound1', STR),
+        Field('random_sound2', STR),
+        Field('loadhook', 'B'),
+        Field('unusedc1', 'B'),
+        Field('random_entity_1', 'B'),
+        Field('random_entity_2', 'B'),
+        Field('color_r', 'B'),
+        Field('color_g', 'B'),
+        Field('color_b', 'B'),
+        Field('color_a', 'B'),
+        Field('parallax_x', 'I'),
+        Field('parallax_y', 'I'),
+        Field('cloud_offset_x', 'I'),
+        Field('cloud_offset_y', 'I'),
+        Field('map_flags', 'I'),
+        Field('start_tile', 'I'),
+        Field('tree_set', 'I'),
+        Field('last_turn', 'I'),
+        Field('unusedstr1', STR),
+        Field('unusedstr2', STR),
+        Field('unusedstr3', STR),
+    )
+
     def __init__(self, df, ent_df=None):
 
         # Book 3 specific vars
@@ -1182,163 +1202,11 @@ class B3Map(B2Map):
     def read(self):
         """ Read in the whole map from a file descriptor. """
 
-        try:
-
-            # Open the file
-            self.df.open_r()
-
-            # Start processing
-            self.version = self.df.readstr().decode('UTF-8')
-            self.mapname = self.df.readstr().decode('UTF-8')
-            self.entrancescript = self.df.readstr().decode('UTF-8')
-            self.returnscript = self.df.readstr().decode('UTF-8')
-            self.exitscript = self.df.readstr().decode('UTF-8')
-            self.skybox = self.df.readstr().decode('UTF-8')
-            self.music1 = self.df.readstr().decode('UTF-8')
-            self.music2 = self.df.readstr().decode('UTF-8')
-            self.atmos_sound_day = self.df.readstr().decode('UTF-8')
-            self.atmos_sound_night = self.df.readstr().decode('UTF-8')
-            self.random_sound1 = self.df.readstr().decode('UTF-8')
-            self.random_sound2 = self.df.readstr().decode('UTF-8')
-            self.loadhook = self.df.readuchar()
-            self.unusedc1 = self.df.readuchar()
-            self.random_entity_1 = self.df.readuchar()
-            self.random_entity_2 = self.df.readuchar()
-            self.color_r = self.df.readuchar()
-            self.color_g = self.df.readuchar()
-            self.color_b = self.df.readuchar()
-            self.color_a = self.df.readuchar()
-            self.parallax_x = self.df.readint()
-            self.parallax_y = self.df.readint()
-            self.cloud_offset_x = self.df.readint()
-            self.cloud_offset_y = self.df.readint()
-            self.map_flags = self.df.readint()
-            self.start_tile = self.df.readint()
-            self.tree_set = self.df.readint()
-
-            self.last_turn = self.df.readint()
-
-            self.unusedstr1 = self.df.readstr().decode('UTF-8')
-            self.unusedstr2 = self.df.readstr().decode('UTF-8')
-            self.unusedstr3 = self.df.readstr().decode('UTF-8')
-
-            # Tiles
-            self.set_tile_savegame()
-            for i in range(200 * 100):
-                self.addtile()
-
-            # Tilecontents...  Just keep going until EOF
-            try:
-                while self.addtilecontent():
-                    pass
-            except FirstItemLoadException as e:
-                pass
-
-            # Entities...  Just keep going until EOF (note that this is in a separate file)
-            # Also note that we have to support situations where there is no entity file
-            if self.df_ent.exists():
-                self.df_ent.open_r()
-                try:
-                    while self.addentity():
-                        pass
-                except FirstItemLoadException as e:
-                    pass
-                self.df_ent.close()
-
-            # If there's extra data at the end, we likely don't have
-            # a valid char file
-            self.extradata = self.df.read()
-            if len(self.extradata) > 0:
-                raise LoadException('Extra data at end of file')
-
-            # Close the file
-            self.df.close()
+        super(B3Map, self).read()
 
-            # This isn't really *proper* but any Book 3 map we load really does need
-            # a version of 0.992 and a loadhook of 2.  Override them here, in case we
-            # loaded a map which was written by a buggier older version of this
-            # utility which might not have set these correctly.
-            self.version = '0.992'
-            self.loadhook = 2
-
-        except (IOError, struct.error) as e:
-            raise LoadException(str(e))
-
-    def write(self):
-        """ Writes out the map to the file descriptor. """
-
-        # We require a '.map' extension
-        self.check_map_extension()
-
-        # Open the file
-        self.df.open_w()
-
-        # Start
-        self.df.writestr(self.version)
-        self.df.writestr(self.mapname)
-        self.df.writestr(self.entrancescript)
-        self.df.writestr(self.returnscript)
-        self.df.writestr(self.exitscript)
-        self.df.writestr(self.skybox)
-        self.df.writestr(self.music1)
-        self.df.writestr(self.music2)
-        self.df.writestr(self.atmos_sound_day)
-        self.df.writestr(self.atmos_sound_night)
-        self.df.writestr(self.random_sound1)
-        self.df.writestr(self.random_sound2)
-        self.df.writeuchar(self.loadhook)
-        self.df.writeuchar(self.unusedc1)
-        self.df.writeuchar(self.random_entity_1)
-        self.df.writeuchar(self.random_entity_2)
-        self.df.writeuchar(self.color_r)
-        self.df.writeuchar(self.color_g)
-        self.df.writeuchar(self.color_b)
-        self.df.writeuchar(self.color_a)
-        self.df.writeint(self.parallax_x)
-        self.df.writeint(self.parallax_y)
-        self.df.writeint(self.cloud_offset_x)
-        self.df.writeint(self.cloud_offset_y)
-        self.df.writeint(self.map_flags)
-        self.df.writeint(self.start_tile)
-        self.df.writeint(self.tree_set)
-        self.df.writeint(self.last_turn)
-        self.df.writestr(self.unusedstr1)
-        self.df.writestr(self.unusedstr2)
-        self.df.writestr(self.unusedstr3)
-
-        # Tiles
-        for row in self.tiles:
-            for tile in row:
-                tile.write(self.df)
-
-        # Tilecontents
-        for tilecontent in self.tilecontents:
-            tilecontent.write(self.df)
-
-        # Any extra data we might have
-        if len(self.extradata) > 0:
-            self.df.writestr(self.extradata)
-
-        # Clean up
-        self.df.close()
-
-        # Now write out entities, which actually happens in a different file
-        # We open regardless of entities, because we'd have to zero out the
-        # file.
-        self.set_df_ent()
-        self.df_ent.open_w()
-        for entity in self.entities:
-            entity.write(self.df_ent)
-        self.df_ent.close()
-
-    def _sub_replicate(self, newmap):
-        """
-        Replicate b3-specific vars
-        """
-        newmap.version = self.version
-        newmap.atmos_sound_night = self.atmos_sound_night
-        newmap.random_sound2 = self.random_sound2
-        newmap.cloud_offset_x = self.cloud_offset_x
-        newmap.cloud_offset_y = self.cloud_offset_y
-
-        super(B3Map, self)._sub_replicate(newmap)
+        # This isn't really *proper* but any Book 3 map we load really does need
+        # a version of 0.992 and a loadhook of 2.  Override them here, in case we
+        # loaded a map which was written by a buggier older version of this
+        # utility which might not have set these correctly.
+        self.version = '0.992'
+        self.loadhook = 2
@@ -36,6 +36,7 @@ from eschalon.eschalondata import EschalonData
 from eschalon.gfx import Gfx
 from eschalon.item import B1Item, B2Item, B3Item, Item
 from eschalon.map import Map
+from eschalon.mapindex import MapIndex
 from eschalon.savefile import LoadException, Savefile
 from eschalon.savename import Savename
 from eschalon.saveslot import Saveslot
@@ -189,7 +190,8 @@ class MapLoaderDialog(Gtk.Dialog):
                  last_source=None,
                  show_new=False,
                  b23maplist=None,
-                 eschalondata=None):
+                 eschalondata=None,
+                 mapindex=None):
         """
         Constructor to set up everything
 
@@ -203,6 +205,7 @@ class MapLoaderDialog(Gtk.Dialog):
         b23maplist is a list of maps that we've read from the datapak
         eschalondata is an EschalonData object that we could use to read the maps
             in b23maplist, if necessary
+        mapindex is a MapIndex used to avoid re-reading maps we've already seen
         """
         super(MapLoaderDialog, self).__init__(
             flags=Gtk.DialogFlags.MODAL | Gtk.DialogFlags.DESTROY_WITH_PARENT,
@@ -266,12 +269,18 @@ class MapLoaderDialog(Gtk.Dialog):
         notebook_align.add(self.open_notebook)
         self.vbox.pack_start(notebook_align, True, True)
 
+        # Map info lookups go through our index, if we were given one
+        if mapindex is None:
+            mapindex = MapIndex()
+        self.mapindex = mapindex
+
         # Loading from our save dir, first see if we have saves to load
         slotdirs = glob.glob(os.path.join(savegame_dir, 'slot*'))
         self.slots = []
         for slotdir in slotdirs:
             try:
-                self.slots.append(Saveslot(slotdir, c.book))
+                self.slots.append(Saveslot(slotdir, c.book,
+                                           mapindex=self.mapindex))
             except LoadException as e:
                 LOG.error(f'error loading slot {slotdir}', exc_info=True)
                 # If there's an error, just don't show the slot
@@ -393,6 +402,9 @@ class MapLoaderDialog(Gtk.Dialog):
                                                  eschalondata=eschalondata,
                                                  )
 
+        # Hang on to anything new we found out about while building our pages
+        self.mapindex.save()
+
         # Loading from an arbitrary location
         arbitrary_align = Gtk.Alignment.new(0, 0, 1, 1)
         arbitrary_align.set_padding(5, 5, 5, 5)
@@ -464,18 +476,15 @@ class MapLoaderDialog(Gtk.Dialog):
                 map_files = glob.glob(os.path.join(directory, '*.map'))
                 for map_file in sorted(map_files):
                     try:
-                        map_list.append(Map.get_mapinfo(map_file))
+                        map_list.append(self.mapindex.get_mapinfo(map_file))
                         #detected_book, detected_mapname, df
                     except Exception as e:
                         pass
         elif b23maplist is not None and eschalondata is not None:
             for map_file in sorted(b23maplist):
                 try:
-                    map_data = eschalondata.readfile(map_file, 'maps')
-                    if map_data:
-                        map_df = Savefile(filename=map_file,
-                                          stringdata=map_data)
-                        map_list.append(Map.get_mapinfo(map_df=map_df))
+                    map_list.append(self.mapindex.get_datapak_mapinfo(
+                        eschalondata, map_file))
                 except Exception as e:
                     print('Exception: %s' % (e))
                     pass
@@ -604,6 +613,7 @@ class MapLoaderDialog(Gtk.Dialog):
         (slot,) = model.get(treeiter, self.SLOT_COL_OBJ)
         self.map_store.clear()
         slot.load_maps()
+        self.mapindex.save()
         for (idx, mapobj) in enumerate(slot.maps):
             self.map_store.append((idx,
                                    '<b>%s</b>' % (mapobj.filename_short()),
@@ -953,8 +963,9 @@ class GlobalNameDialog(Gtk.Dialog):
         col.set_sort_column_id(2)
         col.set_resizable(True)
         tv.append_column(col)
-        for (x, y, item_name) in item_names:
-            new_name = eschalondata.get_global_name(item_name)
+        new_names = eschalondata.get_global_names(
+            [item_name for (x, y, item_name) in item_names])
+        for ((x, y, item_name), new_name) in zip(item_names, new_names):
             if new_name == item_name:
                 new_name = '<i>(none)</i>'
             store.append(('(%d, %d)' % (x, y), item_name, new_name))
@@ -1258,8 +1269,11 @@ class MapGUI(BaseGUI):
         self.eschalondata = None
         try:
             self.eschalondata = EschalonData.new(
-                c.book, self.get_current_gamedir())
-            self.gfx = Gfx.new(self.req_book, self.datadir, self.eschalondata)
+                c.book, self.get_current_gamedir(),
+                cachedir=self.get_datapak_cachedir())
+            self.gfx = Gfx.new(self.req_book, self.datadir, self.eschalondata,
+                               sprite_budget=self.get_sprite_budget(),
+                               atlas_cachedir=self.get_atlas_cachedir())
             c.set_eschalondata(self.eschalondata)
         except Exception as e:
             LOG.error("Error loading Graphics", exc_info=True)
@@ -1302,9 +1316,12 @@ class MapGUI(BaseGUI):
         if modpath is not None:
             try:
                 self.eschalondata = EschalonData.new(
-                    c.book, self.get_current_gamedir(), modpath)
+                    c.book, self.get_current_gamedir(), modpath,
+                    cachedir=self.get_datapak_cachedir())
                 self.gfx = Gfx.new(
-                    self.req_book, self.datadir, self.eschalondata)
+                    self.req_book, self.datadir, self.eschalondata,
+                    sprite_budget=self.get_sprite_budget(),
+                    atlas_cachedir=self.get_atlas_cachedir())
                 c.set_eschalondata(self.eschalondata)
             except Exception as e:
                 self.errordialog('Error Reloading Game Data',
@@ -2326,6 +2343,7 @@ class MapGUI(BaseGUI):
                                  last_source=self.last_map_source,
                                  b23maplist=b23maplist,
                                  eschalondata=self.eschalondata,
+                                 mapindex=self.mapindex,
                                  show_new=(self.mapobj is None))
 
         # Run the dialog and process its return values
@@ -2744,7 +2762,7 @@ class MapGUI(BaseGUI):
                 item_num = int(item_num)
                 tilecontent.items[item_num].item_name = widget.get_text()
             else:
-                tilecontent.__dict__[labelname] = widget.get_text()
+                setattr(tilecontent, labelname, widget.get_text())
 
     def on_tilecontent_int_changed(self, widget):
         """ When a tilecontent integer changes. """
@@ -2753,7 +2771,7 @@ class MapGUI(BaseGUI):
         page = int(page)
         tilecontent = self.mapobj.tiles[self.tile_y][self.tile_x].tilecontents[page]
         if (tilecontent is not None):
-            tilecontent.__dict__[labelname] = int(widget.get_value())
+            setattr(tilecontent, labelname, int(widget.get_value()))
 
     def on_locklevel_changed(self, widget):
         """ When our lock level changes. """
@@ -2829,32 +2847,32 @@ class MapGUI(BaseGUI):
         """ Special case for changing the entity direction. """
         wname = widget.get_name()
         ent = self.mapobj.tiles[self.tile_y][self.tile_x].entity
-        ent.__dict__[wname] = widget.get_active() + 1
+        setattr(ent, wname, widget.get_active() + 1)
         self.update_ent_tile_img()
 
     def on_singleval_ent_changed_int(self, widget):
         """ Update the appropriate bit in memory. """
         wname = widget.get_name()
         ent = self.mapobj.tiles[self.tile_y][self.tile_x].entity
-        ent.__dict__[wname] = int(widget.get_value())
+        setattr(ent, wname, int(widget.get_value()))
 
     def on_singleval_ent_changed_str(self, widget):
         """ Update the appropriate bit in memory. """
         wname = widget.get_name()
         ent = self.mapobj.tiles[self.tile_y][self.tile_x].entity
-        ent.__dict__[wname] = widget.get_text()
+        setattr(ent, wname, widget.get_text())
 
     def on_singleval_map_changed_int(self, widget):
         """ Update the appropriate bit in memory. """
         wname = widget.get_name()
         mapobj = self.mapobj
-        mapobj.__dict__[wname] = int(widget.get_value())
+        setattr(mapobj, wname, int(widget.get_value()))
 
     def on_singleval_map_changed_str(self, widget):
         """ Update the appropriate bit in memory. """
         wname = widget.get_name()
         mapobj = self.mapobj
-        mapobj.__dict__[wname] = widget.get_text()
+        setattr(mapobj, wname, widget.get_text())
 
     def on_dropdown_idx_changed(self, widget, object):
         """ NOT appropriate for use as a handler, needs an object passed in. """
@@ -2865,7 +2883,7 @@ class MapGUI(BaseGUI):
         iter = widget.get_active_iter()
         model = widget.get_model()
         val = model.get_value(iter, 1)
-        self.mapobj.__dict__[wname] = val
+        setattr(self.mapobj, wname, val)
 
     def on_dropdown_idx_tile_changed(self, widget):
         """ Update the appropriate bit in memory. """
@@ -2874,7 +2892,7 @@ class MapGUI(BaseGUI):
         """ Update the appropriate bit in memory. """
         wname = widget.get_name()
         tile = self.mapobj.tiles[self.tile_y][self.tile_x]
-        tile.__dict__[wname] = int(widget.get_value())
+        setattr(tile, wname, int(widget.get_value()))
 
     def on_floor_changed(self, widget):
         """ Update the appropriate image when necessary. """
@@ -3442,7 +3460,7 @@ class MapGUI(BaseGUI):
                 itemnum = int(itemnum)
                 entry.set_text(tilecontent.items[itemnum].item_name)
             else:
-                entry.set_text(tilecontent.__dict__[name])
+                entry.set_text(getattr(tilecontent, name))
         return entry
 
     def prop_unknown_input_text(self, table, num, row, tooltip=None):
@@ -3483,7 +3501,7 @@ class MapGUI(BaseGUI):
         entry = func(table, row, varname, text, tooltip, signal)
         tilecontent = self.mapobj.tiles[self.tile_y][self.tile_x].tilecontents[page]
         if (tilecontent is not None):
-            entry.set_value(tilecontent.__dict__[name])
+            entry.set_value(getattr(tilecontent, name))
 
     def prop_unknown_input_spin(self, func, type, table, num, row, tooltip=None, signal=None, prefix=''):
         textdict = {
@@ -3509,7 +3527,7 @@ class MapGUI(BaseGUI):
             entry.append_text(value)
         tilecontent = self.mapobj.tiles[self.tile_y][self.tile_x].tilecontents[page]
         if (tilecontent is not None):
-            entry.set_active(tilecontent.__dict__[name])
+            entry.set_active(getattr(tilecontent, name))
         if (signal is not None):
             entry.connect('changed', signal)
         else:
@@ -3526,8 +3544,8 @@ class MapGUI(BaseGUI):
         entry = Gtk.CheckButton()
         entry.show()
         entry.set_name('%s_%X_%d' % (name, flagval, page))
-        tilecontentval = self.mapobj.tiles[self.tile_y][self.tile_x].tilecontents[page].__dict__[
-            name]
+        tilecontentval = getattr(
+            self.mapobj.tiles[self.tile_y][self.tile_x].tilecontents[page], name)
         entry.set_active((tilecontentval & flagval == flagval))
         entry.connect('toggled', self.on_tilecontent_flag_changed)
         if (tooltip is not None):
@@ -3543,9 +3561,9 @@ class MapGUI(BaseGUI):
         flagval = int(flagval_str, 16)
         if (object is not None):
             if (widget.get_active()):
-                object.__dict__[name] |= flagval
+                setattr(object, name, getattr(object, name) | flagval)
             else:
-                object.__dict__[name] &= ~flagval
+                setattr(object, name, getattr(object, name) & ~flagval)
 
     def on_map_flag_changed(self, widget):
         """
@@ -3587,7 +3605,7 @@ class MapGUI(BaseGUI):
         (varname, page) = wname.rsplit('_', 2)
         page = int(page)
         tilecontent = self.mapobj.tiles[self.tile_y][self.tile_x].tilecontents[page]
-        tilecontent.__dict__[varname] = widget.get_active()
+        setattr(tilecontent, varname, widget.get_active())
 
     def on_mapitem_clicked(self, widget, doshow=True):
         """ What to do when our item button is clicked. """
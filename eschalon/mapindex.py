@@ -0,0 +1,168 @@
+#!/usr/bin/python
+# vim: set expandtab tabstop=4 shiftwidth=4:
+#
+# Eschalon Savefile Editor
+# Copyright (C) 2008-2017 CJ Kucera, Elliot Kendall, Eitan Adler
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from eschalon.map import Map
+from eschalon.savefile import LoadException, Savefile
+from eschalon.vfs import SOURCE_FILE
+
+LOG = logging.getLogger(__name__)
+
+
+class MapIndex(object):
+    """
+    A persistent index of the book number and map name of map files we've
+    seen, keyed by path, modification time and size, so that listing
+    the maps in a savegame slot (or in the datapak) doesn't have to open
+    every map file each time.  Lookups which miss fall through to
+    Map.get_mapinfo() and are remembered; call save() to write out any
+    new entries.  If "filename" is None, the index only lives in memory.
+
+    Maps inside the datapak are keyed by their name within the datapak,
+    along with the modification time and size of the datapak itself.
+    """
+
+    # Bump this if the index format ever changes; older indexes will
+    # just be discarded
+    VERSION = 1
+
+    def __init__(self, filename: Optional[str] = None) -> None:
+        self.filename = filename
+        self.entries = {}  # type: Dict[str, List]
+        self.dirty = False
+        self.load()
+
+    def load(self) -> None:
+        """
+        Loads our index from disk.  A missing or unreadable index is
+        not an error; we just start over with an empty one.
+        """
+        self.entries = {}
+        self.dirty = False
+        if self.filename is None or not os.path.isfile(self.filename):
+            return
+        try:
+            with open(self.filename, 'r') as df:
+                data = json.load(df)
+            if data.get('version') == self.VERSION:
+                self.entries = data['maps']
+        except (IOError, ValueError, KeyError, AttributeError) as e:
+            LOG.warning('Discarding unreadable map index %s: %s' % (
+                self.filename, e))
+
+    def save(self) -> bool:
+        """
+        Writes our index out to disk, if it's changed.  Entries for files
+        which no longer exist are dropped.  Returns True if the index was
+        written.
+        """
+        if self.filename is None or not self.dirty:
+            return False
+        for key in [key for (key, entry) in self.entries.items()
+                    if not os.path.exists(entry[4])]:
+            del self.entries[key]
+        dirname = os.path.dirname(os.path.abspath(self.filename))
+        try:
+            (fd, tempname) = tempfile.mkstemp(
+                dir=dirname,
+                prefix='.%s.' % os.path.basename(self.filename),
+                suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as df:
+                    json.dump({'version': self.VERSION, 'maps': self.entries}, df)
+                os.replace(tempname, self.filename)
+            except Exception:
+                os.remove(tempname)
+                raise
+        except (IOError, OSError) as e:
+            LOG.warning('Could not write map index %s: %s' % (self.filename, e))
+            return False
+        self.dirty = False
+        return True
+
+    @staticmethod
+    def stat(path: str) -> os.stat_result:
+        """ Stats the given path, raising a LoadException on errors """
+        try:
+            return os.stat(path)
+        except OSError as e:
+            raise LoadException(str(e))
+
+    def lookup(self, key: str, stat: os.stat_result) -> Optional[Tuple[int, str]]:
+        """
+        Returns the (book, mapname) tuple stored for the given key, if the
+        stored modification time and size match the given stat result (of
+        the file the key's data lives in).
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+            return None
+        return (entry[2], entry[3])
+
+    def store(self, key: str, path: str, stat: os.stat_result, book: int,
+              mapname: str) -> None:
+        """
+        Remembers the book and mapname for the given key, which lives in
+        "path".  "stat" should be taken before the data is read, so that
+        a file which changes underneath us isn't recorded as current.
+        """
+        self.entries[key] = [stat.st_mtime_ns, stat.st_size, book, mapname, path]
+        self.dirty = True
+
+    def get_mapinfo(self, filename: str) -> Tuple[int, str, Savefile]:
+        """
+        Drop-in replacement for Map.get_mapinfo(filename), which only
+        opens the file if our index doesn't already know about it.
+        """
+        path = os.path.abspath(filename)
+        stat = self.stat(path)
+        info = self.lookup(path, stat)
+        if info is None:
+            (book, mapname, df) = Map.get_mapinfo(filename)
+            self.store(path, path, stat, book, mapname)
+            return (book, mapname, df)
+        return info + (Savefile(filename),)
+
+    def get_datapak_mapinfo(self, eschalondata, map_file: str) -> Tuple[int, str, Savefile]:
+        """
+        Returns the same information as get_mapinfo(), for a map which
+        lives in the given EschalonData's datapak (or game or mod directory).
+        The returned Savefile is just named after the map, as in
+        MapLoaderDialog.mapdir_page().
+        """
+        (source, locator) = eschalondata.lookup(map_file, 'maps')
+        if source == SOURCE_FILE:
+            (book, mapname, df) = self.get_mapinfo(locator)
+            return (book, mapname, Savefile(filename=map_file))
+        path = os.path.abspath(eschalondata.datapak.filename)
+        key = '%s:maps/%s' % (path, map_file)
+        stat = self.stat(path)
+        info = self.lookup(key, stat)
+        if info is None:
+            # Only the start of the map gets decrypted
+            with eschalondata.open_member(map_file, 'maps') as handle:
+                info = Map.probe_handle(handle)
+            self.store(key, path, stat, info[0], info[1])
+        return info + (Savefile(filename=map_file),)
@@ -0,0 +1,194 @@
+#!/usr/bin/python
+# vim: set expandtab tabstop=4 shiftwidth=4:
+#
+# Eschalon Savefile Editor
+# Copyright (C) 2008-2017 CJ Kucera, Elliot Kendall, Eitan Adler
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+import logging
+import mmap
+import os
+import zlib
+from struct import Struct
+from typing import Dict, List, Optional
+
+from eschalon import lru
+from eschalon.savefile import LoadException
+
+LOG = logging.getLogger(__name__)
+
+
+class PakIndex(object):
+    """ A class to hold information on an individual file in the pak. """
+
+    __slots__ = ('size_compressed', 'abs_index', 'size_real', 'unknowni1',
+                 'filename')
+
+    def __init__(self, size_compressed, abs_index, size_real, unknowni1,
+                 filename):
+        self.size_compressed = size_compressed
+        self.abs_index = abs_index
+        self.size_real = size_real
+        self.unknowni1 = unknowni1
+        self.filename = filename
+
+
+class PakArchive(object):
+    """
+    Read-only access to Book 1's gfx.pak.  The pak is mmapped, its index
+    is parsed in a single pass when we're opened, and members are inflated
+    straight out of the mapped region, so reading a member involves no
+    file handles (and is safe to do from several threads at once).
+
+    If "override_dir" is passed, files in that directory take precedence
+    over members of the pak with the same name (the game itself uses
+    "packedgraphics" for this).  The directory is only listed once, when
+    we're opened.  If "filename" is None, only the override directory is
+    used.
+    """
+
+    # "!PAK" magic, two unknown shorts, the number of files, the size of
+    # the compressed index and an unknown int
+    HEADER = Struct('<4s2H3I')
+    MAGIC = b'!PAK'
+
+    # Index entries: compressed size, offset (relative to the end of the
+    # compressed index), uncompressed size, an unknown int, and filename
+    ENTRY = Struct('<4I256s')
+
+    # How much of the compressed index we inflate at a time, while
+    # looking for its end
+    INDEX_CHUNK_SIZE = 65536
+
+    def __init__(self, filename: Optional[str], override_dir: Optional[str] = None) -> None:
+        self.filename = filename
+        self.override_dir = override_dir
+        self.fileindex = {}  # type: Dict[str, PakIndex]
+        self.unknownh1 = -1
+        self.unknownh2 = -1
+        self.numfiles = 0
+        self.compressed_idx_size = -1
+        self.unknowni1 = -1
+        self.zeroindex = -1
+        self.mapped = None
+        self.view = None
+        self.cache_key = None
+
+        if override_dir is not None and os.path.isdir(override_dir):
+            self.overrides = frozenset(os.listdir(override_dir))
+        else:
+            self.overrides = frozenset()
+
+        if filename is not None:
+            try:
+                with open(filename, 'rb') as df:
+                    self.cache_key = lru.file_key(
+                        os.path.abspath(filename), os.fstat(df.fileno()))
+                    self.mapped = mmap.mmap(df.fileno(), 0, access=mmap.ACCESS_READ)
+            except (IOError, OSError, ValueError) as e:
+                raise LoadException('Could not open PAK %s: %s' % (filename, e))
+            self.view = memoryview(self.mapped)
+            try:
+                self.read_index()
+            except Exception:
+                self.close()
+                raise
+
+    def read_index(self) -> None:
+        """ Reads in our header and file index """
+        if len(self.view) < self.HEADER.size:
+            raise LoadException('Invalid PAK header')
+        (magic, self.unknownh1, self.unknownh2, self.numfiles,
+         self.compressed_idx_size, self.unknowni1) = self.HEADER.unpack_from(self.view)
+        if magic != self.MAGIC:
+            raise LoadException('Invalid PAK header')
+
+        # The member data starts right after the compressed index, which
+        # we only know the end of once we've inflated it.
+        decobj = zlib.decompressobj()
+        parts = []
+        pos = self.HEADER.size
+        while not decobj.eof and pos < len(self.view):
+            parts.append(decobj.decompress(
+                self.view[pos:pos + self.INDEX_CHUNK_SIZE]))
+            pos += self.INDEX_CHUNK_SIZE
+        if not decobj.eof:
+            raise LoadException('PAK index is truncated')
+        self.zeroindex = min(pos, len(self.view)) - len(decobj.unused_data)
+        indexdata = b''.join(parts)
+
+        indexlen = self.numfiles * self.ENTRY.size
+        if len(indexdata) < indexlen:
+            raise LoadException('PAK index is truncated')
+        for (size_compressed, abs_index, size_real, unknowni1, name) in \
+                self.ENTRY.iter_unpack(memoryview(indexdata)[:indexlen]):
+            filename = name.split(b'\x00', 1)[0].decode('UTF-8')
+            self.fileindex[filename] = PakIndex(
+                size_compressed, abs_index, size_real, unknowni1, filename)
+
+    def close(self) -> None:
+        """ Unmaps the pak """
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+
+    def namelist(self) -> List[str]:
+        """ Returns the names of all the members of the pak """
+        return list(self.fileindex.keys())
+
+    def read_member(self, filename: str) -> bytes:
+        """
+        Inflates the given member of the pak (ignoring the override
+        directory), bypassing the in-memory member cache.
+        """
+        try:
+            index = self.fileindex[filename]
+        except KeyError:
+            raise LoadException('Filename %s not found in archive' % (filename))
+        start = self.zeroindex + index.abs_index
+        if start + index.size_compressed > len(self.view):
+            raise LoadException('PAK member %s is truncated' % (filename))
+        try:
+            # On Windows, we need to specify bufsize or memory gets clobbered
+            return zlib.decompress(
+                self.view[start:start + index.size_compressed], 15, index.size_real)
+        except zlib.error as e:
+            raise LoadException('Could not inflate PAK member %s: %s' % (filename, e))
+
+    def readfile(self, filename: str) -> bytes:
+        """
+        Reads the given file, from the override directory if it's there,
+        or from the pak otherwise.  Members of the pak are kept in the
+        shared in-memory member cache.
+        """
+        if filename in self.overrides:
+            try:
+                with open(os.path.join(self.override_dir, filename), 'rb') as df:
+                    return df.read()
+            except IOError as e:
+                raise LoadException('Could not read %s: %s' % (filename, e))
+        if filename not in self.fileindex:
+            raise LoadException('Filename %s not found in archive' % (filename))
+        key = self.cache_key + (filename,)
+        data = lru.member_cache.get(key)
+        if data is None:
+            data = self.read_member(filename)
+            lru.member_cache.put(key, data)
+        return data
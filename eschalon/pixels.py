@@ -0,0 +1,167 @@
+#!/usr/bin/python
+# vim: set expandtab tabstop=4 shiftwidth=4:
+#
+# Eschalon Savefile Editor
+# Copyright (C) 2008-2017 CJ Kucera, Elliot Kendall, Eitan Adler
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""
+Conversions between the pixel layouts of Cairo image surfaces and GDK
+Pixbufs.  Cairo's ARGB32 stores each pixel as a native-endian 32-bit
+value with the colour channels premultiplied by alpha; a Pixbuf with an
+alpha channel stores R, G, B, A bytes in that order, not premultiplied.
+These work on plain buffers, so they don't need Cairo or GDK themselves
+(see Gfx.surface_to_pixbuf() and Gfx.pixbuf_to_surface() for that).
+
+NumPy is used if it's available.  Otherwise we fall back to shuffling
+bytes around with slice assignments, which only needs a per-pixel loop
+for the partially-transparent pixels (for fully opaque or fully clear
+pixels, premultiplied and straight alpha are the same thing).
+"""
+
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Byte offsets of the B, G, R and A channels within an ARGB32 pixel
+if sys.byteorder == 'little':
+    ARGB32_OFFSETS = (0, 1, 2, 3)
+else:
+    ARGB32_OFFSETS = (3, 2, 1, 0)
+
+# Lookup tables for the fallback, indexed by (alpha * 256) + channel
+UNPREMULTIPLY = bytes([0 if a == 0 else min(255, (c * 255 + a // 2) // a)
+                       for a in range(256) for c in range(256)])
+PREMULTIPLY = bytes([(c * a + 127) // 255
+                     for a in range(256) for c in range(256)])
+
+# Map alpha values to 1 if the pixel needs its channels adjusted.  Fully
+# transparent pixels have to be cleared out when premultiplying, but are
+# already clear when coming the other way.
+UNPREMULTIPLY_FLAGS = bytes([0] + [1] * 254 + [0])
+PREMULTIPLY_FLAGS = bytes([1] * 255 + [0])
+
+
+def argb32_to_rgba(data, width: int, height: int, stride: int) -> bytes:
+    """
+    Converts the given premultiplied ARGB32 data (as from a Cairo
+    surface's get_data()) to straight-alpha RGBA bytes with no row
+    padding, suitable for GdkPixbuf.Pixbuf.new_from_bytes().
+    """
+    if numpy is not None:
+        return _argb32_to_rgba_numpy(data, width, height, stride)
+    return _argb32_to_rgba_python(data, width, height, stride)
+
+
+def rgba_to_argb32(data, width: int, height: int, rowstride: int) -> bytearray:
+    """
+    Converts the given straight-alpha RGBA data (as from a Pixbuf's
+    get_pixels()) to premultiplied ARGB32, with a stride of width*4,
+    suitable for cairo.ImageSurface.create_for_data().
+    """
+    if numpy is not None:
+        return _rgba_to_argb32_numpy(data, width, height, rowstride)
+    return _rgba_to_argb32_python(data, width, height, rowstride)
+
+
+def _rows(data, width, height, stride):
+    """
+    Returns the given data with any padding at the end of each row
+    removed, as a bytearray.
+    """
+    if stride == width * 4:
+        return bytearray(memoryview(data)[:width * height * 4])
+    view = memoryview(data)
+    rows = bytearray(width * height * 4)
+    for y in range(height):
+        rows[y * width * 4:(y + 1) * width * 4] = view[y * stride:y * stride + width * 4]
+    return rows
+
+
+def _pixels_numpy(data, width, height, stride):
+    """
+    Returns a (height, width, 4) array view of the given data.  The last
+    row of a Pixbuf isn't necessarily padded out to the full rowstride,
+    so we can't just reshape the whole buffer.
+    """
+    arr = numpy.frombuffer(data, dtype=numpy.uint8)
+    if len(arr) < (height - 1) * stride + width * 4:
+        raise ValueError('Pixel data is too short for its dimensions')
+    return numpy.lib.stride_tricks.as_strided(
+        arr, shape=(height, width, 4), strides=(stride, 4, 1), writeable=False)
+
+
+def _argb32_to_rgba_numpy(data, width, height, stride):
+    pixels = _pixels_numpy(data, width, height, stride)
+    (b, g, r, a) = ARGB32_OFFSETS
+    alpha = pixels[:, :, a].astype(numpy.uint32)
+    divisor = numpy.maximum(alpha, 1)
+    out = numpy.empty((height, width, 4), dtype=numpy.uint8)
+    for (dst, src) in enumerate((r, g, b)):
+        channel = (pixels[:, :, src].astype(numpy.uint32) * 255 + alpha // 2) // divisor
+        out[:, :, dst] = numpy.minimum(channel, 255)
+    out[:, :, 3] = pixels[:, :, a]
+    return out.tobytes()
+
+
+def _rgba_to_argb32_numpy(data, width, height, rowstride):
+    pixels = _pixels_numpy(data, width, height, rowstride)
+    (b, g, r, a) = ARGB32_OFFSETS
+    alpha = pixels[:, :, 3].astype(numpy.uint32)
+    out = numpy.empty((height, width, 4), dtype=numpy.uint8)
+    for (dst, src) in ((r, 0), (g, 1), (b, 2)):
+        out[:, :, dst] = (pixels[:, :, src].astype(numpy.uint32) * alpha + 127) // 255
+    out[:, :, a] = pixels[:, :, 3]
+    return bytearray(out.tobytes())
+
+
+def _convert_python(src, src_offsets, dst_offsets, alpha_src, table, flagtable):
+    """
+    Shuffles the channels of the padding-free pixel data in "src" from
+    src_offsets to dst_offsets (each a tuple of the channel positions for
+    red, green, blue and alpha), then runs the pixels whose alpha is
+    flagged in "flagtable" through the given lookup table.
+    """
+    dst = bytearray(len(src))
+    for (s, d) in zip(src_offsets, dst_offsets):
+        dst[d::4] = src[s::4]
+    alphas = bytes(src[alpha_src::4])
+    flags = alphas.translate(flagtable)
+    pixel = flags.find(1)
+    while pixel >= 0:
+        base = alphas[pixel] * 256
+        pos = pixel * 4
+        for d in dst_offsets[:3]:
+            dst[pos + d] = table[base + dst[pos + d]]
+        pixel = flags.find(1, pixel + 1)
+    return dst
+
+
+def _argb32_to_rgba_python(data, width, height, stride):
+    (b, g, r, a) = ARGB32_OFFSETS
+    return bytes(_convert_python(_rows(data, width, height, stride),
+                                 (r, g, b, a), (0, 1, 2, 3), a,
+                                 UNPREMULTIPLY, UNPREMULTIPLY_FLAGS))
+
+
+def _rgba_to_argb32_python(data, width, height, rowstride):
+    (b, g, r, a) = ARGB32_OFFSETS
+    return _convert_python(_rows(data, width, height, rowstride),
+                           (0, 1, 2, 3), (r, g, b, a), 3,
+                           PREMULTIPLY, PREMULTIPLY_FLAGS)
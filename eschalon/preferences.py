@@ -24,7 +24,7 @@ import sys
 
 from six.moves import configparser
 
-from eschalon import app_name
+from eschalon import app_name, lru
 
 LOG = logging.getLogger(__name__)
 
@@ -74,9 +74,10 @@ class Prefs(object):
         # savegames stored in there, so it'd be useful to know that first
         for vars in [('paths', 'gamedir'), ('paths', 'gamedir_b2'), ('paths', 'gamedir_b3'), ('paths', 'savegames'), ('paths', 'savegames_b2'), ('paths', 'savegames_b3')]:
             self.set_str(vars[0], vars[1], self.default(vars[0], vars[1]))
-        for vars in [('mapgui', 'default_zoom')]:
+        for vars in [('mapgui', 'default_zoom'), ('mapgui', 'sprite_cache_mb'),
+                     ('datapak', 'memory_cache_mb')]:
             self.set_int(vars[0], vars[1], self.default(vars[0], vars[1]))
-        for vars in [('mapgui',)]:
+        for vars in [('datapak', 'extract_cache'), ('mapgui', 'atlas_cache')]:
             self.set_bool(vars[0], vars[1], self.default(vars[0], vars[1]))
 
     def load(self):
@@ -94,6 +95,16 @@ class Prefs(object):
                 self.cp.write(df)
             return True
 
+    def sidecar_file(self, name):
+        """
+        Returns the path of a supplementary data file (such as a cache)
+        which lives alongside our prefs file, or None if we don't have a
+        prefs file.
+        """
+        if self.filename is None:
+            return None
+        return '%s.%s' % (self.filename, name)
+
     def set_str(self, cat, name, val):
         if not self.cp.has_section(cat):
             self.cp.add_section(cat)
@@ -127,6 +138,15 @@ class Prefs(object):
         if cat == 'mapgui':
             if name == 'default_zoom':
                 return 4
+            elif name == 'sprite_cache_mb':
+                return lru.DEFAULT_SPRITE_BUDGET_MB
+            elif name == 'atlas_cache':
+                return True
+        elif cat == 'datapak':
+            if name == 'extract_cache':
+                return True
+            elif name == 'memory_cache_mb':
+                return lru.DEFAULT_BUDGET_MB
         return None
 
     def no_prefsfile(self):
@@ -18,12 +18,56 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 import logging
+import mmap
 import os
-from io import BytesIO
-from struct import pack, unpack
+import tempfile
+import threading
+from struct import Struct, pack, unpack
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 LOG = logging.getLogger(__name__)
 
+# Initial number of bytes to scan at a time when looking for the end of
+# a string in a file-backed Savefile
+STR_WINDOW = 128
+
+# Cache of compiled record codecs, keyed by their format string
+_record_structs = {}  # type: Dict[str, Struct]
+
+
+def _read_umask() -> int:
+    """
+    Reads the umask the only portable way there is, by setting it and then
+    setting it back.  That briefly changes process-wide state, so this is
+    only done once, while this module is being imported.
+    """
+    with _umask_lock:
+        umask = os.umask(0)
+        os.umask(umask)
+    return umask
+
+
+_umask_lock = threading.Lock()
+
+# The umask as of startup, for platforms which can't tell us its current
+# value (see Savefile._umask())
+STARTUP_UMASK = _read_umask()
+
+
+def record_struct(codec) -> Struct:
+    """
+    Returns a compiled (and cached) Struct for the given record codec.  A
+    codec is a plain struct format string (without a byte-order prefix),
+    such as 'BBfH'; all records are little-endian with no padding, which
+    matches how the individual read*/write* methods lay out their data.
+    """
+    try:
+        return _record_structs[codec]
+    except KeyError:
+        compiled = Struct('<' + codec)
+        _record_structs[codec] = compiled
+        return compiled
+
 
 class LoadException(Exception):
     def __init__(self, text):
@@ -37,14 +81,185 @@ class FirstItemLoadException(LoadException):
     pass
 
 
+class BufferCursor(object):
+    """
+    A minimal read-only file-like object which sits on top of an in-memory
+    buffer - either a bytes-like object, or an mmap of a file on disk.
+    Reads are just slices of the buffer, so there are no syscalls per read
+    and no copy of the whole buffer like BytesIO would make.
+    """
+
+    def __init__(self, data, mapped=None):
+        """
+        "data" must support slicing and find() (bytes, bytearray and mmap
+        all do).  If "mapped" is passed, it's an mmap which we'll close
+        along with ourselves.
+        """
+        self.data = data
+        self.view = memoryview(data)
+        self.length = len(data)
+        self.pos = 0
+        self.mapped = mapped
+
+    @staticmethod
+    def map_file(filename):
+        """
+        Returns a new BufferCursor on top of a read-only mmap of the given
+        file.  Can raise IOError if the file can't be opened, or ValueError
+        if it can't be mapped (zero-length files can't be, for instance).
+        """
+        with open(filename, 'rb') as df:
+            mapped = mmap.mmap(df.fileno(), 0, access=mmap.ACCESS_READ)
+        return BufferCursor(mapped, mapped)
+
+    def close(self) -> None:
+        """ Releases our buffer, and unmaps our file if we have one. """
+        self.view.release()
+        if self.mapped is not None:
+            self.mapped.close()
+
+    def seek(self, offset, whence=0) -> int:
+        """ Moves our cursor, in the same manner as a file's seek(). """
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += self.length
+        if offset < 0:
+            raise IOError('Invalid seek position %d' % (offset))
+        self.pos = offset
+        return self.pos
+
+    def tell(self) -> int:
+        """ Returns our current position. """
+        return self.pos
+
+    def read(self, size=-1) -> bytes:
+        """ Reads up to "size" bytes (or the rest of the buffer). """
+        return self.readview(size).tobytes()
+
+    def readview(self, size=-1) -> memoryview:
+        """
+        Reads up to "size" bytes (or the rest of the buffer), returning a
+        memoryview onto our buffer rather than a copy.  The view should be
+        released before we're closed.
+        """
+        start = min(self.pos, self.length)
+        if size is None or size < 0:
+            end = self.length
+        else:
+            end = min(start + size, self.length)
+        self.pos = end
+        return self.view[start:end]
+
+    def find(self, sub, start) -> int:
+        """ Passthrough to our buffer's find(). """
+        return self.data.find(sub, start)
+
+
+class BufferWriter(object):
+    """
+    A minimal write-only file-like object which accumulates everything
+    written to it in a bytearray, so that a Savefile can be serialized
+    entirely in memory before anything touches the disk.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data) -> int:
+        """ Appends the given data to our buffer. """
+        self.data += data
+        return len(data)
+
+    def tell(self) -> int:
+        """ Returns our current position (which is always the end). """
+        return len(self.data)
+
+    def close(self) -> None:
+        """ Nothing to do; our Savefile decides what to do with the data. """
+        pass
+
+
+class PositionalReader(object):
+    """
+    Reads arbitrary ranges out of a file, safely from any number of
+    threads at once.  Where the platform has os.pread() we keep a single
+    handle and never touch its file position; elsewhere (Windows) each
+    thread gets its own handle, opened on first use, to seek and read on.
+    """
+
+    use_pread = hasattr(os, 'pread')
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.handles = []
+        if self.use_pread:
+            self.handle = open(filename, 'rb')
+        else:
+            self.handle = None
+
+    def _thread_handle(self):
+        """ Returns this thread's own handle, opening it if need be """
+        handle = getattr(self.local, 'handle', None)
+        if handle is None:
+            handle = open(self.filename, 'rb')
+            self.local.handle = handle
+            with self.lock:
+                self.handles.append(handle)
+        return handle
+
+    def pread(self, size, offset) -> bytes:
+        """
+        Reads up to "size" bytes starting at "offset".  Fewer bytes are
+        only returned at the end of the file.
+        """
+        if self.handle is not None:
+            # pread may come up short, so keep going until EOF
+            fileno = self.handle.fileno()
+            parts = []
+            while size > 0:
+                data = os.pread(fileno, size, offset)
+                if not data:
+                    break
+                parts.append(data)
+                size -= len(data)
+                offset += len(data)
+            return b''.join(parts)
+        handle = self._thread_handle()
+        handle.seek(offset)
+        return handle.read(size)
+
+    def close(self) -> None:
+        """ Closes all of our handles """
+        if self.handle is not None:
+            self.handle.close()
+        with self.lock:
+            for handle in self.handles:
+                handle.close()
+            self.handles = []
+        self.local = threading.local()
+
+
 class Savefile(object):
     """ Class that wraps around a file object, to simplify things """
 
+    # Whether to mmap files which are opened for reading, rather than
+    # reading them through a regular file handle.
+    use_mmap = True
+
     def __init__(self, filename=None, stringdata=None):
         """
         Empty object.  If only "filename" is passed, we will read
-        from the filesystem.  If "stringdata" is also passed, we
-        will use a BytesIO object instead.
+        from the filesystem.  If "stringdata" is passed instead, we
+        will read straight from it with a BufferCursor.
+
+        Writes always go into an in-memory BufferWriter.  For a file,
+        the data is published when we're closed, by writing it to a
+        temporary file alongside the real one and then renaming it
+        into place, so the original is never left half-written.  For
+        stringdata, our stringdata is replaced by what was written.
         """
 
         if bool(filename is None) == bool(stringdata is None):
@@ -57,6 +272,13 @@ class Savefile(object):
         self.opened_r = False
         self.opened_w = False
 
+        # Total length of the data, known while we're open for reading
+        self.length = None
+
+        # Temporary file holding our written data, once it's been staged
+        # but before it's been renamed into place
+        self.staged = None
+
     def set_filename(self, filename) -> None:
         """
         Sets our filename (and clears our stringdata, if it's set)
@@ -81,41 +303,160 @@ class Savefile(object):
             return os.path.exists(self.filename)
 
     def close(self) -> None:
-        """ Closes the filehandle. """
-        if self.opened_r or self.opened_w:
+        """
+        Closes the filehandle.  If we were open for writing, this is when
+        the written data actually gets published.
+        """
+        if self.opened_w:
+            Savefile.commit_all([self])
+        elif self.opened_r:
             self.df.close()
             self.opened_r = False
+            self.length = None
+
+    def abort(self) -> None:
+        """
+        Throws away anything written since open_w(), leaving the file on
+        disk untouched.  Does nothing if we're not open for writing.
+        """
+        if self.staged is not None:
+            try:
+                os.remove(self.staged)
+            except OSError:
+                pass
+            self.staged = None
+        if self.opened_w:
+            self.df.close()
             self.opened_w = False
 
-    def _open_mode(self, mode) -> None:
-        if self.opened_r or self.opened_w:
-            raise IOError('File is already open')
+    def stage(self) -> None:
+        """
+        Writes out everything written since open_w() to a temporary file
+        next to our real one, ready for commit() to rename into place.
+        """
+        if not self.opened_w:
+            raise IOError('File is not open for writing')
+        if self.is_stringdata() or self.staged is not None:
+            return
+        dirname = os.path.dirname(os.path.abspath(self.filename))
+        (fd, tempname) = tempfile.mkstemp(
+            dir=dirname,
+            prefix='.%s.' % os.path.basename(self.filename),
+            suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as df:
+                df.write(self.df.data)
+                df.flush()
+                os.fsync(df.fileno())
+            os.chmod(tempname, self._publish_mode())
+        except Exception:
+            os.remove(tempname)
+            raise
+        self.staged = tempname
+
+    def commit(self) -> None:
+        """
+        Publishes everything written since open_w(), staging it first if
+        need be, and closes us.
+        """
+        self.stage()
         if self.is_stringdata():
-            self.df = BytesIO(self.stringdata)
+            self.stringdata = bytes(self.df.data)
         else:
-            self.df = open(self.filename, mode)
-        self.df.seek(0)
+            os.replace(self.staged, self.filename)
+            self.staged = None
+        self.df.close()
+        self.opened_w = False
+
+    @staticmethod
+    def commit_all(savefiles) -> None:
+        """
+        Publishes a group of Savefiles which are open for writing (such as
+        a map and its entity file).  Every file is staged before any is
+        renamed into place, so a failure while staging leaves all of the
+        originals untouched.  On failure, all the Savefiles are aborted.
+        """
+        try:
+            for savefile in savefiles:
+                savefile.stage()
+            for savefile in savefiles:
+                savefile.commit()
+        except Exception:
+            for savefile in savefiles:
+                savefile.abort()
+            raise
+
+    def _publish_mode(self) -> int:
+        """
+        Returns the permissions our written file should end up with: the
+        same as the file we're replacing, or the usual defaults for a new
+        file.
+        """
+        try:
+            return os.stat(self.filename).st_mode & 0o7777
+        except OSError:
+            return 0o666 & ~self._umask()
+
+    @staticmethod
+    def _umask() -> int:
+        """
+        Returns the process's umask.  os.umask() can only read it by
+        changing it, which would race with any other thread creating
+        files, so we use what Linux reports in /proc where we can, and
+        otherwise the umask we read at startup.
+        """
+        try:
+            with open('/proc/self/status', 'r') as df:
+                for line in df:
+                    if line.startswith('Umask:'):
+                        return int(line.split()[1], 8)
+        except (IOError, OSError, ValueError, IndexError):
+            pass
+        return STARTUP_UMASK
 
     def open_r(self) -> None:
         """ Opens a file for reading.  Throws IOError if unavailable"""
-        self._open_mode('rb')
+        if self.opened_r or self.opened_w:
+            raise IOError('File is already open')
+        if self.is_stringdata():
+            self.df = BufferCursor(self.stringdata)
+        elif self.use_mmap:
+            try:
+                self.df = BufferCursor.map_file(self.filename)
+            except ValueError:
+                # Empty files can't be mapped, and some platforms may not
+                # be able to map others; just use a regular filehandle.
+                self.df = open(self.filename, 'rb')
+        else:
+            self.df = open(self.filename, 'rb')
         self.opened_r = True
+        if isinstance(self.df, BufferCursor):
+            self.length = self.df.length
+        else:
+            self.length = os.fstat(self.df.fileno()).st_size
 
     def open_w(self) -> None:
-        """ Opens a file for writing.  Throws IOError if unavailable"""
-        self._open_mode('wb+')
+        """
+        Opens a file for writing.  Nothing is written to disk until we're
+        closed; see close() and commit_all().
+        """
+        if self.opened_r or self.opened_w:
+            raise IOError('File is already open')
+        self.df = BufferWriter()
         self.opened_w = True
 
     def eof(self) -> bool:
         """ Test to see if we're at EOF, since Python doesn't provide that for us. """
-        # Note that theoretically there's some cases where a file error masquerades as
-        # an EOF because of this code.  I can cope with that.
-        a = self.df.read(1)
-        if len(a) == 0:
-            return True
-        else:
-            self.df.seek(-1, 1)
-            return False
+        return self.remaining() <= 0
+
+    def remaining(self) -> int:
+        """
+        Returns the number of bytes left to read, based on the length we
+        found when the file was opened.
+        """
+        if not self.opened_r:
+            raise IOError('File is not open for reading')
+        return self.length - self.df.tell()
 
     def seek(self, offset, whence=0) -> int:
         """ Passthrough to the internal object. """
@@ -129,6 +470,68 @@ class Savefile(object):
         """ Read the rest of the file from the handle. """
         return self.df.read(len)
 
+    def readview(self, len=-1) -> memoryview:
+        """
+        Like read(), but returns a memoryview.  When we're reading from a
+        buffer or an mmap this avoids copying the data; release the view
+        (or use it as a context manager) before closing the file.
+        """
+        if isinstance(self.df, BufferCursor):
+            return self.df.readview(len)
+        else:
+            return memoryview(self.df.read(len))
+
+    def read_record(self, codec) -> Tuple:
+        """
+        Read a fixed-width run of values from the savefile in one go,
+        as described by the given codec (see record_struct()).  Returns
+        a tuple of the decoded values.
+        """
+        if not self.opened_r:
+            raise IOError('File is not open for reading')
+        record = record_struct(codec)
+        if isinstance(self.df, BufferCursor):
+            values = record.unpack_from(self.df.data, self.df.pos)
+            self.df.pos += record.size
+            return values
+        else:
+            return record.unpack(self.df.read(record.size))
+
+    def write_record(self, codec, values: Sequence) -> None:
+        """
+        Write a fixed-width run of values to the savefile in one go, as
+        described by the given codec (see record_struct()).
+        """
+        if not self.opened_w:
+            raise IOError('File is not open for writing')
+        self.df.write(record_struct(codec).pack(*values))
+
+    def read_records(self, codec, count) -> List[Tuple]:
+        """
+        Read "count" consecutive records, each described by the given
+        codec (see record_struct()), in a single pass.  Returns a list
+        of tuples of the decoded values.
+        """
+        if not self.opened_r:
+            raise IOError('File is not open for reading')
+        record = record_struct(codec)
+        size = record.size * count
+        with self.readview(size) as data:
+            if len(data) != size:
+                raise LoadException('Expected %d bytes of records, found %d' % (
+                    size, len(data)))
+            return list(record.iter_unpack(data))
+
+    def write_records(self, codec, records: Iterable[Sequence]) -> None:
+        """
+        Write a series of records, each described by the given codec (see
+        record_struct()), in one go.
+        """
+        if not self.opened_w:
+            raise IOError('File is not open for writing')
+        packer = record_struct(codec).pack
+        self.df.write(b"".join([packer(*values) for values in records]))
+
     def readuchar(self) -> int:
         """ Read an unsigned character (1-byte) "integer" from the savefile. """
         if not self.opened_r:
@@ -206,15 +609,32 @@ class Savefile(object):
         """ Read a string from the savefile, delimited by \r\n """
         if not self.opened_r:
             raise IOError('File is not open for reading')
-        mystr = b''
-        strpart = self.df.read(1)
-        while len(strpart) == 1:
-            mystr = mystr + strpart
-            if mystr[-2:] == b"\r\n":
-                return mystr[:-2]
-            strpart = self.df.read(1)
-        raise LoadException('Error reading string value |' +
-                            strpart.decode('ascii') + '|')
+        start = self.df.tell()
+        if isinstance(self.df, BufferCursor):
+            # We already have the whole backing buffer, so just search it.
+            end = self.df.find(b"\r\n", start)
+            if end == -1:
+                self.df.seek(0, 2)
+                raise LoadException('Error reading string value ||')
+            self.df.seek(end + 2)
+            return self.df.data[start:end]
+        else:
+            # Otherwise, scan through windows of the file until we find the
+            # delimiter, and then seek back to just after it.
+            buf = bytearray()
+            window = STR_WINDOW
+            while True:
+                chunk = self.df.read(window)
+                if len(chunk) == 0:
+                    raise LoadException('Error reading string value ||')
+                # Step back a byte in case the delimiter straddles two chunks
+                searchfrom = max(len(buf) - 1, 0)
+                buf += chunk
+                end = buf.find(b"\r\n", searchfrom)
+                if end != -1:
+                    self.df.seek(start + end + 2)
+                    return bytes(buf[:end])
+                window *= 2
 
     def writestr(self, strval) -> None:
         """ Write a string (delimited by \r\n) to the savefile. """
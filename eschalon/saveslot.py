@@ -26,6 +26,7 @@ from typing import Any, List, Optional
 
 from eschalon import util
 from eschalon.map import Map
+from eschalon.mapindex import MapIndex
 from eschalon.savefile import LoadException, Savefile
 from eschalon.savename import Savename
 
@@ -59,15 +60,19 @@ class Saveslot(object):
     name, but if you pass load_all=True, it will do so.  Passing "book"
     along with load_all=True will allow the character name to be loaded
     even if there are no map files present to autodetect the book number.
+    Passing a MapIndex as "mapindex" lets us skip opening map files which
+    haven't changed since we last saw them.
 
     The "savename" file for Books 1+2+3 all start with a string containing
     the user-set name of the savefile, so there's currently no need to
     divide this out based on book.
     """
 
-    def __init__(self, directory: str, load_all: bool = False, book: Optional[int] = None) -> None:
+    def __init__(self, directory: str, load_all: bool = False, book: Optional[int] = None,
+                 mapindex: Optional[MapIndex] = None) -> None:
         """ Empty object. """
         self.directory = directory
+        self.mapindex = mapindex
 
         # Make sure we really are a directory
         if not os.path.isdir(directory):
@@ -118,9 +123,13 @@ class Saveslot(object):
         self.maps_loaded = True
         map_filenames = sorted(
             glob.glob(os.path.join(self.directory, '*.map')))
+        if self.mapindex is None:
+            get_mapinfo = Map.get_mapinfo
+        else:
+            get_mapinfo = self.mapindex.get_mapinfo
         for map_filename in map_filenames:
             try:
-                (book, mapname, df) = Map.get_mapinfo(map_filename)
+                (book, mapname, df) = get_mapinfo(map_filename)
                 self.maps.append(SaveslotMap(map_filename, mapname, book))
             except:
                 # Don't bother reporting, don't think it's worth it for our
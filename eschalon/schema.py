@@ -0,0 +1,211 @@
+#!/usr/bin/python
+# vim: set expandtab tabstop=4 shiftwidth=4:
+#
+# Eschalon Savefile Editor
+# Copyright (C) 2008-2017 CJ Kucera, Elliot Kendall, Eitan Adler
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""
+Declarative descriptions of the on-disk records used by our model
+objects (items, entities, tiles, tilecontents and map headers).  Each
+record is described once, as a Schema made up of Fields, and the Schema
+takes care of reading, writing, copying and comparing the described
+attributes.  Consecutive fixed-width fields are fused into a single
+record codec (see eschalon.savefile.record_struct), so reading a run of
+them is one unpack no matter how many fields are in it.
+"""
+
+import logging
+from typing import List, Tuple
+
+from eschalon.savefile import record_struct
+
+LOG = logging.getLogger(__name__)
+
+# Field type for our length-prefixed strings (see Savefile.readstr())
+STR = 'str'
+
+
+class Field(object):
+    """
+    A single value in a record.  "codec" is either a single struct format
+    character or STR, "savegame" restricts the field to savegame (True) or
+    global (False) files, and "count" turns the field into a list of that
+    many values.
+    """
+
+    __slots__ = ('name', 'codec', 'savegame', 'count')
+
+    def __init__(self, name, codec, savegame=None, count=None):
+        if codec == STR and count is not None:
+            raise ValueError('String fields cannot have a count')
+        self.name = name
+        self.codec = codec
+        self.savegame = savegame
+        self.count = count
+
+    def applies(self, savegame):
+        """ Returns whether this field is present in the given file type """
+        return self.savegame is None or self.savegame == bool(savegame)
+
+    def format(self):
+        """ The struct format for this field """
+        if self.count is None:
+            return self.codec
+        else:
+            return '%d%s' % (self.count, self.codec)
+
+
+class _String(object):
+    """ A plan step which reads or writes a single string field """
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def read(self, obj, df):
+        setattr(obj, self.name, df.readstr().decode('UTF-8'))
+
+    def write(self, obj, df):
+        df.writestr(getattr(obj, self.name))
+
+
+class _Run(object):
+    """
+    A plan step which reads or writes a run of fixed-width fields as one
+    record.  List fields are sliced out of (and flattened back into) the
+    record.
+    """
+
+    __slots__ = ('codec', 'names', 'slices')
+
+    def __init__(self, fields):
+        self.codec = ''.join([field.format() for field in fields])
+        self.names = tuple([field.name for field in fields])
+        record_struct(self.codec)
+        if all([field.count is None for field in fields]):
+            self.slices = None
+        else:
+            self.slices = []
+            pos = 0
+            for field in fields:
+                if field.count is None:
+                    self.slices.append((field.name, pos, None))
+                    pos += 1
+                else:
+                    self.slices.append((field.name, pos, pos + field.count))
+                    pos += field.count
+
+    def read(self, obj, df):
+        values = df.read_record(self.codec)
+        if self.slices is None:
+            for (name, value) in zip(self.names, values):
+                setattr(obj, name, value)
+        else:
+            for (name, start, end) in self.slices:
+                if end is None:
+                    setattr(obj, name, values[start])
+                else:
+                    setattr(obj, name, list(values[start:end]))
+
+    def write(self, obj, df):
+        if self.slices is None:
+            values = [getattr(obj, name) for name in self.names]
+        else:
+            values = []
+            for (name, start, end) in self.slices:
+                if end is None:
+                    values.append(getattr(obj, name))
+                else:
+                    values.extend(getattr(obj, name))
+        df.write_record(self.codec, values)
+
+
+class Schema(object):
+    """
+    An ordered collection of Fields describing one on-disk record.  The
+    read/write plans for savegame and global files are compiled up front.
+    """
+
+    def __init__(self, *fields):
+        self.fields = fields
+        self.names = tuple([field.name for field in fields])
+        self.lists = frozenset([field.name for field in fields
+                                if field.count is not None])
+        self.plans = {
+            False: self._compile(False),
+            True: self._compile(True),
+        }
+
+    def _compile(self, savegame) -> List:
+        """
+        Compiles the list of steps needed to process a record in the given
+        file type, fusing consecutive fixed-width fields into a single run.
+        """
+        steps = []
+        run = []
+        for field in self.fields:
+            if not field.applies(savegame):
+                continue
+            if field.codec == STR:
+                if run:
+                    steps.append(_Run(run))
+                    run = []
+                steps.append(_String(field.name))
+            else:
+                run.append(field)
+        if run:
+            steps.append(_Run(run))
+        return steps
+
+    def layout(self, savegame) -> Tuple:
+        """
+        Returns a tuple of the record codec and attribute names for a
+        schema made up entirely of scalar fixed-width fields.
+        """
+        steps = self.plans[bool(savegame)]
+        if len(steps) != 1 or not isinstance(steps[0], _Run) or steps[0].slices is not None:
+            raise ValueError('Schema is not a single fixed-width record')
+        return (steps[0].codec, steps[0].names)
+
+    def read(self, obj, df, savegame=False) -> None:
+        """ Reads the record from the given Savefile into obj """
+        for step in self.plans[bool(savegame)]:
+            step.read(obj, df)
+
+    def write(self, obj, df, savegame=False) -> None:
+        """ Writes the record from obj out to the given Savefile """
+        for step in self.plans[bool(savegame)]:
+            step.write(obj, df)
+
+    def copy(self, src, dst) -> None:
+        """
+        Copies all of our fields (regardless of file type) from src to dst.
+        List fields are copied, rather than shared.
+        """
+        for name in self.names:
+            if name in self.lists:
+                setattr(dst, name, list(getattr(src, name)))
+            else:
+                setattr(dst, name, getattr(src, name))
+
+    def equals(self, first, second) -> bool:
+        """ Returns whether all of our fields are equal on both objects """
+        for name in self.names:
+            if getattr(first, name) != getattr(second, name):
+                return False
+        return True
@@ -1110,19 +1110,19 @@ class SmartDraw(object):
         """
         affected = []
         text = None
-        obj = collection.get(tile.__dict__[collection.var])
+        obj = collection.get(getattr(tile, collection.var))
         if obj is not None:
             text = obj.name
-            (fwd, rev) = obj.get_steps(tile.__dict__[collection.var])
+            (fwd, rev) = obj.get_steps(getattr(tile, collection.var))
             for series in (fwd, rev):
                 (curx, cury) = (tile.x, tile.y)
                 for (dir, id) in series:
                     newtile = self.mapobj.tile_relative(curx, cury, dir)
                     if newtile:
-                        if (newtile.__dict__[collection.var] != id):
+                        if (getattr(newtile, collection.var) != id):
                             undo.add_additional(newtile)
                             affected.append(newtile)
-                            newtile.__dict__[collection.var] = id
+                            setattr(newtile, collection.var, id)
                             (curx, cury) = (newtile.x, newtile.y)
                             if obj.wallflag is not None:
                                 newtile.wall = obj.wallflag
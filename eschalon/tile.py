@@ -20,29 +20,140 @@
 import logging
 
 from eschalon.constants import constants as c
+from eschalon.schema import Field, Schema
 
 LOG = logging.getLogger(__name__)
 
 
+class TileColumn(object):
+    """
+    Descriptor for a tile attribute which is stored in a column, rather than
+    on the tile object itself.  Tiles which belong to a map are just views
+    onto the columns of the map's TileGrid; standalone tiles get a private
+    set of single-value columns.
+    """
+
+    def __init__(self, convert=None):
+        self.convert = convert
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, tile, owner):
+        if tile is None:
+            return self
+        value = tile._columns[self.name][tile._idx]
+        if self.convert is None:
+            return value
+        else:
+            return self.convert(value)
+
+    def __set__(self, tile, value):
+        tile._columns[self.name][tile._idx] = value
+
+
 class Tile(object):
-    """ A class to hold data about a particular tile on a map. """
+    """
+    A class to hold data about a particular tile on a map.  The tile's
+    values are kept in columns (see TileColumn), and its tilecontents and
+    entity in sparse tables keyed by the tile's index, so that a map can
+    store all of its tiles in a TileGrid and just hand out views.
+    """
+
+    __slots__ = ('x', 'y', '_columns', '_idx', '_contents', '_entities')
+
+    # Typecodes (as used by the array module) of our column-backed values
+    column_types = {
+        'wall': 'B',
+        'floorimg': 'B',
+        'decalimg': 'B',
+        'wallimg': 'H',
+        'walldecalimg': 'B',
+        'tilecontentid': 'B',
+        'savegame': 'B',
+    }
+
+    wall = TileColumn()
+    floorimg = TileColumn()
+    decalimg = TileColumn()
+    wallimg = TileColumn()
+    walldecalimg = TileColumn()
+    tilecontentid = TileColumn()
+    savegame = TileColumn(bool)
+
+    # Our on-disk layout (see eschalon.schema), which also drives
+    # replication and equality
+    schema = None  # type: Schema
 
     def __init__(self, x, y):
-        """ A fresh object with no data. """
+        """ A fresh standalone object with no data. """
 
         self.x = x
         self.y = y
 
-        self.wall = 0
-        self.floorimg = 0
-        self.decalimg = 0
-        self.wallimg = 0
-        self.walldecalimg = 0
-        self.tilecontentid = 0
+        self._columns = dict((name, [0]) for name in self.column_types)
+        self._idx = 0
+        self._contents = {}
+        self._entities = {}
 
-        self.tilecontents = []
-        self.entity = None
-        self.savegame = False
+    @classmethod
+    def view(cls, grid, x, y):
+        """
+        Returns a tile which is a view onto the given TileGrid, at the
+        given coordinates.
+        """
+        tile = cls.__new__(cls)
+        tile.x = x
+        tile.y = y
+        tile._columns = grid.columns
+        tile._idx = grid.index(x, y)
+        tile._contents = grid.tilecontents
+        tile._entities = grid.entities
+        return tile
+
+    @property
+    def tilecontents(self):
+        """
+        Our tilecontents.  Tiles without any share an empty tuple, so use
+        addtilecontent() and deltilecontent() to make changes.
+        """
+        return self._contents.get(self._idx, ())
+
+    @tilecontents.setter
+    def tilecontents(self, tilecontents):
+        if len(tilecontents) > 0:
+            self._contents[self._idx] = list(tilecontents)
+        else:
+            self._contents.pop(self._idx, None)
+
+    @property
+    def entity(self):
+        """ Our entity, if we have one. """
+        return self._entities.get(self._idx)
+
+    @entity.setter
+    def entity(self, entity):
+        if entity is None:
+            self._entities.pop(self._idx, None)
+        else:
+            self._entities[self._idx] = entity
+
+    @classmethod
+    def layout(cls, savegame):
+        """
+        Returns a tuple of the record codec and attribute names for our
+        tiles, for either a savegame or a global map.
+        """
+        return cls.schema.layout(savegame)
+
+    def read(self, df):
+        """ Given a file descriptor, read in the tile. """
+        self.schema.read(self, df, self.savegame)
+
+    def write(self, df):
+        """ Write the tile to the file. """
+        self.schema.write(self, df, self.savegame)
 
     def _convert_savegame(self, savegame):
         """
@@ -56,59 +167,31 @@ class Tile(object):
     def replicate(self):
         newtile = Tile.new(self.book, self.x, self.y)
         newtile.savegame = self.savegame
-
-        # Simple Values
-        newtile.wall = self.wall
-        newtile.floorimg = self.floorimg
-        newtile.decalimg = self.decalimg
-        newtile.wallimg = self.wallimg
-        newtile.walldecalimg = self.walldecalimg
-        newtile.tilecontentid = self.tilecontentid
+        self.schema.copy(self, newtile)
 
         # Arrays
         for tilecontent in self.tilecontents:
-            newtile.tilecontents.append(tilecontent.replicate())
+            newtile.addtilecontent(tilecontent.replicate())
 
         # Objects
         if (self.entity is not None):
             newtile.entity = self.entity.replicate()
 
-        # Call out to superclass replication
-        self._sub_replicate(newtile)
-
         # ... aaand return our new object
         return newtile
 
-    def _sub_replicate(self, newentity):
-        """
-        Stub for superclasses to override, to replicate specific vars
-        """
-        pass
-
     def equals(self, tile):
         """
         Compare ourselves to another tile object.  We're just
         checking if our values are the same, NOT if we're *actually*
         the same object.  Returns true for equality, false for inequality.
         """
-        return (self._sub_equals(tile) and
-                self.x == tile.x and
+        return (self.x == tile.x and
                 self.y == tile.y and
-                self.wall == tile.wall and
-                self.floorimg == tile.floorimg and
-                self.decalimg == tile.decalimg and
-                self.wallimg == tile.wallimg and
-                self.walldecalimg == tile.walldecalimg and
-                self.tilecontentid == tile.tilecontentid and
+                self.schema.equals(self, tile) and
                 self.entity_equals(tile.entity) and
                 self.tilecontents_equal(tile.tilecontents))
 
-    def _sub_equals(self, entity):
-        """
-        Stub for superclasses to override, to test specific vars
-        """
-        pass
-
     def entity_equals(self, entity):
         """
         Compare the contents of our entity to the contents of the
@@ -150,13 +233,16 @@ class Tile(object):
         Add a tilecontent to our tilecontent list.  Just an internal construct which isn't actually
         stored on disk.
         """
-        self.tilecontents.append(tilecontent)
+        self._contents.setdefault(self._idx, []).append(tilecontent)
 
     def deltilecontent(self, tilecontent):
         """
         Remove a tilecontent.
         """
-        self.tilecontents.remove(tilecontent)
+        tilecontents = self._contents[self._idx]
+        tilecontents.remove(tilecontent)
+        if len(tilecontents) == 0:
+            del self._contents[self._idx]
 
     def addentity(self, entity):
         """
@@ -211,16 +297,23 @@ class Tile(object):
         return "\n".join(ret)
 
     @staticmethod
-    def new(book, x, y):
+    def get_class(book):
         """
-        Static method to initialize the correct object
+        Static method to return the correct class for the given book
         """
         if book == 1:
-            return B1Tile(x, y)
+            return B1Tile
         elif book == 2:
-            return B2Tile(x, y)
+            return B2Tile
         elif book == 3:
-            return B3Tile(x, y)
+            return B3Tile
+
+    @staticmethod
+    def new(book, x, y):
+        """
+        Static method to initialize the correct object
+        """
+        return Tile.get_class(book)(x, y)
 
 
 class B1Tile(Tile):
@@ -228,48 +321,23 @@ class B1Tile(Tile):
     Tile structure for Book 1
     """
 
-    book = 1
-
-    def __init__(self, x, y):
-        super(B1Tile, self).__init__(x, y)
-
-        # Book 1 specific vars
-        self.unknown5 = 0
-        # This var is *probably* actually part of the wall ID, like in book 2
-
-    def read(self, df):
-        """ Given a file descriptor, read in the tile. """
-
-        self.wall = df.readuchar()
-        self.floorimg = df.readuchar()
-        self.decalimg = df.readuchar()
-        self.wallimg = df.readuchar()
-        self.unknown5 = df.readuchar()
-        self.walldecalimg = df.readuchar()
-        self.tilecontentid = df.readuchar()
-
-    def write(self, df):
-        """ Write the tile to the file. """
-
-        df.writeuchar(self.wall)
-        df.writeuchar(self.floorimg)
-        df.writeuchar(self.decalimg)
-        df.writeuchar(self.wallimg)
-        df.writeuchar(self.unknown5)
-        df.writeuchar(self.walldecalimg)
-        df.writeuchar(self.tilecontentid)
+    __slots__ = ()
 
-    def _sub_replicate(self, newtile):
-        """
-        Replication for B1 elements
-        """
-        newtile.unknown5 = self.unknown5
-
-    def _sub_equals(self, tile):
-        """
-        Equality function for B1
-        """
-        return (tile.unknown5 == self.unknown5)
+    book = 1
+    schema = Schema(
+        Field('wall', 'B'),
+        Field('floorimg', 'B'),
+        Field('decalimg', 'B'),
+        Field('wallimg', 'B'),
+        Field('unknown5', 'B'),
+        Field('walldecalimg', 'B'),
+        Field('tilecontentid', 'B'),
+    )
+
+    # Book 1 specific vars
+    column_types = dict(Tile.column_types, unknown5='B')
+    # This var is *probably* actually part of the wall ID, like in book 2
+    unknown5 = TileColumn()
 
     def _sub_hasdata(self):
         """
@@ -283,49 +351,22 @@ class B2Tile(Tile):
     Tile structure for Book 2
     """
 
-    book = 2
-
-    def __init__(self, x, y):
-        super(B2Tile, self).__init__(x, y)
-
-        # Book 2 specific vars
-        self.tile_flag = 0
-
-    def read(self, df):
-        """ Given a file descriptor, read in the tile. """
-
-        self.wall = df.readuchar()
-        self.floorimg = df.readuchar()
-        self.decalimg = df.readuchar()
-        self.wallimg = df.readshort()
-        self.walldecalimg = df.readuchar()
-        self.tilecontentid = df.readuchar()
-        if self.savegame:
-            self.tile_flag = df.readint()
-
-    def write(self, df):
-        """ Write the tile to the file. """
+    __slots__ = ()
 
-        df.writeuchar(self.wall)
-        df.writeuchar(self.floorimg)
-        df.writeuchar(self.decalimg)
-        df.writeshort(self.wallimg)
-        df.writeuchar(self.walldecalimg)
-        df.writeuchar(self.tilecontentid)
-        if self.savegame:
-            df.writeint(self.tile_flag)
-
-    def _sub_replicate(self, newtile):
-        """
-        Replication for B2 elements
-        """
-        newtile.tile_flag = self.tile_flag
-
-    def _sub_equals(self, tile):
-        """
-        Equality function for B2
-        """
-        return (tile.tile_flag == self.tile_flag)
+    book = 2
+    schema = Schema(
+        Field('wall', 'B'),
+        Field('floorimg', 'B'),
+        Field('decalimg', 'B'),
+        Field('wallimg', 'H'),
+        Field('walldecalimg', 'B'),
+        Field('tilecontentid', 'B'),
+        Field('tile_flag', 'I', savegame=True),
+    )
+
+    # Book 2 specific vars
+    column_types = dict(Tile.column_types, tile_flag='I')
+    tile_flag = TileColumn()
 
     def _sub_hasdata(self):
         """
@@ -346,52 +387,23 @@ class B3Tile(B2Tile):
     Tile structure for Book 3
     """
 
-    book = 3
-
-    def __init__(self, x, y):
-        super(B3Tile, self).__init__(x, y)
-
-        # Book 3 specific vars
-        self.cartography = 0
-
-    def read(self, df):
-        """ Given a file descriptor, read in the tile. """
-
-        self.wall = df.readuchar()
-        self.floorimg = df.readuchar()
-        self.decalimg = df.readuchar()
-        self.wallimg = df.readshort()
-        self.walldecalimg = df.readuchar()
-        self.tilecontentid = df.readuchar()
-        if self.savegame:
-            self.tile_flag = df.readint()
-            self.cartography = df.readint()
-
-    def write(self, df):
-        """ Write the tile to the file. """
-
-        df.writeuchar(self.wall)
-        df.writeuchar(self.floorimg)
-        df.writeuchar(self.decalimg)
-        df.writeshort(self.wallimg)
-        df.writeuchar(self.walldecalimg)
-        df.writeuchar(self.tilecontentid)
-        if self.savegame:
-            df.writeint(self.tile_flag)
-            df.writeint(self.cartography)
+    __slots__ = ()
 
-    def _sub_replicate(self, newtile):
-        """
-        Replication for B3 elements
-        """
-        super(B3Tile, self)._sub_replicate(newtile)
-        newtile.cartography = self.cartography
-
-    def _sub_equals(self, tile):
-        """
-        Equality function for B3
-        """
-        return (tile.cartography == self.cartography and super(B3Tile, self)._sub_equals(tile))
+    book = 3
+    schema = Schema(
+        Field('wall', 'B'),
+        Field('floorimg', 'B'),
+        Field('decalimg', 'B'),
+        Field('wallimg', 'H'),
+        Field('walldecalimg', 'B'),
+        Field('tilecontentid', 'B'),
+        Field('tile_flag', 'I', savegame=True),
+        Field('cartography', 'I', savegame=True),
+    )
+
+    # Book 3 specific vars
+    column_types = dict(B2Tile.column_types, cartography='I')
+    cartography = TileColumn()
 
     def _sub_hasdata(self):
         """
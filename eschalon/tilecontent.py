@@ -22,6 +22,7 @@ import logging
 from eschalon.constants import constants as c
 from eschalon.item import Item
 from eschalon.savefile import FirstItemLoadException
+from eschalon.schema import STR, Field, Schema
 
 LOG = logging.getLogger(__name__)
 
@@ -37,6 +38,13 @@ class Tilecontent(object):
     exits, etc).
     """
 
+    __slots__ = ('savegame', 'x', 'y', 'description', 'extratext', 'lock',
+                 'trap', 'state', 'script', 'items')
+
+    # On-disk layout of everything between our coordinates and our items
+    # (see eschalon.schema), which also drives replication and equality
+    schema = None  # type: Schema
+
     def __init__(self, savegame=True):
         """ A fresh object with no data. """
 
@@ -78,36 +86,57 @@ class Tilecontent(object):
         """
         pass
 
+    def read(self, df):
+        """ Given a file descriptor, read in the tilecontent. """
+
+        # We throw an exception because there seems to be an arbitrary
+        # number of tilecontents at the end of the map file, and no
+        # 'tilecontent count' anywhere.  So we have to just keep loading
+        # tilecontents until EOF,
+        if (df.eof()):
+            raise FirstItemLoadException('Reached EOF')
+
+        # I'd just like to say "wtf" at this coordinate-storing system
+        intcoords = df.readint()
+        self.x = (intcoords % 100)
+        self.y = int(intcoords / 100)
+
+        # ... everything else
+        self.schema.read(self, df)
+
+        # Items
+        for num in range(8):
+            self.items.append(Item.new(self.book))
+            if (self.savegame):
+                self.items[num].read(df)
+            else:
+                self.items[num].item_name = df.readstr().decode('UTF-8')
+
+    def write(self, df):
+        """ Write the tilecontent to the file. """
+
+        df.writeint((self.y * 100) + self.x)
+        self.schema.write(self, df)
+
+        for num in range(8):
+            if (self.savegame):
+                self.items[num].write(df)
+            else:
+                df.writestr(self.items[num].item_name)
+
     def replicate(self):
         newtilecontent = Tilecontent.new(self.book, self.savegame)
-
-        # Simple Values
-        newtilecontent.savegame = self.savegame
         newtilecontent.x = self.x
         newtilecontent.y = self.y
-        newtilecontent.description = self.description
-        newtilecontent.extratext = self.extratext
-        newtilecontent.lock = self.lock
-        newtilecontent.trap = self.trap
-        newtilecontent.state = self.state
-        newtilecontent.script = self.script
+        self.schema.copy(self, newtilecontent)
 
         # Items
         for item in self.items:
             newtilecontent.items.append(item.replicate())
 
-        # Call out to superclass replication
-        self._sub_replicate(newtilecontent)
-
         # ... aaand return our new object
         return newtilecontent
 
-    def _sub_replicate(self, newtilecontent):
-        """
-        Stub for superclasses to override, to replicate specific vars
-        """
-        pass
-
     def _convert_savegame(self, savegame):
         """
         Converts ourself to a savegame or global object.  This could be
@@ -123,24 +152,12 @@ class Tilecontent(object):
         checking if our values are the same, NOT if we're *actually*
         the same object.  Returns true for equality, false for inequality.
         """
-        return (self._sub_equal(tilecontent) and
-                self.x == tilecontent.x and
+        return (self.x == tilecontent.x and
                 self.y == tilecontent.y and
-                self.description == tilecontent.description and
-                self.extratext == tilecontent.extratext and
-                self.lock == tilecontent.lock and
-                self.trap == tilecontent.trap and
-                self.state == tilecontent.state and
-                self.script == tilecontent.script and
                 self.savegame == tilecontent.savegame and
+                self.schema.equals(self, tilecontent) and
                 self.items_equal(tilecontent.items))
 
-    def _sub_equal(self, tilecontent):
-        """
-        Stub for superclasses to implement
-        """
-        return True
-
     def items_equal(self, items):
         """
         Compare the contents of our items to the contents of the
@@ -171,7 +188,26 @@ class B1Tilecontent(Tilecontent):
     Object structure for Book 1
     """
 
+    __slots__ = ('zeroi1', 'zeroh1', 'sturdiness', 'flags', 'zeroi2', 'zeroi3',
+                 'other', 'unknownh3')
+
     book = 1
+    schema = Schema(
+        Field('description', STR),
+        Field('extratext', STR),
+        Field('zeroi1', 'I'),
+        Field('zeroh1', 'H'),
+        Field('sturdiness', 'B'),
+        Field('flags', 'B'),
+        Field('zeroi2', 'I'),
+        Field('zeroi3', 'I'),
+        Field('lock', 'B'),
+        Field('trap', 'B'),
+        Field('other', 'B'),
+        Field('state', 'B'),
+        Field('unknownh3', 'H'),
+        Field('script', STR),
+    )
 
     def __init__(self, savegame):
         super(B1Tilecontent, self).__init__(savegame)
@@ -199,96 +235,6 @@ class B1Tilecontent(Tilecontent):
         self.other = 0
         self.unknownh3 = 0
 
-    def _sub_replicate(self, newtilecontent):
-        """
-        Replication!
-        """
-        newtilecontent.zeroi1 = self.zeroi1
-        newtilecontent.zeroh1 = self.zeroh1
-        newtilecontent.sturdiness = self.sturdiness
-        newtilecontent.flags = self.flags
-        newtilecontent.zeroi2 = self.zeroi2
-        newtilecontent.zeroi3 = self.zeroi3
-        newtilecontent.other = self.other
-        newtilecontent.unknownh3 = self.unknownh3
-
-    def _sub_equal(self, tilecontent):
-        """
-        Whether our B1-specific vars are equal
-        """
-        return (self.zeroi1 == tilecontent.zeroi1 and
-                self.zeroh1 == tilecontent.zeroh1 and
-                self.sturdiness == tilecontent.sturdiness and
-                self.flags == tilecontent.flags and
-                self.zeroi2 == tilecontent.zeroi2 and
-                self.zeroi3 == tilecontent.zeroi3 and
-                self.other == tilecontent.other and
-                self.unknownh3 == tilecontent.unknownh3)
-
-    def read(self, df):
-        """ Given a file descriptor, read in the tilecontent. """
-
-        # We throw an exception because there seems to be an arbitrary
-        # number of tilecontents at the end of the map file, and no
-        # 'tilecontent count' anywhere.  So we have to just keep loading
-        # tilecontents until EOF,
-        if (df.eof()):
-            raise FirstItemLoadException('Reached EOF')
-
-        # I'd just like to say "wtf" at this coordinate-storing system
-        intcoords = df.readint()
-        self.x = (intcoords % 100)
-        self.y = int(intcoords / 100)
-
-        # ... everything else
-        self.description = df.readstr().decode('UTF-8')
-        self.extratext = df.readstr().decode('UTF-8')
-        self.zeroi1 = df.readint()
-        self.zeroh1 = df.readshort()
-        self.sturdiness = df.readuchar()
-        self.flags = df.readuchar()
-        self.zeroi2 = df.readint()
-        self.zeroi3 = df.readint()
-        self.lock = df.readuchar()
-        self.trap = df.readuchar()
-        self.other = df.readuchar()
-        self.state = df.readuchar()
-        self.unknownh3 = df.readshort()
-        self.script = df.readstr().decode('UTF-8')
-
-        # Items
-        for num in range(8):
-            self.items.append(Item.new(c.book))
-            if (self.savegame):
-                self.items[num].read(df)
-            else:
-                self.items[num].item_name = df.readstr().decode('UTF-8')
-
-    def write(self, df):
-        """ Write the tilecontent to the file. """
-
-        df.writeint((self.y * 100) + self.x)
-        df.writestr(self.description)
-        df.writestr(self.extratext)
-        df.writeint(self.zeroi1)
-        df.writeshort(self.zeroh1)
-        df.writeuchar(self.sturdiness)
-        df.writeuchar(self.flags)
-        df.writeint(self.zeroi2)
-        df.writeint(self.zeroi3)
-        df.writeuchar(self.lock)
-        df.writeuchar(self.trap)
-        df.writeuchar(self.other)
-        df.writeuchar(self.state)
-        df.writeshort(self.unknownh3)
-        df.writestr(self.script)
-
-        for num in range(8):
-            if (self.savegame):
-                self.items[num].write(df)
-            else:
-                df.writestr(self.items[num].item_name)
-
     def display(self, unknowns=False):
         """ Show a textual description of all fields. """
 
@@ -338,7 +284,21 @@ class B2Tilecontent(Tilecontent):
     Object structure for Book 2
     """
 
+    __slots__ = ('cur_condition', 'max_condition', 'on_empty', 'slider_loot')
+
     book = 2
+    schema = Schema(
+        Field('description', STR),
+        Field('extratext', STR),
+        Field('cur_condition', 'I'),
+        Field('max_condition', 'I'),
+        Field('on_empty', 'B'),
+        Field('lock', 'B'),
+        Field('trap', 'B'),
+        Field('slider_loot', 'H'),
+        Field('state', 'B'),
+        Field('script', STR),
+    )
 
     def __init__(self, savegame):
         super(B2Tilecontent, self).__init__(savegame)
@@ -357,80 +317,6 @@ class B2Tilecontent(Tilecontent):
         self.on_empty = 0
         self.slider_loot = 0
 
-    def _sub_replicate(self, newtilecontent):
-        """
-        Replication!
-        """
-        newtilecontent.cur_condition = self.cur_condition
-        newtilecontent.max_condition = self.max_condition
-        newtilecontent.on_empty = self.on_empty
-        newtilecontent.slider_loot = self.slider_loot
-
-    def _sub_equal(self, tilecontent):
-        """
-        Whether our B2-specific vars are equal
-        """
-        return (self.cur_condition == tilecontent.cur_condition and
-                self.max_condition == tilecontent.max_condition and
-                self.on_empty == tilecontent.on_empty and
-                self.slider_loot == tilecontent.slider_loot)
-
-    def read(self, df):
-        """ Given a file descriptor, read in the tilecontent. """
-
-        # We throw an exception because there seems to be an arbitrary
-        # number of tilecontents at the end of the map file, and no
-        # 'tilecontent count' anywhere.  So we have to just keep loading
-        # tilecontents until EOF,
-        if (df.eof()):
-            raise FirstItemLoadException('Reached EOF')
-
-        # I'd just like to say "wtf" at this coordinate-storing system
-        intcoords = df.readint()
-        self.x = (intcoords % 100)
-        self.y = int(intcoords / 100)
-
-        # ... everything else
-        self.description = df.readstr().decode('UTF-8')
-        self.extratext = df.readstr().decode('UTF-8')
-        self.cur_condition = df.readint()
-        self.max_condition = df.readint()
-        self.on_empty = df.readuchar()
-        self.lock = df.readuchar()
-        self.trap = df.readuchar()
-        self.slider_loot = df.readshort()
-        self.state = df.readuchar()
-        self.script = df.readstr().decode('UTF-8')
-
-        # Items
-        for num in range(8):
-            self.items.append(Item.new(self.book))
-            if (self.savegame):
-                self.items[num].read(df)
-            else:
-                self.items[num].item_name = df.readstr().decode('UTF-8')
-
-    def write(self, df):
-        """ Write the tilecontent to the file. """
-
-        df.writeint((self.y * 100) + self.x)
-        df.writestr(self.description)
-        df.writestr(self.extratext)
-        df.writeint(self.cur_condition)
-        df.writeint(self.max_condition)
-        df.writeuchar(self.on_empty)
-        df.writeuchar(self.lock)
-        df.writeuchar(self.trap)
-        df.writeshort(self.slider_loot)
-        df.writeuchar(self.state)
-        df.writestr(self.script)
-
-        for num in range(8):
-            if (self.savegame):
-                self.items[num].write(df)
-            else:
-                df.writestr(self.items[num].item_name)
-
     def display(self, unknowns=False):
         """ Show a textual description of all fields. """
 
@@ -471,5 +357,7 @@ class B3Tilecontent(B2Tilecontent):
     Object structure for Book 3
     """
 
+    __slots__ = ()
+
     # The file format is identical, so we don't need to override anything
     book = 3
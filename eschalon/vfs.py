@@ -0,0 +1,131 @@
+#!/usr/bin/python
+# vim: set expandtab tabstop=4 shiftwidth=4:
+#
+# Eschalon Savefile Editor
+# Copyright (C) 2008-2017 CJ Kucera, Elliot Kendall, Eitan Adler
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LOG = logging.getLogger(__name__)
+
+# Where a file in the VFS lives.  The locator for a SOURCE_DATAPAK entry
+# is its member name in the datapak; for a SOURCE_FILE entry, it's the
+# path to the file.
+SOURCE_DATAPAK = 'datapak'
+SOURCE_FILE = 'file'
+
+
+class GameVFS(object):
+    """
+    An index of every game data file available to an EschalonData, keyed
+    by logical path ("gfx/iso_base.png", "maps/level1.map" and so on),
+    so that finding a file is a single dict lookup no matter where it
+    actually lives.  Entries are (source, locator) tuples.
+
+    The base layer is either the datapak or the loose data directories
+    inside the game directory, whichever the EschalonData is using.  A
+    mod directory, if given, overrides it: files in the mod's own data
+    directories ("<modpath>/gfx/...", etc) replace the game's files of
+    the same name.  Mods have also traditionally kept entities.csv at
+    their top level, so that's treated as "data/entities.csv".
+
+    We remember the modification times of the datapak and of every
+    directory we scanned; stale() reports whether any of them have
+    changed (ie: files were added or removed) since we were built.
+    """
+
+    # Mod files which may live at the top of the mod directory
+    MOD_TOPLEVEL = {'entities.csv': 'data'}
+
+    def __init__(self, gamedir: str, dirs: Sequence[str], datapak=None,
+                 modpath: Optional[str] = None) -> None:
+        self.gamedir = gamedir
+        self.dirs = dirs
+        self.datapak = datapak
+        self.modpath = modpath
+        self.base = {}  # type: Dict[str, Tuple[str, str]]
+        self.mod = {}  # type: Dict[str, Tuple[str, str]]
+        self.entries = {}  # type: Dict[str, Tuple[str, str]]
+        self.stamps = {}  # type: Dict[str, Optional[int]]
+        self.build()
+
+    @staticmethod
+    def stamp(path: str) -> Optional[int]:
+        """ Returns the modification time of the given path, or None """
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def scan(self, basedir: str, layer: Dict[str, Tuple[str, str]]) -> None:
+        """ Adds the files in the data directories of "basedir" to "layer" """
+        for directory in self.dirs:
+            path = os.path.join(basedir, directory)
+            self.stamps[path] = self.stamp(path)
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            layer['%s/%s' % (directory, entry.name)] = (
+                                SOURCE_FILE, entry.path)
+            except OSError:
+                pass
+
+    def build(self) -> None:
+        """ (Re)builds our index """
+        self.stamps = {}
+
+        base = {}
+        if self.datapak is None:
+            self.scan(self.gamedir, base)
+        else:
+            self.stamps[self.datapak.filename] = self.stamp(self.datapak.filename)
+            for name in self.datapak.filelist():
+                if not name.endswith('/'):
+                    base[name] = (SOURCE_DATAPAK, name)
+
+        mod = {}
+        if self.modpath is not None:
+            self.stamps[self.modpath] = self.stamp(self.modpath)
+            for (filename, directory) in self.MOD_TOPLEVEL.items():
+                path = os.path.join(self.modpath, filename)
+                if os.path.isfile(path):
+                    mod['%s/%s' % (directory, filename)] = (SOURCE_FILE, path)
+            self.scan(self.modpath, mod)
+
+        self.base = base
+        self.mod = mod
+        self.entries = dict(base)
+        self.entries.update(mod)
+
+    def stale(self) -> bool:
+        """ Returns whether anything we indexed has changed since """
+        for (path, stamp) in self.stamps.items():
+            if self.stamp(path) != stamp:
+                return True
+        return False
+
+    def lookup(self, path: str) -> Optional[Tuple[str, str]]:
+        """ Returns the (source, locator) entry for the given logical path """
+        return self.entries.get(path)
+
+    def namelist(self) -> List[str]:
+        """ Returns all of our logical paths """
+        return list(self.entries.keys())
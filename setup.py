@@ -31,7 +31,10 @@ setup(
         'eschalon/main.py',
     ],
     entry_points={
-        'console_scripts': ['eschalon=main:main'],
+        'console_scripts': [
+            'eschalon=main:main',
+            'eschalon-extract=eschalon.extract:main',
+        ],
     },
     test_suite='nose.collector',
     tests_require=[
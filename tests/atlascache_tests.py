@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from eschalon.atlascache import AtlasCache
+
+
+class AtlasCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.cachedir = os.path.join(self.tempdir, 'atlases')
+        self.cache = AtlasCache(self.cachedir, 2)
+        self.key = self.cache.get_key(AtlasCache.hash_data(b'png'), 64, 32, 8, 24)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_roundtrip(self):
+        self.assertIsNone(self.cache.load(self.key))
+        data = bytes(range(256)) * 3
+        self.cache.store(self.key, 40, 4, 192, data)
+        (width, height, stride, buf) = self.cache.load(self.key)
+        self.assertEqual((width, height, stride), (40, 4, 192))
+        self.assertEqual(bytes(buf), data)
+        # Loaded buffers are private, writable copies
+        buf[0] = 0xFF
+        self.assertEqual(bytes(self.cache.load(self.key)[3]), data)
+
+    def test_keys_differ(self):
+        keys = set([
+            self.key,
+            self.cache.get_key(AtlasCache.hash_data(b'other png'), 64, 32, 8, 24),
+            self.cache.get_key(AtlasCache.hash_data(b'png'), 64, 32, 8, 32),
+            self.cache.get_key(AtlasCache.hash_data(b'png'), 64, 32, 8, 24, 'overlay'),
+            AtlasCache(self.cachedir, 3).get_key(AtlasCache.hash_data(b'png'), 64, 32, 8, 24),
+        ])
+        self.assertEqual(len(keys), 5)
+
+    def test_pruned_to_size(self):
+        cache = AtlasCache(self.cachedir, 2, max_bytes=3 * (AtlasCache.HEADER.size + 64))
+        keys = [cache.get_key(AtlasCache.hash_data(b'png'), 64, 32, 8, size)
+                for size in range(4)]
+        for (mtime, key) in enumerate(keys[:3]):
+            cache.store(key, 4, 4, 16, bytes(64))
+            os.utime(cache.get_path(key), ns=(mtime, mtime))
+
+        # Loading the oldest makes it the most recently used
+        self.assertIsNotNone(cache.load(keys[0]))
+        cache.store(keys[3], 4, 4, 16, bytes(64))
+        self.assertEqual(sorted(os.listdir(self.cachedir)),
+                         sorted(os.path.basename(cache.get_path(key))
+                                for key in (keys[0], keys[2], keys[3])))
+
+    def test_rejects_truncated(self):
+        self.cache.store(self.key, 4, 4, 16, bytes(64))
+        with open(self.cache.get_path(self.key), 'r+b') as df:
+            df.truncate(AtlasCache.HEADER.size + 60)
+        self.assertIsNone(self.cache.load(self.key))
+
+    def test_rejects_garbage(self):
+        os.makedirs(self.cachedir)
+        with open(self.cache.get_path(self.key), 'wb') as df:
+            df.write(b'not an atlas at all, just some junk')
+        self.assertIsNone(self.cache.load(self.key))
+
+
+if __name__ == '__main__':
+    unittest.main()
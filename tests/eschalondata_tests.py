@@ -0,0 +1,378 @@
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import unittest
+import zipfile
+import zlib
+from unittest import mock
+
+import eschalon.eschalondata
+from eschalon import lru
+from eschalon.constants import constants as c
+from eschalon.eschalondata import (Datapak, DatapakCache, EschalonData, GoldRanges,
+                                  MaterialIndex, ZipCrypto)
+from eschalon.savefile import LoadException
+
+ENTITIES_HEADER = 'ID,Name,file,Xoff,Yoff,Dirs,Script,HP,Align,Move,Frame\n'
+ITEMS_CSV = ('DESCRIPTION,Item Category,Material\n'
+             'Dagger,IC_WEAPON,2\n'
+             'Staff,IC_WEAPON,1\n'
+             'Small Gold (1-74),IC_GOLD,0\n'
+             'Large Gold (75-250),IC_GOLD,0\n')
+
+
+def write_encrypted_zip(filename, members, password):
+    """ Writes out a deflated, ZipCrypto-encrypted zip file """
+    central = []
+    with open(filename, 'wb') as df:
+        for (name, data) in sorted(members.items()):
+            name = name.encode('UTF-8')
+            crc = zlib.crc32(data)
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+            raw = compressor.compress(data) + compressor.flush()
+            raw = ZipCrypto(password).encrypt(b'\x00' * 11 + bytes([crc >> 24]) + raw)
+            offset = df.tell()
+            df.write(struct.pack('<4s5H3I2H', b'PK\x03\x04', 20, 1, 8, 0, 0x21, crc,
+                                 len(raw), len(data), len(name), 0) + name + raw)
+            central.append(struct.pack('<4s6H3I5H2I', b'PK\x01\x02', 20, 20, 1, 8, 0,
+                                       0x21, crc, len(raw), len(data), len(name),
+                                       0, 0, 0, 0, 0, offset) + name)
+        start = df.tell()
+        df.write(b''.join(central))
+        df.write(struct.pack('<4s4H2IH', b'PK\x05\x06', 0, 0, len(central),
+                             len(central), df.tell() - start, start, 0))
+
+
+class DatapakTests(unittest.TestCase):
+
+    members = {
+        'gfx/tiles.png': bytes(range(256)) * 1000,
+        'maps/town.map': b'town',
+        'data/empty.csv': b'',
+    }
+
+    def setUp(self):
+        c.switch_to_book(3)
+        (fd, self.filename) = tempfile.mkstemp()
+        os.close(fd)
+        write_encrypted_zip(self.filename, self.members, Datapak.get_password())
+
+    def tearDown(self):
+        os.remove(self.filename)
+        eschalon.eschalondata.fast_zipfile = True
+
+    def read_all(self, datapak):
+        return dict((name, datapak.readfile(*reversed(name.split('/', 1))))
+                    for name in self.members)
+
+    def test_zipcrypto_roundtrip(self):
+        data = os.urandom(1000)
+        encrypted = ZipCrypto(b'password').encrypt(data)
+        self.assertNotEqual(encrypted, data)
+        decrypter = ZipCrypto(b'password')
+        self.assertEqual(decrypter.decrypt(encrypted[:300]) +
+                         decrypter.decrypt(encrypted[300:]), data)
+
+    def test_matches_zipfile(self):
+        datapak = Datapak(self.filename)
+        datapak.CHUNK_SIZE = 1000
+        self.assertEqual(self.read_all(datapak), self.members)
+        eschalon.eschalondata.fast_zipfile = False
+        self.assertEqual(self.read_all(datapak), self.members)
+
+    def test_member_cache(self):
+        datapak = Datapak(self.filename)
+        first = datapak.readfile('tiles.png')
+        with mock.patch.object(Datapak, 'read_member') as read_member:
+            self.assertIs(datapak.readfile('tiles.png'), first)
+            read_member.assert_not_called()
+
+    def test_open_member(self):
+        datapak = Datapak(self.filename)
+        with mock.patch.object(Datapak, 'read_member') as read_member:
+            with datapak.open_member('tiles.png') as handle:
+                self.assertEqual(handle.read(300), self.members['gfx/tiles.png'][:300])
+                self.assertEqual(handle.read(), self.members['gfx/tiles.png'][300:])
+            with datapak.open_member('empty.csv', 'data') as handle:
+                self.assertEqual(handle.read(), b'')
+            read_member.assert_not_called()
+
+    def test_open_member_prefix(self):
+        datapak = Datapak(self.filename)
+        datapak.get_info('gfx/tiles.png').CRC ^= 0x1
+        with datapak.open_member('tiles.png') as handle:
+            self.assertEqual(handle.read(10), self.members['gfx/tiles.png'][:10])
+            with self.assertRaises(LoadException):
+                handle.read()
+
+    def test_threaded_reads(self):
+        datapak = Datapak(self.filename)
+        results = []
+
+        def worker():
+            for i in range(3):
+                results.append(datapak.read_member('tiles.png'))
+                with datapak.open_member('town.map', 'maps') as handle:
+                    results.append(handle.read())
+
+        threads = [threading.Thread(target=worker) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 24)
+        self.assertEqual(set(results), set([self.members['gfx/tiles.png'], b'town']))
+
+    def test_missing_member(self):
+        with self.assertRaises(LoadException):
+            Datapak(self.filename).readfile('missing.png')
+
+    def test_bad_password(self):
+        datapak = Datapak(self.filename)
+        datapak.password = b'wrong'
+        with self.assertRaises(LoadException):
+            datapak.readfile('tiles.png')
+
+    def test_bad_crc(self):
+        datapak = Datapak(self.filename)
+        datapak.get_info('maps/town.map').CRC ^= 0x1
+        with self.assertRaises(LoadException):
+            datapak.readfile('town.map', 'maps')
+
+
+class DatapakCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        c.switch_to_book(3)
+        self.tempdir = tempfile.mkdtemp()
+        self.gamedir = os.path.join(self.tempdir, 'game')
+        self.cachedir = os.path.join(self.tempdir, 'cache')
+        os.mkdir(self.gamedir)
+        self.write_datapak({'gfx/tiles.png': b'tiles' * 100,
+                            'maps/town.map': b'town'})
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def write_datapak(self, members):
+        with zipfile.ZipFile(os.path.join(self.gamedir, 'datapak'), 'w',
+                             zipfile.ZIP_DEFLATED) as zf:
+            for (name, data) in members.items():
+                zf.writestr(name, data)
+
+    def test_cache_populates_and_serves(self):
+        data = EschalonData.new(3, self.gamedir, cachedir=self.cachedir)
+        self.assertEqual(data.readfile('tiles.png'), b'tiles' * 100)
+        self.assertTrue(os.path.isfile(data.cache.get_path('tiles.png', 'gfx')))
+        data.readfile('town.map', 'maps')
+
+        data = EschalonData.new(3, self.gamedir, cachedir=self.cachedir)
+        lru.member_cache.clear()
+        with mock.patch.object(Datapak, 'read_member') as read_member:
+            self.assertEqual(data.readfile('tiles.png'), b'tiles' * 100)
+            self.assertEqual(data.readfile('town.map', 'maps'), b'town')
+            read_member.assert_not_called()
+
+    def test_cache_invalidated(self):
+        data = EschalonData.new(3, self.gamedir, cachedir=self.cachedir)
+        data.readfile('town.map', 'maps')
+        self.write_datapak({'maps/town.map': b'a different town'})
+        data = EschalonData.new(3, self.gamedir, cachedir=self.cachedir)
+        self.assertEqual(data.readfile('town.map', 'maps'), b'a different town')
+
+    def test_refresh_closes_datapak(self):
+        data = EschalonData.new(3, self.gamedir)
+        datapak = data.datapak
+        self.write_datapak({'maps/town.map': b'a different town'})
+        os.utime(datapak.filename, ns=(0, 0))
+        self.assertTrue(data.refresh())
+        self.assertIsNot(data.datapak, datapak)
+        self.assertIsNone(datapak.zipobj.fp)
+        if datapak.reader.handle is not None:
+            self.assertTrue(datapak.reader.handle.closed)
+        self.assertEqual(data.readfile('town.map', 'maps'), b'a different town')
+
+    def test_cache_recompress(self):
+        datapak = Datapak(os.path.join(self.gamedir, 'datapak'))
+        cache = DatapakCache(self.cachedir, datapak, recompress=True)
+        self.assertEqual(cache.readfile('tiles.png'), b'tiles' * 100)
+        path = cache.get_path('tiles.png', 'gfx')
+        self.assertTrue(path.endswith('.z'))
+        self.assertLess(os.path.getsize(path), 500)
+        self.assertEqual(cache.readfile('tiles.png'), b'tiles' * 100)
+
+    def test_cache_rejects_escaping_names(self):
+        datapak = Datapak(os.path.join(self.gamedir, 'datapak'))
+        cache = DatapakCache(self.cachedir, datapak)
+        self.assertIsNone(cache.get_path('../../escape', 'gfx'))
+
+    def test_open_member(self):
+        data = EschalonData.new(3, self.gamedir, cachedir=self.cachedir)
+        with data.open_member('town.map', 'maps') as handle:
+            self.assertEqual(handle.read(), b'town')
+        data.readfile('tiles.png')
+        with mock.patch.object(Datapak, 'open_member') as open_member:
+            lru.member_cache.clear()
+            with data.open_member('tiles.png') as handle:
+                self.assertEqual(handle.read(5), b'tiles')
+            open_member.assert_not_called()
+
+    def test_no_cachedir(self):
+        data = EschalonData.new(3, self.gamedir)
+        self.assertIsNone(data.cache)
+        self.assertEqual(data.readfile('town.map', 'maps'), b'town')
+
+
+
+class TableCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        c.switch_to_book(3)
+        self.tempdir = tempfile.mkdtemp()
+        self.gamedir = os.path.join(self.tempdir, 'game')
+        self.cachedir = os.path.join(self.tempdir, 'cache')
+        for directory in EschalonData.DATA_DIRS:
+            os.makedirs(os.path.join(self.gamedir, directory))
+        self.write_items(ITEMS_CSV)
+        with open(os.path.join(self.gamedir, 'data', 'entities.csv'), 'w') as df:
+            df.write(ENTITIES_HEADER + '1,Rat,rat,0,0,8,*,5,0,1,17\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def write_items(self, text):
+        with open(os.path.join(self.gamedir, 'data', 'general_items.csv'), 'w') as df:
+            df.write(text)
+
+    def check_items(self, data):
+        self.assertIn('Dagger', data.get_itemdict())
+        self.assertEqual(data.get_global_name('%s Dagger' % (c.materials_metal[0])), 'Dagger')
+        self.assertEqual(data.get_global_name('%s Staff' % (c.materials_wood[0])), 'Staff')
+        self.assertEqual(data.get_global_name('100 Gold Pieces'), 'Large Gold (75-250)')
+
+    def test_tables_cached(self):
+        data = EschalonData.new(3, self.gamedir, cachedir=self.cachedir)
+        self.check_items(data)
+        self.assertEqual(data.get_entity(1).name, 'Rat')
+
+        data = EschalonData.new(3, self.gamedir, cachedir=self.cachedir)
+        with mock.patch.object(EschalonData, 'parse_items') as parse_items, \
+                mock.patch.object(EschalonData, 'parse_entities') as parse_entities:
+            self.check_items(data)
+            self.assertEqual(data.get_entity(1).name, 'Rat')
+            self.assertEqual(data.get_entity(1).frames, 17)
+            parse_items.assert_not_called()
+            parse_entities.assert_not_called()
+
+    def test_tables_lazy(self):
+        data = EschalonData.new(3, self.gamedir, cachedir=self.cachedir)
+        with mock.patch.object(EschalonData, 'parse_entities') as parse_entities:
+            data.get_itemlist()
+            parse_entities.assert_not_called()
+
+    def test_tables_invalidated(self):
+        data = EschalonData.new(3, self.gamedir, cachedir=self.cachedir)
+        data.get_itemdict()
+        self.write_items(ITEMS_CSV + 'Shiny Rock,IC_MISC,0\n')
+        data = EschalonData.new(3, self.gamedir, cachedir=self.cachedir)
+        self.assertIn('Shiny Rock', data.get_itemdict())
+
+    def test_failed_parse_not_cached(self):
+        self.write_items('nonsense\n1\n')
+        data = EschalonData.new(3, self.gamedir, cachedir=self.cachedir)
+        with self.assertLogs('eschalon.eschalondata', 'ERROR'):
+            self.assertEqual(data.get_itemdict(), {})
+        self.assertFalse(os.path.exists(data.tablecache.cachedir))
+
+    def test_tables_per_source(self):
+        data = EschalonData.new(3, self.gamedir, cachedir=self.cachedir)
+        data.get_itemdict()
+        self.write_items(ITEMS_CSV + 'Shiny Rock,IC_MISC,0\n')
+        EschalonData.new(3, self.gamedir, cachedir=self.cachedir).get_itemdict()
+
+        # Going back to the original data finds its table still cached
+        self.write_items(ITEMS_CSV)
+        data = EschalonData.new(3, self.gamedir, cachedir=self.cachedir)
+        with mock.patch.object(EschalonData, 'parse_items') as parse_items:
+            self.check_items(data)
+            parse_items.assert_not_called()
+
+
+class B1EschalonDataTests(unittest.TestCase):
+
+    def setUp(self):
+        c.switch_to_book(1)
+        self.gamedir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.gamedir)
+
+    def test_new(self):
+        data = EschalonData.new(1, self.gamedir)
+        self.assertEqual(data.gamedir, self.gamedir)
+        self.assertEqual(data.get_global_name('Dagger'), 'Dagger')
+        self.assertEqual(data.get_entity(0x01).name, 'Fanged Salamander')
+
+    def test_set_gamedir(self):
+        data = EschalonData.new(1, self.gamedir)
+        with self.assertRaises(LoadException):
+            data.set_gamedir(os.path.join(self.gamedir, 'missing'))
+
+
+class GlobalNameTests(unittest.TestCase):
+
+    def setUp(self):
+        c.switch_to_book(3)
+
+    def test_material_index_matches_scan(self):
+        material_items = {}
+        for base in ['Staff', 'Long Staff', 'Bow', 'Oak', 'Iron Bow']:
+            for material in c.materials_wood + c.materials_metal:
+                material_items['%s %s' % (material, base)] = base
+        index = MaterialIndex(material_items)
+        names = ['Burley Oak Long Staff', 'Pine Bow', 'Iron Iron Bow',
+                 'Fine Tempered Steel Staff', 'Oak Oak', 'Staff', 'Birch',
+                 'Petrified Bow of Walnut Staff', '']
+        for name in names:
+            expected = None
+            for (key, val) in material_items.items():
+                if key in name:
+                    expected = val
+                    break
+            self.assertEqual(index.lookup(name), expected, name)
+
+    def test_gold_ranges(self):
+        goldranges = GoldRanges()
+        for name in ['5 Gold Pieces', 'Small Gold (1-74)', 'Medium Gold (50-149)',
+                     'Large Gold (150-250)']:
+            goldranges.add_item(name)
+        self.assertEqual(goldranges.get_equivalent('5 Gold Pieces'), '5 Gold Pieces')
+        self.assertEqual(goldranges.get_equivalent('60 Gold Pieces'), 'Small Gold (1-74)')
+        self.assertEqual(goldranges.get_equivalent('75 Gold Pieces'), 'Medium Gold (50-149)')
+        self.assertEqual(goldranges.get_equivalent('250 Gold Pieces'), 'Large Gold (150-250)')
+        self.assertEqual(goldranges.get_equivalent('999 Gold Pieces'), 'Large Gold (150-250)')
+        self.assertIsNone(goldranges.find_range(0))
+
+    def test_get_global_names(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            for directory in EschalonData.DATA_DIRS:
+                os.mkdir(os.path.join(tempdir, directory))
+            with open(os.path.join(tempdir, 'data', 'general_items.csv'), 'w') as df:
+                df.write(ITEMS_CSV)
+            data = EschalonData.new(3, tempdir)
+            names = ['%s Dagger' % (c.materials_metal[1]), 'Scroll of Fire',
+                     '80 Gold Pieces', 'Widget']
+            expected = ['Dagger', 'Fire', 'Large Gold (75-250)', 'Widget']
+            self.assertEqual(data.get_global_names(names), expected)
+            with mock.patch.object(MaterialIndex, 'lookup') as lookup:
+                self.assertEqual(data.get_global_names(names), expected)
+                lookup.assert_not_called()
+        finally:
+            shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from eschalon import extract
+from eschalon.constants import constants as c
+from eschalon.eschalondata import Datapak
+from eschalondata_tests import write_encrypted_zip
+from pakarchive_tests import write_pak
+
+
+class ExtractTests(unittest.TestCase):
+
+    members = {
+        'gfx/tiles.png': bytes(range(256)) * 100,
+        'maps/town.map': b'town',
+        'maps/castle.map': b'castle' * 50,
+    }
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.output = os.path.join(self.tempdir, 'out')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def run_extract(self, *args):
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            status = extract.main(list(args))
+        return (status, stdout.getvalue(), stderr.getvalue())
+
+    def extracted(self):
+        found = {}
+        for (dirpath, dirnames, filenames) in os.walk(self.output):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path, 'rb') as df:
+                    found[os.path.relpath(path, self.output).replace(os.sep, '/')] = df.read()
+        return found
+
+    def test_datapak(self):
+        c.switch_to_book(2)
+        archive = os.path.join(self.tempdir, 'datapak')
+        write_encrypted_zip(archive, self.members, Datapak.get_password())
+        (status, stdout, stderr) = self.run_extract(archive, '-o', self.output)
+        self.assertEqual(status, 0)
+        self.assertEqual(self.extracted(), self.members)
+        self.assertEqual(c.book, 2)
+        self.assertIn('Extracted 3 of 3 members', stdout)
+
+    def test_datapak_closed(self):
+        c.switch_to_book(2)
+        archive = os.path.join(self.tempdir, 'datapak')
+        write_encrypted_zip(archive, self.members, Datapak.get_password())
+        with mock.patch.object(Datapak, 'close', autospec=True,
+                               side_effect=Datapak.close) as close:
+            datapak = extract.open_archive(archive)
+            # The Book 3 candidate was rejected, and closed
+            self.assertEqual(close.call_count, 1)
+            self.assertIsNot(close.call_args[0][0], datapak)
+            datapak.close()
+            (status, stdout, stderr) = self.run_extract(archive, '--verify')
+            self.assertEqual(status, 0)
+            self.assertEqual(close.call_count, 4)
+
+    def test_pak_patterns(self):
+        archive = os.path.join(self.tempdir, 'gfx.pak')
+        write_pak(archive, {'a.png': b'a' * 100, 'b.png': b'b', 'c.dat': b'c'})
+        (status, stdout, stderr) = self.run_extract(archive, '*.png', '-o', self.output, '-q')
+        self.assertEqual(status, 0)
+        self.assertEqual(self.extracted(), {'a.png': b'a' * 100, 'b.png': b'b'})
+
+    def test_pak_processes(self):
+        archive = os.path.join(self.tempdir, 'gfx.pak')
+        write_pak(archive, {'a.png': b'a' * 100, 'b.png': b'b'})
+        (status, stdout, stderr) = self.run_extract(archive, '-o', self.output, '-j', '2',
+                                                    '--processes')
+        self.assertEqual(status, 0)
+        self.assertEqual(self.extracted(), {'a.png': b'a' * 100, 'b.png': b'b'})
+
+    def test_verify(self):
+        c.switch_to_book(3)
+        archive = os.path.join(self.tempdir, 'datapak')
+        write_encrypted_zip(archive, self.members, Datapak.get_password())
+        (status, stdout, stderr) = self.run_extract(archive, '--verify', '--book', '3',
+                                                    '-o', self.output)
+        self.assertEqual(status, 0)
+        self.assertFalse(os.path.exists(self.output))
+        self.assertIn('Verified 3 of 3 members', stdout)
+
+        # Flip a bit in the last member's data
+        with open(archive, 'r+b') as df:
+            data = bytearray(df.read())
+            pos = data.index(b'PK\x01\x02') - 1
+            data[pos] ^= 0x1
+            df.seek(0)
+            df.write(data)
+        (status, stdout, stderr) = self.run_extract(archive, '--verify')
+        self.assertEqual(status, 1)
+        self.assertIn('maps/town.map', stderr)
+
+    def test_not_an_archive(self):
+        archive = os.path.join(self.tempdir, 'junk')
+        with open(archive, 'wb') as df:
+            df.write(b'junk')
+        (status, stdout, stderr) = self.run_extract(archive)
+        self.assertEqual(status, 2)
+
+    def test_output_path(self):
+        self.assertEqual(extract.output_path(self.output, 'gfx/a.png'),
+                         os.path.join(self.output, 'gfx', 'a.png'))
+        with self.assertRaises(extract.LoadException):
+            extract.output_path(self.output, '../escape')
+
+
+if __name__ == '__main__':
+    unittest.main()
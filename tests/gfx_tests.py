@@ -0,0 +1,116 @@
+import io
+import unittest
+from unittest import mock
+
+from eschalon import pixels
+
+try:
+    import cairo
+    from eschalon import gfx
+except (ImportError, ValueError):
+    gfx = None
+
+# Colours of the cells on our test sheet, which is three sprites across
+# and two down, each 8x4 pixels
+COLOURS = [(255, 0, 0), (0, 255, 0), (0, 0, 255),
+           (255, 255, 0), (0, 255, 255), (255, 0, 255)]
+
+
+def build_sheet():
+    """ Returns PNG data for our test sheet """
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 24, 8)
+    ctx = cairo.Context(surface)
+    for (idx, (r, g, b)) in enumerate(COLOURS):
+        ctx.set_source_rgb(r / 255, g / 255, b / 255)
+        ctx.rectangle((idx % 3) * 8, (idx // 3) * 4, 8, 4)
+        ctx.fill()
+    df = io.BytesIO()
+    surface.write_to_png(df)
+    return df.getvalue()
+
+
+def pixel_at(surface, x, y):
+    """ Returns the (r, g, b) of an opaque pixel in the given surface """
+    surface.flush()
+    (b, g, r, a) = pixels.ARGB32_OFFSETS
+    pos = y * surface.get_stride() + x * 4
+    data = bytes(surface.get_data())
+    return (data[pos + r], data[pos + g], data[pos + b])
+
+
+@unittest.skipIf(gfx is None, 'Cairo and GdkPixbuf are not available')
+class SpriteAtlasTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = gfx.GfxCache(build_sheet(), 8, 4, 3)
+
+    def test_grid(self):
+        self.assertEqual(gfx.SpriteAtlas.grid(24, 8, 8, 4, 3), (3, 2))
+        self.assertEqual(gfx.SpriteAtlas.grid(24, 8, 8, 4, 2), (2, 2))
+        # Partial cells at the edges aren't sprites
+        self.assertEqual(gfx.SpriteAtlas.grid(30, 11, 8, 4, 5), (3, 2))
+
+    def test_layout(self):
+        atlas = self.cache.get_atlas(16)
+        self.assertEqual((atlas.surface.get_width(), atlas.surface.get_height()), (48, 16))
+        self.assertEqual((atlas.cols, atlas.rows), (3, 2))
+        for (idx, colour) in enumerate(COLOURS):
+            x = (idx % 3) * 16 + 8
+            y = (idx // 3) * 8 + 4
+            self.assertEqual(pixel_at(atlas.surface, x, y), colour)
+
+    def test_atlas_bytes(self):
+        self.assertEqual(self.cache.atlas_bytes(16, 8),
+                         gfx.sprite_size(self.cache.get_atlas(16)))
+
+    def test_getimg_uses_atlas(self):
+        atlas = self.cache.get_atlas(16)
+        self.assertIs(self.cache.getimg(5, 16), atlas.get_sprite(4))
+        self.assertIsNone(self.cache.getimg(7, 16))
+
+    def test_fractional_size(self):
+        # 5 pixels across would make sprites 2.5 pixels high
+        self.assertIsNone(self.cache.get_atlas(5))
+        self.assertEqual(self.cache.getimg(1, 5).get_height(), 2)
+
+    def test_over_budget(self):
+        cache = gfx.GfxCache(build_sheet(), 8, 4, 3, sprites=gfx.new_sprite_cache(1000))
+        with mock.patch.object(gfx.SpriteAtlas, 'build') as build:
+            self.assertIsNone(cache.get_atlas(16))
+            sprite = cache.getimg(5, 16)
+            build.assert_not_called()
+        self.assertEqual((sprite.get_width(), sprite.get_height()), (16, 8))
+        self.assertEqual(pixel_at(sprite, 8, 4), COLOURS[4])
+
+
+@unittest.skipIf(gfx is None, 'Cairo and GdkPixbuf are not available')
+class LazyDecodeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = gfx.GfxCache(build_sheet(), 8, 4, 3)
+
+    def test_not_decoded_up_front(self):
+        self.assertEqual(self.cache.sheet_size(), (24, 8))
+        self.assertIsNone(self.cache._surface)
+        self.assertIsNone(self.cache._pixbuf)
+
+    def test_surface_only(self):
+        self.assertEqual(pixel_at(self.cache.getimg(2), 4, 2), COLOURS[1])
+        self.assertIsNotNone(self.cache._surface)
+        self.assertIsNone(self.cache._pixbuf)
+
+    def test_pixbuf_only(self):
+        self.assertEqual(self.cache.getimg_gdk(2).get_width(), 8)
+        self.assertIsNotNone(self.cache._pixbuf)
+        self.assertIsNone(self.cache._surface)
+
+    def test_decoded_once(self):
+        self.cache.getimg(1)
+        # Anything after this has to come from the decoded sheet
+        self.cache.pngdata = None
+        self.assertEqual(self.cache.getimg_gdk(4).get_width(), 8)
+        self.assertEqual(pixel_at(self.cache.getimg(6), 4, 2), COLOURS[5])
+
+
+if __name__ == '__main__':
+    unittest.main()
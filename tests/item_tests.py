@@ -15,6 +15,13 @@ class ItemTests(unittest.TestCase):
         i = eschalon.item.Item(zero=True)
         self.assertEquals(i.category, 0)
 
+    def test_item_slots(self):
+        for book in (1, 2, 3):
+            i = eschalon.item.Item.new(book)
+            self.assertFalse(hasattr(i, '__dict__'))
+            with self.assertRaises(AttributeError):
+                i.not_an_item_attribute = 1
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from eschalon.lru import LRUCache
+
+
+class LRUCacheTests(unittest.TestCase):
+
+    def test_hit_and_miss(self):
+        cache = LRUCache(100)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', b'x' * 10)
+        self.assertEqual(cache.get('a'), b'x' * 10)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['bytes']), (1, 1, 10))
+
+    def test_eviction_order(self):
+        cache = LRUCache(30)
+        cache.put('a', b'a' * 10)
+        cache.put('b', b'b' * 10)
+        cache.put('c', b'c' * 10)
+        cache.get('a')
+        cache.put('d', b'd' * 10)
+        self.assertNotIn('b', cache)
+        self.assertIn('a', cache)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.size, 30)
+
+    def test_replace_and_oversized(self):
+        cache = LRUCache(30)
+        cache.put('a', b'a' * 10)
+        cache.put('a', b'a' * 20)
+        self.assertEqual(cache.size, 20)
+        cache.put('b', b'b' * 31)
+        self.assertNotIn('b', cache)
+        self.assertEqual(len(cache), 1)
+
+    def test_set_budget(self):
+        cache = LRUCache(100)
+        for key in 'abcde':
+            cache.put(key, b'x' * 20)
+        cache.set_budget(40)
+        self.assertEqual(sorted(cache.entries.keys()), ['d', 'e'])
+        cache.clear()
+        self.assertEqual((len(cache), cache.size), (0, 0))
+
+    def test_sizeof(self):
+        cache = LRUCache(100, sizeof=lambda value: value[0] * value[1])
+        cache.put('a', (5, 10))
+        cache.put('b', (6, 10))
+        self.assertNotIn('a', cache)
+        cache.put('b', (2, 10))
+        self.assertEqual(cache.stats()['bytes'], 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import eschalon.map
+from eschalon.constants import constants as c
+from eschalon.eschalondata import Datapak, EschalonData
+from eschalon.map import Map
+from eschalon.mapindex import MapIndex
+from eschalon.savefile import LoadException
+
+
+def header(strings, nextbyte):
+    return b"".join([s + b"\r\n" for s in strings]) + bytes([nextbyte]) + b"\x00" * 16
+
+
+B1_HEADER = header([b"mapid", b"Book 1 Map"] + [b""] * 8, 5)
+B2_HEADER = header([b"Book 2 Map"] + [b""] * 8, 1)
+B3_HEADER = header([b"0.992", b"Book 3 Map"] + [b""] * 10, 2)
+
+
+class ProbeTests(unittest.TestCase):
+
+    def test_probe_books(self):
+        self.assertEqual(Map.probe_header(B1_HEADER), (1, 'Book 1 Map'))
+        self.assertEqual(Map.probe_header(B2_HEADER), (2, 'Book 2 Map'))
+        self.assertEqual(Map.probe_header(B3_HEADER), (3, 'Book 3 Map'))
+
+    def test_probe_truncated(self):
+        with self.assertRaises(LoadException):
+            Map.probe_header(B2_HEADER[:20])
+
+    def test_get_mapinfo_long_header(self):
+        (fd, filename) = tempfile.mkstemp(suffix='.map')
+        try:
+            with os.fdopen(fd, 'wb') as df:
+                df.write(header([b"x" * (Map.PROBE_SIZE * 2)] + [b""] * 8, 1))
+            (book, mapname, df) = Map.get_mapinfo(filename)
+            self.assertEqual((book, len(mapname)), (2, Map.PROBE_SIZE * 2))
+            self.assertEqual(df.filename, filename)
+        finally:
+            os.remove(filename)
+
+
+class MapIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.indexfile = os.path.join(self.tempdir, 'rc.mapindex')
+        self.mapfile = os.path.join(self.tempdir, 'test.map')
+        with open(self.mapfile, 'wb') as df:
+            df.write(B3_HEADER)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_index_persists(self):
+        index = MapIndex(self.indexfile)
+        (book, mapname, df) = index.get_mapinfo(self.mapfile)
+        self.assertEqual((book, mapname), (3, 'Book 3 Map'))
+        self.assertTrue(index.save())
+        self.assertFalse(index.save())
+
+        index = MapIndex(self.indexfile)
+        with mock.patch.object(eschalon.map.Map, 'get_mapinfo') as get_mapinfo:
+            (book, mapname, df) = index.get_mapinfo(self.mapfile)
+            get_mapinfo.assert_not_called()
+        self.assertEqual((book, mapname), (3, 'Book 3 Map'))
+        self.assertEqual(df.filename, self.mapfile)
+
+    def test_datapak_mapinfo(self):
+        c.switch_to_book(3)
+        with zipfile.ZipFile(os.path.join(self.tempdir, 'datapak'), 'w',
+                             zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('maps/test.map', B3_HEADER + os.urandom(Map.PROBE_SIZE * 20))
+        eschalondata = EschalonData.new(3, self.tempdir)
+        index = MapIndex(self.indexfile)
+        with mock.patch.object(Datapak, 'read_member') as read_member:
+            (book, mapname, df) = index.get_datapak_mapinfo(eschalondata, 'test.map')
+            read_member.assert_not_called()
+        self.assertEqual((book, mapname, df.filename), (3, 'Book 3 Map', 'test.map'))
+
+    def test_index_notices_changes(self):
+        index = MapIndex(self.indexfile)
+        index.get_mapinfo(self.mapfile)
+        with open(self.mapfile, 'wb') as df:
+            df.write(B2_HEADER)
+        (book, mapname, df) = index.get_mapinfo(self.mapfile)
+        self.assertEqual((book, mapname), (2, 'Book 2 Map'))
+
+    def test_index_prunes_missing(self):
+        index = MapIndex(self.indexfile)
+        index.get_mapinfo(self.mapfile)
+        os.remove(self.mapfile)
+        index.save()
+        self.assertEqual(MapIndex(self.indexfile).entries, {})
+
+    def test_index_discards_garbage(self):
+        with open(self.indexfile, 'w') as df:
+            df.write('not json')
+        self.assertEqual(MapIndex(self.indexfile).entries, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
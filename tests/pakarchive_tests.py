@@ -0,0 +1,120 @@
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import unittest
+import zlib
+
+from eschalon.pakarchive import PakArchive
+from eschalon.savefile import LoadException
+
+
+def write_pak(filename, members):
+    """ Writes out a Book 1 style gfx.pak containing the given members """
+    index = []
+    data = []
+    offset = 0
+    for (name, contents) in sorted(members.items()):
+        compressed = zlib.compress(contents)
+        index.append(struct.pack('<4I256s', len(compressed), offset, len(contents),
+                                 0, name.encode('UTF-8')))
+        data.append(compressed)
+        offset += len(compressed)
+    compressed_index = zlib.compress(b''.join(index))
+    with open(filename, 'wb') as df:
+        df.write(struct.pack('<4s2H3I', b'!PAK', 1, 2, len(members),
+                             len(compressed_index), 3))
+        df.write(compressed_index)
+        df.write(b''.join(data))
+
+
+class PakArchiveTests(unittest.TestCase):
+
+    members = {
+        'items_mastersheet.png': bytes(range(256)) * 300,
+        'iso_base.png': b'floor' * 1000,
+        'empty.png': b'',
+    }
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'gfx.pak')
+        self.override_dir = os.path.join(self.tempdir, 'packedgraphics')
+        write_pak(self.filename, self.members)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_index(self):
+        pak = PakArchive(self.filename)
+        self.assertEqual(sorted(pak.namelist()), sorted(self.members.keys()))
+        self.assertEqual((pak.unknownh1, pak.unknownh2, pak.numfiles, pak.unknowni1),
+                         (1, 2, 3, 3))
+        for (name, contents) in self.members.items():
+            self.assertEqual(pak.readfile(name), contents)
+            self.assertEqual(pak.read_member(name), contents)
+        pak.close()
+
+    def test_overrides(self):
+        os.mkdir(self.override_dir)
+        with open(os.path.join(self.override_dir, 'iso_base.png'), 'wb') as df:
+            df.write(b'override')
+        with open(os.path.join(self.override_dir, 'extra.png'), 'wb') as df:
+            df.write(b'extra')
+        pak = PakArchive(self.filename, self.override_dir)
+        self.assertEqual(pak.readfile('iso_base.png'), b'override')
+        self.assertEqual(pak.read_member('iso_base.png'), self.members['iso_base.png'])
+        self.assertEqual(pak.readfile('extra.png'), b'extra')
+        pak.close()
+
+        pak = PakArchive(None, self.override_dir)
+        self.assertEqual(pak.readfile('extra.png'), b'extra')
+        with self.assertRaises(LoadException):
+            pak.readfile('empty.png')
+
+    def test_missing(self):
+        pak = PakArchive(self.filename)
+        with self.assertRaises(LoadException):
+            pak.readfile('missing.png')
+        pak.close()
+
+    def test_invalid(self):
+        with open(self.filename, 'r+b') as df:
+            df.write(b'!ZIP')
+        with self.assertRaises(LoadException):
+            PakArchive(self.filename)
+        with open(self.filename, 'wb') as df:
+            df.write(b'')
+        with self.assertRaises(LoadException):
+            PakArchive(self.filename)
+
+    def test_truncated_index(self):
+        with open(self.filename, 'rb') as df:
+            data = df.read()
+        with open(self.filename, 'wb') as df:
+            df.write(data[:30])
+        with self.assertRaises(LoadException):
+            PakArchive(self.filename)
+
+    def test_threaded_reads(self):
+        pak = PakArchive(self.filename)
+        failures = []
+
+        def worker():
+            for i in range(5):
+                for (name, contents) in self.members.items():
+                    if pak.read_member(name) != contents:
+                        failures.append(name)
+
+        threads = [threading.Thread(target=worker) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+        pak.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
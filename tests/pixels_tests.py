@@ -0,0 +1,68 @@
+import random
+import unittest
+from unittest import mock
+
+from eschalon import pixels
+
+
+def premultiplied(width, height, stride, seed=1):
+    """ Returns random premultiplied ARGB32 data with the given stride """
+    rand = random.Random(seed)
+    (b, g, r, a) = pixels.ARGB32_OFFSETS
+    data = bytearray(stride * height)
+    for y in range(height):
+        for x in range(width):
+            alpha = rand.choice([0, 255, rand.randrange(256)])
+            pos = y * stride + x * 4
+            data[pos + a] = alpha
+            for offset in (b, g, r):
+                data[pos + offset] = rand.randrange(alpha + 1)
+    return data
+
+
+class PixelsTests(unittest.TestCase):
+
+    def convert_both(self, func, *args):
+        """ Runs the given conversion with and without NumPy """
+        with mock.patch.object(pixels, 'numpy', None):
+            fallback = func(*args)
+        if pixels.numpy is None:
+            return (fallback, fallback)
+        return (func(*args), fallback)
+
+    def test_unpremultiply(self):
+        (b, g, r, a) = pixels.ARGB32_OFFSETS
+        pixel = bytearray(4)
+        (pixel[b], pixel[g], pixel[r], pixel[a]) = (0x10, 0x20, 0x40, 0x80)
+        for result in self.convert_both(pixels.argb32_to_rgba, pixel, 1, 1, 4):
+            self.assertEqual(result, bytes([0x80, 0x40, 0x20, 0x80]))
+
+    def test_premultiply_clears_transparent(self):
+        data = bytes([0xFF, 0xFF, 0xFF, 0x00, 0x80, 0x40, 0x20, 0xFF])
+        for result in self.convert_both(pixels.rgba_to_argb32, data, 2, 1, 8):
+            self.assertEqual(result[:4], bytes(4))
+            self.assertEqual(pixels.argb32_to_rgba(result, 2, 1, 8)[4:], data[4:])
+
+    def test_implementations_agree(self):
+        data = premultiplied(13, 7, 64)
+        (fast, fallback) = self.convert_both(pixels.argb32_to_rgba, data, 13, 7, 64)
+        self.assertEqual(len(fast), 13 * 7 * 4)
+        self.assertEqual(fast, fallback)
+        (fast, fallback) = self.convert_both(pixels.rgba_to_argb32, fast, 13, 7, 13 * 4)
+        self.assertEqual(fast, fallback)
+
+    def test_roundtrip(self):
+        data = premultiplied(9, 5, 9 * 4)
+        rgba = pixels.argb32_to_rgba(data, 9, 5, 9 * 4)
+        argb = pixels.rgba_to_argb32(rgba, 9, 5, 9 * 4)
+        self.assertEqual(pixels.argb32_to_rgba(argb, 9, 5, 9 * 4), rgba)
+
+    def test_short_last_row(self):
+        # Pixbufs don't pad out their final row
+        data = bytes(range(3 * 4)) + bytes(4) + bytes(range(3 * 4))
+        for result in self.convert_both(pixels.rgba_to_argb32, data, 3, 2, 16):
+            self.assertEqual(len(result), 3 * 2 * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
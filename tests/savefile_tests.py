@@ -1,7 +1,12 @@
 
 
+import os
+import shutil
+import tempfile
+import threading
 import unittest
 from struct import pack
+from unittest import mock
 
 import eschalon.savefile
 
@@ -33,6 +38,278 @@ class TestSavefile(unittest.TestCase):
         s.set_filename("-")
         self.assertFalse(s.is_stringdata())
 
+    def test_read_record(self):
+        s = eschalon.savefile.Savefile(stringdata=pack('<BHif', 1, 2, -3, 1.5))
+        s.open_r()
+        self.assertEqual(s.read_record('BHif'), (1, 2, -3, 1.5))
+        self.assertTrue(s.eof())
+
+    def test_write_record(self):
+        s = eschalon.savefile.Savefile(stringdata=b"")
+        s.open_w()
+        s.write_record('BHif', (1, 2, -3, 1.5))
+        s.close()
+        self.assertEqual(s.stringdata, pack('<BHif', 1, 2, -3, 1.5))
+
+    def test_read_records(self):
+        data = b"".join(pack('<BHI', i, i * 2, i * 3) for i in range(10))
+        s = eschalon.savefile.Savefile(stringdata=data + b"x")
+        s.open_r()
+        self.assertEqual(s.read_records('BHI', 10),
+                         [(i, i * 2, i * 3) for i in range(10)])
+        self.assertEqual(s.remaining(), 1)
+        s.close()
+
+    def test_read_records_short(self):
+        s = eschalon.savefile.Savefile(stringdata=pack('<BH', 1, 2) * 3)
+        s.open_r()
+        with self.assertRaises(eschalon.savefile.LoadException):
+            s.read_records('BH', 4)
+        s.close()
+
+    def test_write_records(self):
+        s = eschalon.savefile.Savefile(stringdata=b"")
+        s.open_w()
+        s.write_records('BH', [(1, 2), (3, 4)])
+        s.close()
+        self.assertEqual(s.stringdata, pack('<BHBH', 1, 2, 3, 4))
+
+    def test_record_requires_open(self):
+        s = eschalon.savefile.Savefile(stringdata=b"")
+        with self.assertRaises(IOError):
+            s.read_record('B')
+        with self.assertRaises(IOError):
+            s.write_record('B', (1,))
+
+    def test_record_struct_cached(self):
+        self.assertIs(eschalon.savefile.record_struct('3IB'),
+                      eschalon.savefile.record_struct('3IB'))
+
+    def test_eof_and_remaining(self):
+        s = eschalon.savefile.Savefile(stringdata=b"abc")
+        s.open_r()
+        self.assertEqual(s.remaining(), 3)
+        self.assertFalse(s.eof())
+        s.read(2)
+        self.assertEqual(s.remaining(), 1)
+        s.read()
+        self.assertTrue(s.eof())
+        s.close()
+        with self.assertRaises(IOError):
+            s.eof()
+
+    def test_eof_file_backed(self):
+        (fd, filename) = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as df:
+                df.write(b"abcd")
+            s = eschalon.savefile.Savefile(filename=filename)
+            s.open_r()
+            self.assertEqual(s.remaining(), 4)
+            s.readint()
+            self.assertTrue(s.eof())
+            s.close()
+        finally:
+            os.remove(filename)
+
+    def test_write_publishes_on_close(self):
+        (fd, filename) = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as df:
+                df.write(b"original")
+            os.chmod(filename, 0o640)
+            s = eschalon.savefile.Savefile(filename=filename)
+            s.open_w()
+            s.writeint(1234)
+            with open(filename, 'rb') as df:
+                self.assertEqual(df.read(), b"original")
+            s.close()
+            with open(filename, 'rb') as df:
+                self.assertEqual(df.read(), pack('<I', 1234))
+            self.assertEqual(os.stat(filename).st_mode & 0o777, 0o640)
+            self.assertEqual(os.listdir(os.path.dirname(filename)).count(
+                os.path.basename(filename)), 1)
+        finally:
+            os.remove(filename)
+
+    def test_write_new_file_mode(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tempdir, 'new.map')
+            s = eschalon.savefile.Savefile(filename=filename)
+            umask = s._umask()
+            with mock.patch.object(os, 'umask') as os_umask:
+                s.open_w()
+                s.writeint(1234)
+                s.close()
+                os_umask.assert_not_called()
+            self.assertEqual(os.stat(filename).st_mode & 0o777, 0o666 & ~umask)
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_umask_without_proc(self):
+        real_open = open
+
+        def no_proc(name, *args, **kwargs):
+            if name == '/proc/self/status':
+                raise FileNotFoundError(name)
+            return real_open(name, *args, **kwargs)
+
+        with mock.patch('builtins.open', no_proc), \
+                mock.patch.object(os, 'umask') as os_umask:
+            self.assertEqual(eschalon.savefile.Savefile._umask(),
+                             eschalon.savefile.STARTUP_UMASK)
+            os_umask.assert_not_called()
+
+    def test_write_abort(self):
+        tempdir = tempfile.mkdtemp()
+        filename = os.path.join(tempdir, 'test.map')
+        try:
+            with open(filename, 'wb') as df:
+                df.write(b"original")
+            s = eschalon.savefile.Savefile(filename=filename)
+            s.open_w()
+            s.writeint(1234)
+            s.stage()
+            s.abort()
+            self.assertFalse(s.opened_w)
+            self.assertEqual(os.listdir(tempdir), ['test.map'])
+            with open(filename, 'rb') as df:
+                self.assertEqual(df.read(), b"original")
+        finally:
+            for name in os.listdir(tempdir):
+                os.remove(os.path.join(tempdir, name))
+            os.rmdir(tempdir)
+
+    def test_commit_all(self):
+        tempdir = tempfile.mkdtemp()
+        mapname = os.path.join(tempdir, 'test.map')
+        entname = os.path.join(tempdir, 'test.ent')
+        try:
+            map_df = eschalon.savefile.Savefile(filename=mapname)
+            ent_df = eschalon.savefile.Savefile(filename=entname)
+            map_df.open_w()
+            map_df.writeuchar(1)
+            ent_df.open_w()
+            ent_df.writeuchar(2)
+            eschalon.savefile.Savefile.commit_all([map_df, ent_df])
+            self.assertFalse(map_df.opened_w or ent_df.opened_w)
+            self.assertEqual(sorted(os.listdir(tempdir)), ['test.ent', 'test.map'])
+            with open(mapname, 'rb') as df:
+                self.assertEqual(df.read(), b"\x01")
+            with open(entname, 'rb') as df:
+                self.assertEqual(df.read(), b"\x02")
+        finally:
+            for name in os.listdir(tempdir):
+                os.remove(os.path.join(tempdir, name))
+            os.rmdir(tempdir)
+
+    def test_commit_all_failure(self):
+        tempdir = tempfile.mkdtemp()
+        mapname = os.path.join(tempdir, 'test.map')
+        try:
+            with open(mapname, 'wb') as df:
+                df.write(b"original")
+            map_df = eschalon.savefile.Savefile(filename=mapname)
+            ent_df = eschalon.savefile.Savefile(
+                filename=os.path.join(tempdir, 'missing', 'test.ent'))
+            map_df.open_w()
+            map_df.writeuchar(1)
+            ent_df.open_w()
+            ent_df.writeuchar(2)
+            with self.assertRaises(OSError):
+                eschalon.savefile.Savefile.commit_all([map_df, ent_df])
+            self.assertFalse(map_df.opened_w or ent_df.opened_w)
+            self.assertEqual(os.listdir(tempdir), ['test.map'])
+            with open(mapname, 'rb') as df:
+                self.assertEqual(df.read(), b"original")
+        finally:
+            for name in os.listdir(tempdir):
+                os.remove(os.path.join(tempdir, name))
+            os.rmdir(tempdir)
+
+    def test_mmap_read(self):
+        (fd, filename) = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as df:
+                df.write(pack('<BI', 7, 1234) + b"name\r\n" + b"rest")
+            s = eschalon.savefile.Savefile(filename=filename)
+            s.open_r()
+            self.assertIsInstance(s.df, eschalon.savefile.BufferCursor)
+            self.assertEqual(s.readuchar(), 7)
+            self.assertEqual(s.read_record('I'), (1234,))
+            self.assertEqual(s.readstr(), b"name")
+            with s.readview() as view:
+                self.assertEqual(view.tobytes(), b"rest")
+            self.assertTrue(s.eof())
+            s.close()
+        finally:
+            os.remove(filename)
+
+    def test_mmap_empty_file(self):
+        (fd, filename) = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            s = eschalon.savefile.Savefile(filename=filename)
+            s.open_r()
+            self.assertTrue(s.eof())
+            self.assertEqual(s.read(), b"")
+            s.close()
+        finally:
+            os.remove(filename)
+
+    def test_cursor_seek(self):
+        cursor = eschalon.savefile.BufferCursor(b"abcdef")
+        self.assertEqual(cursor.seek(2), 2)
+        self.assertEqual(cursor.read(2), b"cd")
+        self.assertEqual(cursor.seek(-1, 1), 3)
+        self.assertEqual(cursor.seek(-2, 2), 4)
+        self.assertEqual(cursor.read(), b"ef")
+        self.assertEqual(cursor.read(), b"")
+        cursor.close()
+
+    def _check_readstr(self, data, expected):
+        """
+        Reads strings from both a string-backed and a file-backed Savefile,
+        returning after checking that they match the expected list.
+        """
+        s = eschalon.savefile.Savefile(stringdata=data)
+        s.open_r()
+        self.assertEqual([s.readstr() for _ in expected], expected)
+        s.close()
+
+        (fd, filename) = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as df:
+                df.write(data)
+            for use_mmap in (True, False):
+                s = eschalon.savefile.Savefile(filename=filename)
+                s.use_mmap = use_mmap
+                s.open_r()
+                self.assertEqual([s.readstr() for _ in expected], expected)
+                s.close()
+        finally:
+            os.remove(filename)
+
+    def test_readstr(self):
+        self._check_readstr(b"yellow\r\n\r\nblue\r\n",
+                            [b"yellow", b"", b"blue"])
+
+    def test_readstr_long(self):
+        longstr = b"x" * (eschalon.savefile.STR_WINDOW * 5 + 3)
+        self._check_readstr(longstr + b"\r\n" + longstr + b"\r\n",
+                            [longstr, longstr])
+
+    def test_readstr_straddles_window(self):
+        prefix = b"y" * (eschalon.savefile.STR_WINDOW - 1)
+        self._check_readstr(prefix + b"\r\nend\r\n", [prefix, b"end"])
+
+    def test_readstr_missing_terminator(self):
+        s = eschalon.savefile.Savefile(stringdata=b"no terminator\r")
+        s.open_r()
+        with self.assertRaises(eschalon.savefile.LoadException):
+            s.readstr()
+
     @unittest.skip("this test can cause testfile corruption - rewrite")
     def _test_write_and_read(self,
                              value_to_write,
@@ -128,5 +405,49 @@ class TestSavefile(unittest.TestCase):
         )
 
 
+
+class TestPositionalReader(unittest.TestCase):
+
+    def setUp(self):
+        self.data = bytes(range(256)) * 64
+        (fd, self.filename) = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as df:
+            df.write(self.data)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def check_reader(self, reader):
+        self.assertEqual(reader.pread(10, 300), self.data[300:310])
+        self.assertEqual(reader.pread(100, len(self.data) - 5), self.data[-5:])
+        self.assertEqual(reader.pread(10, len(self.data) + 5), b'')
+
+        failures = []
+
+        def worker(start):
+            for offset in range(start, len(self.data) - 64, 997):
+                if reader.pread(64, offset) != self.data[offset:offset + 64]:
+                    failures.append(offset)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+        reader.close()
+
+    def test_pread(self):
+        if not eschalon.savefile.PositionalReader.use_pread:
+            self.skipTest('os.pread not available')
+        self.check_reader(eschalon.savefile.PositionalReader(self.filename))
+
+    def test_thread_handles(self):
+        with mock.patch.object(eschalon.savefile.PositionalReader, 'use_pread', False):
+            reader = eschalon.savefile.PositionalReader(self.filename)
+        self.check_reader(reader)
+        self.assertEqual(reader.handles, [])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from struct import pack
+
+import eschalon.savefile
+from eschalon.schema import STR, Field, Schema
+
+
+class Record(object):
+    pass
+
+
+class SchemaTests(unittest.TestCase):
+
+    schema = Schema(
+        Field('first', 'B'),
+        Field('name', STR),
+        Field('second', 'H'),
+        Field('third', 'I'),
+        Field('flag', 'I', savegame=True),
+        Field('values', 'B', savegame=True, count=3),
+    )
+
+    def test_runs_are_fused(self):
+        steps = self.schema.plans[True]
+        self.assertEqual([getattr(step, 'codec', None) for step in steps],
+                         ['B', None, 'HII3B'])
+        self.assertEqual(self.schema.plans[False][-1].codec, 'HI')
+
+    def test_read(self):
+        data = pack('<B', 1) + b"name\r\n" + pack('<HII3B', 2, 3, 4, 5, 6, 7)
+        s = eschalon.savefile.Savefile(stringdata=data)
+        s.open_r()
+        r = Record()
+        self.schema.read(r, s, True)
+        self.assertTrue(s.eof())
+        self.assertEqual((r.first, r.name, r.second, r.third, r.flag, r.values),
+                         (1, 'name', 2, 3, 4, [5, 6, 7]))
+
+    def test_read_global(self):
+        data = pack('<B', 1) + b"\r\n" + pack('<HI', 2, 3)
+        s = eschalon.savefile.Savefile(stringdata=data)
+        s.open_r()
+        r = Record()
+        self.schema.read(r, s)
+        self.assertTrue(s.eof())
+        self.assertFalse(hasattr(r, 'flag'))
+
+    def test_write(self):
+        r = Record()
+        (r.first, r.name, r.second, r.third, r.flag, r.values) = (
+            1, b'name', 2, 3, 4, [5, 6, 7])
+        s = eschalon.savefile.Savefile(stringdata=b"")
+        s.open_w()
+        self.schema.write(r, s, True)
+        s.close()
+        self.assertEqual(s.stringdata, pack('<B', 1) + b"name\r\n" +
+                         pack('<HII3B', 2, 3, 4, 5, 6, 7))
+
+    def test_copy_and_equals(self):
+        r = Record()
+        (r.first, r.name, r.second, r.third, r.flag, r.values) = (
+            1, 'name', 2, 3, 4, [5, 6, 7])
+        copy = Record()
+        self.schema.copy(r, copy)
+        self.assertTrue(self.schema.equals(r, copy))
+        copy.values[0] = 9
+        self.assertEqual(r.values, [5, 6, 7])
+        self.assertFalse(self.schema.equals(r, copy))
+
+    def test_layout(self):
+        schema = Schema(Field('a', 'B'), Field('b', 'H'),
+                        Field('c', 'I', savegame=True))
+        self.assertEqual(schema.layout(False), ('BH', ('a', 'b')))
+        self.assertEqual(schema.layout(True), ('BHI', ('a', 'b', 'c')))
+        with self.assertRaises(ValueError):
+            self.schema.layout(True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+import eschalon.map
+import eschalon.tile
+
+
+class TileTests(unittest.TestCase):
+
+    def test_tile_init_default(self):
+        t = eschalon.tile.Tile.new(2, 5, 10)
+        self.assertEqual((t.x, t.y), (5, 10))
+        self.assertEqual(t.wallimg, 0)
+        self.assertEqual(t.tile_flag, 0)
+        self.assertIs(t.savegame, False)
+        self.assertEqual(len(t.tilecontents), 0)
+        self.assertIsNone(t.entity)
+
+    def test_tile_replicate(self):
+        t = eschalon.tile.Tile.new(3, 1, 2)
+        t.wallimg = 1001
+        t.cartography = 7
+        t.savegame = True
+        newtile = t.replicate()
+        self.assertEqual(newtile.wallimg, 1001)
+        self.assertEqual(newtile.cartography, 7)
+        self.assertIs(newtile.savegame, True)
+        t.wallimg = 3
+        self.assertEqual(newtile.wallimg, 1001)
+
+
+class TileGridTests(unittest.TestCase):
+
+    def test_grid_views(self):
+        grid = eschalon.map.TileGrid(1)
+        self.assertEqual(len(grid), 200)
+        self.assertEqual(len(grid[0]), 100)
+        tile = grid[10][5]
+        self.assertIsInstance(tile, eschalon.tile.B1Tile)
+        self.assertEqual((tile.x, tile.y), (5, 10))
+        tile.floorimg = 12
+        tile.unknown5 = 3
+        self.assertEqual(grid[10][5].floorimg, 12)
+        self.assertEqual(grid[10][5].unknown5, 3)
+        self.assertEqual(grid[10][-95].floorimg, 12)
+        self.assertEqual(grid[10][4].floorimg, 0)
+        with self.assertRaises(IndexError):
+            grid[10][100]
+
+    def test_grid_side_tables(self):
+        grid = eschalon.map.TileGrid(2)
+        grid[3][4].addtilecontent('content')
+        grid[3][4].addentity('entity')
+        self.assertEqual(list(grid[3][4].tilecontents), ['content'])
+        self.assertEqual(grid[3][4].entity, 'entity')
+        self.assertEqual(len(grid.tilecontents), 1)
+        self.assertEqual(len(grid.entities), 1)
+        grid[3][4].deltilecontent('content')
+        grid[3][4].delentity()
+        self.assertEqual(grid.tilecontents, {})
+        self.assertEqual(grid.entities, {})
+
+    def test_grid_set_tile(self):
+        grid = eschalon.map.TileGrid(3)
+        t = eschalon.tile.Tile.new(3, 0, 0)
+        t.wallimg = 500
+        t.tile_flag = 0x12345678
+        t.addtilecontent('content')
+        grid[7][8] = t
+        self.assertEqual(grid[7][8].wallimg, 500)
+        self.assertEqual(grid[7][8].tile_flag, 0x12345678)
+        self.assertEqual((grid[7][8].x, grid[7][8].y), (8, 7))
+        self.assertEqual(list(grid[7][8].tilecontents), ['content'])
+
+    def test_grid_records(self):
+        grid = eschalon.map.TileGrid(2)
+        fields = ('wallimg', 'tile_flag')
+        records = [(i % 65536, i * 3) for i in range(200 * 100)]
+        grid.set_records(fields, records)
+        self.assertEqual(grid[1][2].wallimg, 102)
+        self.assertEqual(grid[1][2].tile_flag, 306)
+        self.assertEqual(list(grid.get_records(fields)), records)
+
+    def test_grid_fill(self):
+        grid = eschalon.map.TileGrid(2)
+        grid.fill('savegame', True)
+        self.assertIs(grid[199][99].savegame, True)
+
+    def test_grid_replicate(self):
+        grid = eschalon.map.TileGrid(2)
+        grid[0][0].wall = 1
+        newgrid = grid.replicate()
+        grid[0][0].wall = 2
+        self.assertEqual(newgrid[0][0].wall, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
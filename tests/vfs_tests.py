@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from eschalon.constants import constants as c
+from eschalon.eschalondata import EschalonData
+from eschalon.savefile import LoadException
+from eschalon.vfs import SOURCE_FILE, GameVFS
+
+ENTITIES_HEADER = 'ID,Name,file,Xoff,Yoff,Dirs,Script,HP,Align,Move,Frame\n'
+
+
+class GameVFSTests(unittest.TestCase):
+
+    def setUp(self):
+        c.switch_to_book(3)
+        self.tempdir = tempfile.mkdtemp()
+        self.gamedir = os.path.join(self.tempdir, 'game')
+        self.modpath = os.path.join(self.tempdir, 'mod')
+        for directory in EschalonData.DATA_DIRS:
+            os.makedirs(os.path.join(self.gamedir, directory))
+        os.makedirs(os.path.join(self.modpath, 'gfx'))
+        self.write(self.gamedir, 'gfx/iso_base.png', b'base floor')
+        self.write(self.gamedir, 'gfx/iso_obj.png', b'base objects')
+        self.write(self.gamedir, 'maps/town.map', b'town')
+        self.write(self.modpath, 'gfx/iso_base.png', b'mod floor')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def write(self, basedir, path, data):
+        with open(os.path.join(basedir, *path.split('/')), 'wb') as df:
+            df.write(data)
+
+    def test_layers(self):
+        vfs = GameVFS(self.gamedir, EschalonData.DATA_DIRS, modpath=self.modpath)
+        self.assertEqual(vfs.lookup('gfx/iso_base.png'),
+                         (SOURCE_FILE, os.path.join(self.modpath, 'gfx', 'iso_base.png')))
+        self.assertEqual(vfs.lookup('gfx/iso_obj.png'),
+                         (SOURCE_FILE, os.path.join(self.gamedir, 'gfx', 'iso_obj.png')))
+        self.assertIsNone(vfs.lookup('gfx/missing.png'))
+        self.assertEqual(sorted(vfs.namelist()),
+                         ['gfx/iso_base.png', 'gfx/iso_obj.png', 'maps/town.map'])
+
+    def test_stale(self):
+        vfs = GameVFS(self.gamedir, EschalonData.DATA_DIRS, modpath=self.modpath)
+        self.assertFalse(vfs.stale())
+        self.write(self.modpath, 'entities.csv', b'')
+        self.assertTrue(vfs.stale())
+        vfs.build()
+        self.assertFalse(vfs.stale())
+        self.assertEqual(vfs.lookup('data/entities.csv'),
+                         (SOURCE_FILE, os.path.join(self.modpath, 'entities.csv')))
+
+    def test_eschalondata(self):
+        data = EschalonData.new(3, self.gamedir, self.modpath)
+        self.assertEqual(data.readfile('iso_base.png'), b'mod floor')
+        self.assertEqual(data.readfile('town.map', 'maps'), b'town')
+        with data.open_member('iso_base.png') as handle:
+            self.assertEqual(handle.read(), b'mod floor')
+        with self.assertRaises(LoadException):
+            data.readfile('new.png')
+
+        # New files are picked up on a miss
+        self.write(self.gamedir, 'gfx/new.png', b'new')
+        self.assertEqual(data.readfile('new.png'), b'new')
+        self.assertIn('gfx/new.png', data.filelist())
+
+    def test_mod_entities(self):
+        self.write(self.gamedir, 'data/entities.csv', (
+            ENTITIES_HEADER +
+            '1,Rat,rat,0,0,8,*,5,0,1,17\n'
+            '2,Bat,bat,0,0,8,*,5,0,1,17\n').encode('UTF-8'))
+        self.write(self.modpath, 'entities.csv', (
+            ENTITIES_HEADER +
+            '2,Mod Bat,modbat,0,0,8,*,5,0,1,17\n'
+            '3,Mod Wolf,wolf,0,0,8,*,5,0,1,17\n').encode('UTF-8'))
+        data = EschalonData.new(3, self.gamedir, self.modpath)
+        entities = data.get_entitytable()
+        self.assertEqual(dict((entid, ent.name) for (entid, ent) in entities.items()),
+                         {1: 'Rat', 2: 'Bat', 3: 'Mod Wolf'})
+
+
+if __name__ == '__main__':
+    unittest.main()
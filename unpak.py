@@ -20,66 +20,15 @@
 
 import logging
 import sys
-import zlib
-from struct import unpack
 
-from eschalon.savefile import LoadException, Savefile
+from eschalon.pakarchive import PakArchive
 
 LOG = logging.getLogger(__name__)
 
 
-class PakIndex(object):
-    """ A class to hold information on an individual file in the pak. """
-
-    def __init__(self, data):
-        (self.size_compressed,
-         self.abs_index,
-         self.size_real,
-         self.unknowni1) = unpack('<IIII', data[:16])
-        self.filename = data[16:]
-        self.filename = self.filename[:self.filename.index("\x00")]
-
-
-df = Savefile(sys.argv[1])
-
-df.open_r()
-header = df.read(4)
-if (header != '!PAK'):
-    df.close()
-    raise LoadException('Invalid PAK header')
-
-# Initial Values
-unknownh1 = df.readshort()
-unknownh2 = df.readshort()
-numfiles = df.readint()
-compressed_idx_size = df.readint()
-unknowni1 = df.readint()
-
-# Now load in the index
-decobj = zlib.decompressobj()
-indexdata = decobj.decompress(df.read())
-zeroindex = df.tell() - len(decobj.unused_data)
-decobj = None
-fileindex = {}
-for i in range(numfiles):
-    index = PakIndex(indexdata[:272])
-    indexdata = indexdata[272:]
-    fileindex[index.filename] = index
-
-for filename in list(fileindex.keys()):
-    index = fileindex[filename]
-    print(filename)
-    df.seek(zeroindex + index.abs_index)
-    # On Windows, we need to specify bufsize or memory gets clobbered
-    filedata = zlib.decompress(
-        df.read(index.size_compressed), 15, index.size_real)
-
-for filename in list(fileindex.keys()):
-    index = fileindex[filename]
+pak = PakArchive(sys.argv[1])
+for filename in pak.namelist():
     print(filename)
-    df.seek(zeroindex + index.abs_index)
-    # On Windows, we need to specify bufsize or memory gets clobbered
-    filedata = zlib.decompress(
-        df.read(index.size_compressed), 15, index.size_real)
     with open(filename, 'wb') as f:
-        f.write(filedata)
+        f.write(pak.read_member(filename))
+pak.close()